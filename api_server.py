@@ -0,0 +1,229 @@
+from aiohttp import web
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from crypto_trading_bot import TradingSession
+import tracing
+from trade_feed import TradeFeed
+from trade_history import TradeHistoryIndex
+from wallet_addresses import wallet_address
+
+MAX_PAGE_SIZE = 500
+
+
+@web.middleware
+async def cors_middleware(request: web.Request, handler):
+    """Allow the React dev server on another port to call the API"""
+    if request.method == 'OPTIONS':
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    return response
+
+
+class TradingAPI:
+    """Async HTTP API used by frontend/src/App.js"""
+
+    def __init__(self, session: TradingSession, history: TradeHistoryIndex,
+                 feed: Optional[TradeFeed] = None):
+        self.session = session
+        self.history = history
+        self.feed = feed
+        self._feed_task: Optional[asyncio.Task] = None
+        self._previous_tracer: Optional[tracing.Tracer] = None
+        if self.feed:
+            # Live results over WebSocket instead of history polling
+            self.feed.attach(self.session)
+        self.registrations: Dict[str, str] = {}
+        self._registering = asyncio.Lock()
+        # Lowercase address -> wallet index; filled off the event loop, as deriving addresses is slow
+        self._addresses: Dict[str, int] = {}
+        self._indexed_count = 0
+        self._index_lock = threading.Lock()
+        # New result rows are indexed as soon as the session writes them
+        self.session.add_trade_listener(lambda row, csv_path: self.history.refresh_file(csv_path))
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[cors_middleware])
+        app.router.add_get('/assets', self.assets)
+        app.router.add_post('/register', self.register)
+        app.router.add_post('/trade', self.trade)
+        app.router.add_get('/trading-history/{wallet}', self.trading_history)
+        app.router.add_get('/metrics', self.metrics)
+        app.on_startup.append(self._load_history)
+        app.on_startup.append(self._load_addresses)
+        if self.session.tracer:
+            # Trades arrive outside any session run, so the session's tracer is installed for the app's lifetime
+            app.on_startup.append(self._install_tracer)
+            app.on_cleanup.append(self._restore_tracer)
+        if self.feed:
+            app.on_startup.append(self._start_feed)
+            app.on_cleanup.append(self._stop_feed)
+        return app
+
+    async def _load_history(self, app: web.Application):
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(None, self.history.refresh, True)
+        logging.info(f"Indexed {rows} historical trade results")
+
+    async def _load_addresses(self, app: web.Application):
+        await asyncio.get_running_loop().run_in_executor(None, self._index_wallets)
+        logging.info(f"Indexed {len(self._addresses)} wallet addresses")
+
+    async def _install_tracer(self, app: web.Application):
+        self._previous_tracer = tracing.set_tracer(self.session.tracer)
+
+    async def _restore_tracer(self, app: web.Application):
+        tracing.set_tracer(self._previous_tracer)
+        self.session.tracer.flush()
+
+    async def _start_feed(self, app: web.Application):
+        self._feed_task = asyncio.create_task(self.feed.serve())
+
+    async def _stop_feed(self, app: web.Application):
+        self.feed.stop()
+        if self._feed_task:
+            await self._feed_task
+
+    def _index_wallets(self):
+        """Index the addresses of wallets added since the last call (blocking: runs in the executor)
+
+        Keystore wallets take their address from the file, so no key has to
+        be decrypted first; plain keys are derived once each.
+        """
+        wallets = self.session.wallet_manager.wallets
+        known = getattr(wallets, 'addresses', None)
+        with self._index_lock:
+            for index in range(self._indexed_count, len(wallets)):
+                address = known[index] if known and known[index] else None
+                if address is None:
+                    try:
+                        address = wallet_address(wallets[index])
+                    except Exception as e:
+                        logging.error(f"No address for wallet {index}: {str(e)}")
+                        continue
+                self._addresses.setdefault(address.lower(), index)
+            self._indexed_count = max(self._indexed_count, len(wallets))
+
+    async def _wallet_index(self, address: str) -> Optional[int]:
+        """Index of the loaded wallet with this address; only addresses are accepted, never keys"""
+        if address.lower() not in self._addresses and self._indexed_count < len(self.session.wallet_manager.wallets):
+            await asyncio.get_running_loop().run_in_executor(None, self._index_wallets)
+        return self._addresses.get(address.lower())
+
+    def _add_wallet(self) -> str:
+        """Create and store a new wallet (a file append, or a keystore's scrypt); returns its address"""
+        private_key = '0x' + os.urandom(32).hex()
+        self.session.wallet_manager.add_wallet(private_key)
+        self._index_wallets()
+        return wallet_address(private_key)
+
+    def _trade(self, index: int, direction: str, size: float, asset: Optional[str]) -> Dict[str, Any]:
+        # A keystore wallet may still be decrypting; reading its key waits here, off the loop
+        wallet = self.session.wallet_manager.wallets[index]
+        return self.session._process_wallet_with_size(wallet, direction, size, asset, wallet_index=index)
+
+    def _history_page(self, index: int, limit: int,
+                      cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Picks up result files written by other processes; rows are keyed by the wallet's key
+        self.history.refresh()
+        return self.history.page(self.session.wallet_manager.wallets[index], limit, cursor)
+
+    async def assets(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'assets': list(self.session.settings.trading_assets)
+        })
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """Live exposure, plus staged pipeline and scheduler stats while a staged plan has run"""
+        metrics = {'exposure': self.session.exposure.snapshot()}
+        if self.session.pipeline:
+            metrics['pipeline'] = self.session.pipeline.stats()
+        if self.session.scheduler:
+            metrics['scheduler'] = self.session.scheduler.stats()
+        return web.json_response(metrics)
+
+    async def register(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        email = (body or {}).get('email', '').strip()
+        if '@' not in email:
+            return web.json_response({'error': 'valid email required'}, status=400)
+
+        async with self._registering:
+            if email not in self.registrations:
+                self.registrations[email] = await asyncio.get_running_loop().run_in_executor(None, self._add_wallet)
+        return web.json_response({'wallet_address': self.registrations[email]})
+
+    async def trade(self, request: web.Request) -> web.Response:
+        body = await request.json() or {}
+        index = await self._wallet_index(str(body.get('wallet_address', '')))
+        if index is None:
+            return web.json_response({'error': 'unknown wallet'}, status=404)
+        if body.get('direction') not in ('long', 'short'):
+            return web.json_response({'error': 'direction must be long or short'}, status=400)
+        try:
+            size = float(body.get('size'))
+        except (TypeError, ValueError):
+            return web.json_response({'error': 'size must be a number'}, status=400)
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, self._trade, index, body['direction'], size, body.get('asset') or None
+        )
+        status = 200 if result.get('status') == 'success' else 422
+        return web.json_response({
+            'status': result.get('status'),
+            'transaction_hash': result.get('transaction_hash') or result.get('tx_id'),
+            'error': result.get('error')
+        }, status=status)
+
+    async def trading_history(self, request: web.Request) -> web.Response:
+        wallet = request.match_info['wallet']
+        index = await self._wallet_index(wallet)
+        if index is None:
+            return web.json_response({'error': 'unknown wallet'}, status=404)
+        try:
+            limit = max(1, min(int(request.query.get('limit', 50)), MAX_PAGE_SIZE))
+        except ValueError:
+            return web.json_response({'error': 'limit must be an integer'}, status=400)
+
+        try:
+            history, next_cursor = await asyncio.get_running_loop().run_in_executor(
+                None, self._history_page, index, limit, request.query.get('cursor')
+            )
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        # Never send private keys back to the browser
+        history = [dict(row, wallet=wallet) for row in history]
+        return web.json_response({'history': history, 'next_cursor': next_cursor})
+
+
+def create_app(config: Dict) -> web.Application:
+    """Build the API app on top of a TradingSession and the results directory"""
+    session = TradingSession(config)
+    history = TradeHistoryIndex(config.get('results_dir', 'trade_results'))
+    feed = TradeFeed(port=config['trade_feed_port']) if config.get('trade_feed_port') else None
+    return TradingAPI(session, history, feed).build_app()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = {
+        'keys_file': 'wallet_keys.txt',
+        'proxy_file': 'proxies.txt',
+        'proxy_type': 'regular',
+        'enable_logs': True,
+        'trading_assets': ['BTC', 'ETH', 'SOL'],
+        'position_direction': 'random',
+        'volume_percentage_range': (10, 50),
+        'trade_feed_port': 8765
+    }
+
+    web.run_app(create_app(config), host='127.0.0.1', port=8000)
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from rpc_client import JsonRpcClient, RpcError
+from wallet_addresses import wallet_address
+
+# balanceOf(address)
+BALANCE_OF_SELECTOR = '0x70a08231'
+
+BalanceSource = Callable[[List[str]], Dict[str, float]]
+
+
+def simulated_balance_source(balance: float = 10000) -> BalanceSource:
+    """Every wallet holds the same balance (the simulated TransactionManager's limit)"""
+    return lambda wallets: {wallet: float(balance) for wallet in wallets}
+
+
+def rpc_balance_source(client: JsonRpcClient, token: Optional[str] = None,
+                       decimals: Optional[int] = None) -> BalanceSource:
+    """Balances from the node: an ERC-20 margin token when given, the native coin otherwise
+
+    All wallets of a refresh go out as one JSON-RPC batch.
+    """
+    if decimals is None:
+        decimals = 6 if token else 18
+    scale = 10 ** decimals
+
+    def fetch(wallets: List[str]) -> Dict[str, float]:
+        addresses = [wallet_address(wallet) for wallet in wallets]
+        if token is None:
+            balances = client.get_balances(addresses)
+            return {wallet: balances[address] / scale
+                    for wallet, address in zip(wallets, addresses) if address in balances}
+        results = client.eth_calls([
+            {'to': token, 'data': BALANCE_OF_SELECTOR + address[2:].lower().rjust(64, '0')}
+            for address in addresses
+        ])
+        balances = {}
+        for wallet, result in zip(wallets, results):
+            if isinstance(result, RpcError) or not result or result == '0x':
+                continue
+            balances[wallet] = int(result, 16) / scale
+        return balances
+
+    return fetch
+
+
+def balance_source_from_config(config: Dict, rpc_client: Optional[JsonRpcClient]) -> BalanceSource:
+    if rpc_client:
+        return rpc_balance_source(rpc_client, config.get('margin_token'), config.get('margin_token_decimals'))
+    return simulated_balance_source(config.get('wallet_balance', 10000))
+
+
+class BalanceCache:
+    """Per-wallet available margin with a TTL and optimistic local debits
+
+    reserve() debits a wallet as soon as a trade is submitted, so a burst of
+    trades cannot overdraw it while the node still reports the old balance;
+    release() gives the amount back if the trade failed. A refresh replaces
+    the balance and drops debits made before the fetch started, since the
+    node's answer already reflects those. Stale wallets are always fetched
+    together in one bulk call, and start() keeps the cache warm from a
+    background thread.
+    """
+
+    def __init__(self, fetch: BalanceSource, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self._balances: Dict[str, float] = {}
+        self._fetched_at: Dict[str, float] = {}
+        self._debits: Dict[str, List[List[float]]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshes = 0
+
+    def refresh(self, wallets: Iterable[str], force: bool = False):
+        """Fetch every stale (or, with force, every given) wallet in one call"""
+        now = self.clock()
+        with self._lock:
+            stale = [wallet for wallet in dict.fromkeys(wallets)
+                     if force or now - self._fetched_at.get(wallet, float('-inf')) >= self.ttl]
+        if not stale:
+            return
+        try:
+            balances = self.fetch(stale)
+        except Exception as e:
+            logging.warning(f"Balance refresh failed for {len(stale)} wallets: {str(e)}")
+            return
+        with self._lock:
+            for wallet, balance in balances.items():
+                self._balances[wallet] = balance
+                self._fetched_at[wallet] = now
+                debits = [debit for debit in self._debits.get(wallet, []) if debit[0] >= now]
+                self._debits[wallet] = debits
+            self.refreshes += 1
+
+    def available(self, wallet: str) -> Optional[float]:
+        """Balance minus outstanding debits; None if the wallet was never fetched"""
+        if wallet not in self._fetched_at or self.clock() - self._fetched_at[wallet] >= self.ttl:
+            self.refresh([wallet])
+        with self._lock:
+            if wallet not in self._balances:
+                return None
+            return self._balances[wallet] - sum(amount for _, amount in self._debits.get(wallet, []))
+
+    def feasible_size(self, wallet: str, size: float, min_size: float = 0.0) -> float:
+        """size, shrunk to what the wallet can cover, or 0 if below min_size"""
+        available = self.available(wallet)
+        if available is None:
+            return size
+        size = min(size, available)
+        return size if size > 0 and size >= min_size else 0.0
+
+    def reserve(self, wallet: str, amount: float) -> bool:
+        """Debit amount unless it exceeds the wallet's available balance"""
+        available = self.available(wallet)
+        with self._lock:
+            if available is not None and amount > available:
+                return False
+            self._debits.setdefault(wallet, []).append([self.clock(), amount])
+            return True
+
+    def release(self, wallet: str, amount: float):
+        """Undo a reserve() whose trade did not go through"""
+        with self._lock:
+            debits = self._debits.get(wallet, [])
+            for index, (_, debited) in enumerate(debits):
+                if debited == amount:
+                    del debits[index]
+                    return
+
+    def snapshot(self, wallets: Iterable[str]) -> Dict[str, float]:
+        """Available balance per wallet after one bulk refresh of the stale ones"""
+        wallets = list(wallets)
+        self.refresh(wallets)
+        with self._lock:
+            return {
+                wallet: self._balances[wallet] - sum(amount for _, amount in self._debits.get(wallet, []))
+                for wallet in wallets if wallet in self._balances
+            }
+
+    def start(self, wallets: Callable[[], List[str]], interval: Optional[float] = None) -> 'BalanceCache':
+        """Refresh all wallets returned by wallets() in the background every interval"""
+        interval = interval if interval is not None else self.ttl / 2
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.refresh(wallets(), force=True)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
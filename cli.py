@@ -0,0 +1,179 @@
+import argparse
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+# Subsystems (the trading session, Selenium, requests, the eth signing stack)
+# are imported inside the subcommand that uses them, so a --dry-run plan
+# starts without them; test_cli.py holds the import budget.
+from execution_plan import plan_session
+
+# The session run_trading.py starts; --config overrides individual keys
+DEFAULT_CONFIG: Dict[str, Any] = {
+    'web3_provider': 'https://sepolia-rollup.arbitrum.io/rpc',
+    'keys_file': 'wallet_keys.txt',
+    'proxy_file': 'proxies.txt',
+    'proxy_type': 'regular',
+    'enable_logs': True,
+    'enable_shuffling': True,
+    'thread_count': 2,
+    'launch_delay': (5, 10),
+    'branch_wallet_range': (2, 3),
+    'max_parallel_branches': 2,
+    'trading_assets': ['BTC', 'ETH', 'SOL'],
+    'position_direction': 'random',
+    'volume_percentage_range': (10, 50),
+    'trades_per_wallet': 2
+}
+
+
+def load_config(args: argparse.Namespace) -> Dict[str, Any]:
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        with open(args.config, 'r') as f:
+            config.update(json.load(f))
+    if args.keys_file:
+        config['keys_file'] = args.keys_file
+    if args.proxy_file:
+        config['proxy_file'] = args.proxy_file
+    return config
+
+
+def _read_keys(path: str) -> List[str]:
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_session(args: argparse.Namespace, mode: str):
+    """trade / branch: plan the session, then run the plan (or just print it)"""
+    config = load_config(args)
+    if args.dry_run:
+        if config.get('keystore_dir'):
+            raise SystemExit("--dry-run plans from keys_file; keystore sessions need a full run")
+        plan = plan_session(config, _read_keys(config['keys_file']), mode, args.seed)
+        if args.save_plan:
+            plan.save(args.save_plan)
+        print(json.dumps(plan.summary(), indent=2))
+        return
+
+    from crypto_trading_bot import TradingSession
+    if args.profile:
+        config['profile'] = args.profile
+    session = TradingSession(config)
+    recorder = watcher = None
+    if args.journal:
+        from workload_replay import WorkloadRecorder
+        recorder = WorkloadRecorder(args.journal).attach(session)
+    if args.control:
+        from session_config import ConfigWatcher
+        watcher = ConfigWatcher(session, args.control).start()
+    plan = plan_session(config, session.wallet_manager.wallets, mode, args.seed)
+    if args.save_plan:
+        plan.save(args.save_plan)
+    session.start_profiling()
+    try:
+        if args.staged:
+            session.execute_staged_plan(plan)
+        else:
+            session.execute_plan(plan)
+    finally:
+        session.stop_profiling()
+        if recorder:
+            recorder.close()
+        if watcher:
+            watcher.stop()
+
+
+def run_ui(args: argparse.Namespace):
+    """ui: browser (or recorded HTTP) trading sequences, without backend trades"""
+    config = load_config(args)
+    from crypto_trading_bot import ProxyManager, TransactionManager, WalletManager
+    from trading_ui_automation import UITradingSession
+
+    wallets = WalletManager(config['keys_file']).wallets
+    proxies = ProxyManager(config['proxy_file'], config.get('proxy_type', 'regular'))
+    user_agents = TransactionManager()
+    session = UITradingSession(config)
+    try:
+        for index, wallet in enumerate(wallets[:args.limit] if args.limit else wallets):
+            ok = session.execute_trading_sequence(wallet, proxies.get_proxy(index),
+                                                  user_agents.get_random_user_agent())
+            logging.info(f"UI sequence for wallet {index}: {'ok' if ok else 'failed'}")
+    finally:
+        session.shutdown()
+
+
+def run_combined(args: argparse.Namespace):
+    """combined: UI and backend stages pipelined per wallet"""
+    config = load_config(args)
+    from trading_ui_automation import connect_to_main_trading_bot
+
+    session = connect_to_main_trading_bot()(config)
+    try:
+        session.execute_pipelined_trading()
+    finally:
+        session.ui_session.shutdown()
+
+
+def run_analyze(args: argparse.Namespace):
+    from trade_analytics import main as analytics_main
+    analytics_main(args.args)
+
+
+def run_bench(args: argparse.Namespace):
+    if args.bench == 'replay':
+        from workload_replay import main as bench_main
+    else:
+        from soak_harness import main as bench_main
+    bench_main(args.args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Variational trading bot")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    session_options = argparse.ArgumentParser(add_help=False)
+    session_options.add_argument('--config', help="JSON file with session config overrides")
+    session_options.add_argument('--keys-file', default=None)
+    session_options.add_argument('--proxy-file', default=None)
+
+    for mode, name in (('parallel', 'trade'), ('branch', 'branch')):
+        command = commands.add_parser(name, parents=[session_options], help=f"Run a {mode} session")
+        command.add_argument('--seed', type=int, default=None, help="Plan seed, for repeatable sessions")
+        command.add_argument('--dry-run', action='store_true', help="Print the plan summary and exit")
+        command.add_argument('--save-plan', metavar='PATH', help="Also save the plan (see execution_plan.py)")
+        command.add_argument('--staged', action='store_true', help="Run through the staged pipeline")
+        command.add_argument('--profile', metavar='MODE', help="cprofile or sampling")
+        command.add_argument('--journal', metavar='PATH', help="Record orders for workload_replay.py")
+        command.add_argument('--control', metavar='PATH',
+                             help="JSON file of config changes, applied while running when it changes or on SIGHUP")
+        command.set_defaults(handler=lambda args, mode=mode: run_session(args, mode))
+
+    ui = commands.add_parser('ui', parents=[session_options], help="Run UI trading sequences only")
+    ui.add_argument('--limit', type=int, default=None, help="Only the first N wallets")
+    ui.set_defaults(handler=run_ui)
+    combined = commands.add_parser('combined', parents=[session_options], help="Run UI and backend together")
+    combined.set_defaults(handler=run_combined)
+
+    # Their own options, --help included, are passed through to the tool's main()
+    analyze = commands.add_parser('analyze', add_help=False,
+                                  help="Aggregate trade_results (trade_analytics.py options)")
+    analyze.set_defaults(handler=run_analyze, passthrough=True)
+    bench = commands.add_parser('bench', add_help=False, help="Workload replay or soak test (their own options)")
+    bench.add_argument('bench', choices=['replay', 'soak'])
+    bench.set_defaults(handler=run_bench, passthrough=True)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and not getattr(args, 'passthrough', False):
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.args = extra
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
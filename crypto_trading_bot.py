@@ -1,27 +1,78 @@
-from typing import List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Tuple, Callable, Optional, Union
 import logging
 from datetime import datetime
 import random
 import time
-import requests
 import os
 import json
 import hmac
 import hashlib
 from base64 import b64encode
 import csv
+import functools
+import threading
+
+from balance_cache import BalanceCache, balance_source_from_config
+from keystore import KeystoreError, UnlockedKeys, keystore_files, keystore_name, keystore_password, write_keystore
+from execution_plan import ExecutionPlan, plan_session, wallet_fingerprint
+from exposure import ExposureBook
+from trade_history import TRADE_FIELDS
+from trade_result import PreparedTrade, TradeResult, TradeStatus
+from pipeline import PipelineStage, RateLimiter, StagePipeline
+from rpc_client import JsonRpcClient, NonceManager
+from scheduler import LATE, FairScheduler
+from session_profiler import SessionProfiler
+import tracing
+from tracing import Tracer
+from tx_ids import TxIdGenerator, format_tx_id, node_id_from_config
+
+if TYPE_CHECKING:
+    from order_signing import OrderSigner
+    from session_config import SessionConfig
 
 # Setup logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Seconds between scheduler weight refreshes from exposure while config exposure_priority is set
+EXPOSURE_REWEIGHT_INTERVAL = 0.25
+
+
+def order_signer_from_config(config: Dict) -> Optional['OrderSigner']:
+    """OrderSigner for config['order_signing']; eth_keys is only imported for signed sessions"""
+    if not config.get('order_signing'):
+        return None
+    from order_signing import OrderSigner
+    return OrderSigner.from_config(config)
+
+
+def session_traced(method: Callable) -> Callable:
+    """Run a session entry point with the session's tracer (if any) as the process-wide one
+
+    The previous tracer is put back, and the session's flushed, when it returns.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with tracing.use_tracer(self.tracer):
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class WalletManager:
-    def __init__(self, keys_file: str = "wallet_keys.txt"):
+    def __init__(self, keys_file: str = "wallet_keys.txt", keystore_dir: Optional[str] = None,
+                 keystore_password: Optional[str] = None, unlock_workers: Optional[int] = None):
         self.keys_file = keys_file
-        self.wallets = self._load_wallets()
+        # With keystore_dir, wallets is an UnlockedKeys sequence that fills in as keys decrypt
+        self.keystore_dir = keystore_dir
+        self.keystore_password = keystore_password
+        if keystore_dir:
+            if not keystore_password:
+                raise ValueError("keystore_dir needs a keystore password")
+            self.wallets = UnlockedKeys(keystore_files(keystore_dir), keystore_password, unlock_workers)
+        else:
+            self.wallets = self._load_wallets()
         if not self.wallets:  # Checking the available wallets after downloading
             logging.error("[ERROR] No available wallets fro making transactions.")
-        logging.info(f"Loaded wallets: {self.wallets}")
+        logging.info(f"Loaded wallets: {len(self.wallets)}")
 
     def _load_wallets(self) -> List[str]:
         """Load wallet private keys from file"""
@@ -33,15 +84,21 @@ class WalletManager:
             # wallets = [tuple(line.strip().split()) for line in f if line.strip()]
             # WRITE AS A STRING
             wallets = [line.strip() for line in f if line.strip()]
-            logging.info(f"Wallets loaded: {wallets}")
+            logging.info(f"Wallets loaded from {self.keys_file}: {len(wallets)}")
             return wallets
 
     def add_wallet(self, private_key: str):
         """Add new wallet to the list"""
+        if self.keystore_dir:
+            path = write_keystore(self.keystore_dir, keystore_name(len(self.wallets)),
+                                  private_key, self.keystore_password)
+            self.wallets.append(path, private_key)
+            logging.info(f"Added wallet keystore: {os.path.basename(path)}")
+            return
         with open(self.keys_file, 'a') as f:
             f.write(f"{private_key}\n")
         self.wallets.append(private_key)
-        logging.info(f"Added wallet: {private_key}")
+        logging.info(f"Added wallet #{len(self.wallets)}")
 
     def get_next_wallet(self, index: int) -> str:
         if 0 <= index < len(self.wallets):
@@ -80,11 +137,17 @@ class ProxyManager:
             logging.info(f"Proxies loaded: {proxies}")
             return proxies
 
+    def proxy_index(self, account_id: int) -> int:
+        """Which proxy an account uses; accounts with the same index share it"""
+        return account_id % len(self.proxies)
+
+    @tracing.traced('trade.proxy')
     def get_proxy(self, account_id: int) -> Dict:
         """Get proxy for specific account"""
-        proxy = self.proxies[account_id % len(self.proxies)]
+        proxy = self.proxies[self.proxy_index(account_id)]
         logging.info(f"Using proxy for account {account_id}: {proxy}")
         if self.proxy_type == "mobile" and 'refresh_link' in proxy:
+            import requests
             requests.get(proxy['refresh_link'])
             logging.info(f"Refreshed mobile proxy: {proxy['refresh_link']}")
         return proxy
@@ -93,7 +156,18 @@ class ProxyManager:
 class TransactionManager:
     """Handles trading transactions without Web3 dependency"""
 
-    def __init__(self):
+    def __init__(self, id_generator: Optional[TxIdGenerator] = None,
+                 order_signer: Optional['OrderSigner'] = None, max_batch_size: int = 10,
+                 nonce_manager: Optional[NonceManager] = None):
+        self.id_generator = id_generator or TxIdGenerator()
+        # EIP-712 order signatures when configured, HMAC otherwise
+        self.order_signer = order_signer
+        # Signed orders carry the wallet's chain nonce when set, their order id otherwise
+        self.nonce_manager = nonce_manager if order_signer else None
+        # Orders per signature and request in execute_trades; 1 for venues without batch orders
+        self.max_batch_size = max(1, max_batch_size)
+        # listener(results, submitted_at, latency) after each request, e.g. a WorkloadRecorder
+        self.submit_listeners: List[Callable[[List[TradeResult], float, float], None]] = []
         self.user_agents = [
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
@@ -113,69 +187,266 @@ class TransactionManager:
         return b64encode(signature).decode('utf-8')
 
     def execute_trade(self, wallet_key: str, asset: str, direction: str,
-                      size: float, proxy: Dict) -> Dict[str, Any]:
+                      size: float, proxy: Dict) -> TradeResult:
         """Execute trade with given parameters"""
+        prepared = self.prepare_trade(wallet_key, asset, direction, size)
+        if isinstance(prepared, TradeResult):
+            return prepared
+        return self.submit_trade(prepared, proxy)
+
+    @tracing.traced('trade.sign')
+    def prepare_trade(self, wallet_key: str, asset: str, direction: str,
+                      size: float) -> Union[PreparedTrade, TradeResult]:
+        """Validate and sign a trade (CPU only); a failed TradeResult if it cannot go ahead"""
+        tx_id = None
+        nonce = None
         try:
             # Generate transaction ID
-            tx_id = f"tx_{int(time.time())}_{random.randint(1000, 9999)}"
-            logging.info(f"Executing trade: {tx_id} for {wallet_key} - {direction} {size} of {asset}")
-
-            # Simulate transaction validation
-            if size > 10000:
-                logging.warning(f"Trade failed for {wallet_key}: Insufficient balance")
-                return {
-                    'status': 'failed',
-                    'error': 'Insufficient balance',
-                    'timestamp': datetime.now().isoformat(),
-                    'tx_id': tx_id
-                }
+            order_id = self.id_generator.next_id()
+            tx_id = format_tx_id(order_id)
+            logging.info(f"Executing trade: {tx_id} for {wallet_key[:8]} - {direction} {size} of {asset}")
+
+            rejected = self._validate(tx_id, size)
+            if rejected:
+                return rejected
+
+            # Generate signature
+            if self.order_signer:
+                nonce = self._next_nonce(wallet_key)
+                order = self.order_signer.build_order(wallet_key, asset, direction, size,
+                                                      nonce=order_id if nonce is None else nonce)
+                signature = self.order_signer.sign_order(wallet_key, order)
+            else:
+                message = f"{tx_id}:{asset}:{direction}:{size}"
+                signature = self._generate_signature(wallet_key, message)
+            return PreparedTrade(tx_id, wallet_key, asset, direction, size, signature, nonce)
+
+        except Exception as e:
+            logging.error(f"Trade execution failed: {str(e)}")
+            if nonce is not None:
+                self._release_nonce(wallet_key, nonce)
+            return TradeResult.failed(str(e), time.time(), tx_id)
+
+    def _validate(self, tx_id: str, size: float) -> Optional[TradeResult]:
+        """Simulated transaction validation: the failed result of an order that cannot go ahead"""
+        if size > 10000:
+            logging.warning(f"Trade {tx_id} failed: Insufficient balance")
+            return TradeResult.failed('Insufficient balance', time.time(), tx_id)
+        return None
+
+    def _next_nonce(self, wallet_key: str) -> Optional[int]:
+        if not self.nonce_manager:
+            return None
+        return self.nonce_manager.next_nonce(self.order_signer.address(wallet_key))
+
+    def discard(self, prepared: PreparedTrade):
+        """A prepared trade that will not be submitted; its nonce is handed back"""
+        if prepared.nonce is not None:
+            self._release_nonce(prepared.wallet_key, prepared.nonce)
+
+    def _release_nonce(self, wallet_key: str, nonce: int):
+        """Hand back the nonce of an order that was not accepted"""
+        try:
+            self.nonce_manager.release(self.order_signer.address(wallet_key), nonce)
+        except Exception as e:
+            logging.error(f"Releasing nonce {nonce} of {wallet_key[:8]} failed: {str(e)}")
+
+    @tracing.traced('trade.submit')
+    def submit_trade(self, prepared: PreparedTrade, proxy: Dict) -> TradeResult:
+        """Send a prepared trade through the wallet's proxy (network bound)"""
+        return self.submit_trades([prepared], proxy)[0]
+
+    def execute_trades(self, wallet_key: str, orders: List[Dict[str, Any]], proxy: Dict) -> List[TradeResult]:
+        """Execute several orders (dicts with asset, direction and size) of one wallet
+
+        Orders go out max_batch_size at a time, each batch under one signature
+        and in one request; results come back in order. A batch of one goes
+        through execute_trade.
+        """
+        results: List[TradeResult] = []
+        for start in range(0, len(orders), self.max_batch_size):
+            batch = orders[start:start + self.max_batch_size]
+            if len(batch) == 1:
+                order = batch[0]
+                results.append(self.execute_trade(wallet_key, order['asset'], order['direction'],
+                                                  order['size'], proxy))
+                continue
+            prepared = self.prepare_trades(wallet_key, batch)
+            submitted = iter(self.submit_trades(
+                [entry for entry in prepared if isinstance(entry, PreparedTrade)], proxy
+            ))
+            results.extend(entry if isinstance(entry, TradeResult) else next(submitted) for entry in prepared)
+        return results
+
+    @tracing.traced('trade.sign')
+    def prepare_trades(self, wallet_key: str,
+                       orders: List[Dict[str, Any]]) -> List[Union[PreparedTrade, TradeResult]]:
+        """Validate every order and sign the accepted ones with a single signature"""
+        entries: List[Union[Tuple[int, str, Dict[str, Any]], TradeResult]] = []
+        for order in orders:
+            order_id = self.id_generator.next_id()
+            tx_id = format_tx_id(order_id)
+            entries.append(self._validate(tx_id, order['size']) or (order_id, tx_id, order))
+        accepted = [entry for entry in entries if not isinstance(entry, TradeResult)]
+        logging.info(f"Executing batch of {len(accepted)} trades: {', '.join(tx_id for _, tx_id, _ in accepted)}")
+        if not accepted:
+            return entries
+
+        nonces: List[Optional[int]] = []
+        try:
+            if self.order_signer:
+                for _ in accepted:
+                    nonces.append(self._next_nonce(wallet_key))
+                signature = self.order_signer.sign_order_batch(wallet_key, [
+                    self.order_signer.build_order(wallet_key, order['asset'], order['direction'],
+                                                  order['size'], nonce=order_id if nonce is None else nonce)
+                    for (order_id, _, order), nonce in zip(accepted, nonces)
+                ])
+            else:
+                message = "\n".join(f"{tx_id}:{order['asset']}:{order['direction']}:{order['size']}"
+                                    for _, tx_id, order in accepted)
+                signature = self._generate_signature(wallet_key, message)
+        except Exception as e:
+            logging.error(f"Trade execution failed: {str(e)}")
+            for nonce in reversed(nonces):
+                if nonce is not None:
+                    self._release_nonce(wallet_key, nonce)
+            return [entry if isinstance(entry, TradeResult) else TradeResult.failed(str(e), time.time(), entry[1])
+                    for entry in entries]
+
+        nonces_left = iter(nonces or [None] * len(accepted))
+        return [
+            entry if isinstance(entry, TradeResult)
+            else PreparedTrade(entry[1], wallet_key, entry[2]['asset'], entry[2]['direction'],
+                               entry[2]['size'], signature, next(nonces_left))
+            for entry in entries
+        ]
 
+    def submit_trades(self, prepared: List[PreparedTrade], proxy: Dict) -> List[TradeResult]:
+        """Send prepared trades of one wallet in a single request"""
+        submitted_at = time.time()
+        started = time.perf_counter()
+        results = self._send(prepared, proxy)
+        latency = time.perf_counter() - started
+        # Newest first, so each release hands back the wallet's last issued nonce
+        for trade, result in reversed(list(zip(prepared, results))):
+            if trade.nonce is not None and result.status is not TradeStatus.SUCCESS:
+                self._release_nonce(trade.wallet_key, trade.nonce)
+        for listener in self.submit_listeners:
+            try:
+                listener(results, submitted_at, latency)
+            except Exception as e:
+                logging.error(f"Submit listener failed: {str(e)}")
+        return results
+
+    def _send(self, prepared: List[PreparedTrade], proxy: Dict) -> List[TradeResult]:
+        """The venue request itself; simulated here, overridden by stand-in backends"""
+        try:
             # Simulate transaction processing delay
             time.sleep(random.uniform(0.5, 2.0))
 
-            # Generate signature
-            message = f"{tx_id}:{asset}:{direction}:{size}"
-            signature = self._generate_signature(wallet_key, message)
-
-            logging.info(f"Trade executed successfully: {tx_id}")
-            return {
-                'status': 'success',
-                'transaction_hash': tx_id,
-                'signature': signature,
-                'timestamp': datetime.now().isoformat(),
-                'details': {
-                    'asset': asset,
-                    'direction': direction,
-                    'size': size,
-                    'wallet': wallet_key[:10] + '...'
-                }
-            }
+            results = []
+            for trade in prepared:
+                logging.info(f"Trade executed successfully: {trade.tx_id}")
+                results.append(TradeResult.success(trade.tx_id, time.time(), trade.wallet_key, trade.asset,
+                                                   trade.direction, trade.size, trade.signature))
+            return results
 
         except Exception as e:
             logging.error(f"Trade execution failed: {str(e)}")
-            return {
-                'status': 'failed',
-                'error': str(e),
-                'timestamp': datetime.now().isoformat()
-            }
+            return [TradeResult.failed(str(e), time.time(), trade.tx_id) for trade in prepared]
 
 
 class TradingSession:
     def __init__(self, config: Dict):
         self.config = config
-        self.wallet_manager = WalletManager(config.get('keys_file', 'wallet_keys.txt'))
+        # Imported here so that importing this module does not load pydantic
+        from session_config import SessionConfig
+        # Hot paths read this snapshot; reconfigure() swaps in a new one while the session runs
+        self.settings = SessionConfig.from_config(config)
+        self._reconfigure_lock = threading.Lock()
+        self.wallet_manager = WalletManager(
+            config.get('keys_file', 'wallet_keys.txt'), config.get('keystore_dir'),
+            keystore_password(config), config.get('unlock_workers')
+        )
         # var.wallet_manager
         self.proxy_manager = ProxyManager(
             config.get('proxy_file', 'proxies.txt'),
             config.get('proxy_type', 'regular')
         )
-        self.transaction_manager = TransactionManager()
+        # Chain reads go through web3_provider, when configured, in batches
+        self.rpc_client = JsonRpcClient.from_config(config)
+        self.nonce_manager = NonceManager(self.rpc_client) if self.rpc_client else None
+        self.transaction_manager = TransactionManager(
+            TxIdGenerator(node_id_from_config(config)),
+            order_signer_from_config(config),
+            self.settings.max_batch_size,
+            self.nonce_manager
+        )
+        # Pre-trade feasibility check against cached wallet balances
+        self.balance_cache = BalanceCache(
+            balance_source_from_config(config, self.rpc_client), config.get('balance_ttl', 30)
+        ) if config.get('balance_check') else None
         self.setup_logging()
+        self._csv_lock = threading.Lock()
+        self.trade_listeners: List[Callable[[Dict[str, Any], str], None]] = []
+        # Net and gross exposure of filled legs, updated as each result is recorded
+        self._wallet_indexes: Dict[str, int] = {}
+        self.exposure = ExposureBook(self._wallet_proxy)
+        self.add_trade_listener(self.exposure)
         self.csv_file = self._setup_csv_file()
+        # None unless config['profile'] is set, so sessions without it pay nothing
+        self.profiler = SessionProfiler.from_config(config, self.csv_file)
+        # Spans go to a local OTLP/JSON file when config['tracing'] is set
+        # Process-wide only while one of this session's runs is going, see session_traced
+        self.tracer = Tracer.from_config(config, self.csv_file)
+        # Stage stats of the running (or last) staged plan, see execute_staged_plan
+        self.pipeline: Optional[StagePipeline] = None
+        self.pipeline_stats: Dict[str, Dict[str, Any]] = {}
+        # Fair scheduler feeding the staged pipeline when config['scheduler'] is 'fair'
+        self.scheduler: Optional[FairScheduler] = None
+        self.submit_limiter = RateLimiter(self.settings.submit_rate)
+
+    def reconfigure(self, changes: Dict[str, Any]) -> 'SessionConfig':
+        """Validate config changes and swap them in while the session runs
+
+        Legs already in flight finish on the snapshot they started with.
+        Stage worker counts and queue bounds of a running staged plan are
+        resized in place, so proxy and connection pools stay warm; the
+        submit rate, batch size and scheduler weights apply from the next
+        trade, and plan-building keys from the next plan. Raises ValueError,
+        leaving the session as it was, for an invalid value or a change to
+        a setting read only at start-up (session_config.RESTART_KEYS).
+        """
+        from session_config import SessionConfig, restart_keys_changed
+        with self._reconfigure_lock:
+            restart = restart_keys_changed(self.config, changes)
+            if restart:
+                raise ValueError(f"{', '.join(restart)} cannot change while the session runs")
+            config = dict(self.config, **changes)
+            settings = SessionConfig.from_config(config)
+            previous, self.settings, self.config = self.settings, settings, config
+            self._apply_settings(previous, settings)
+        logging.info(f"Reconfigured session: {', '.join(sorted(changes))}")
+        return settings
+
+    def _apply_settings(self, previous: 'SessionConfig', settings: 'SessionConfig'):
+        """Push a new snapshot into the long-lived objects that copied values from the old one"""
+        self.transaction_manager.max_batch_size = settings.max_batch_size
+        self.submit_limiter.rate = settings.submit_rate
+        if self.pipeline:
+            for stage in self.pipeline.stages:
+                workers = settings.concurrency(stage.name)
+                queue_size = settings.pipeline_queue_size
+                if workers != previous.concurrency(stage.name) or queue_size != previous.pipeline_queue_size:
+                    self.pipeline.resize(stage.name, workers, queue_size)
+        if self.scheduler and (settings.asset_weights != previous.asset_weights
+                               or settings.proxy_weights != previous.proxy_weights):
+            self.scheduler.reweight()
 
     def setup_logging(self):
         """Setup logging configuration"""
-        if self.config.get('enable_logs', True):
+        if self.settings.enable_logs:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             log_filename = f"trading_{len(self.wallet_manager.wallets)}_{timestamp}.txt"
             logging.basicConfig(
@@ -190,54 +461,100 @@ class TradingSession:
         csv_filename = f"trade_results_{timestamp}.csv"
 
         # Create directory if it doesn't exist
-        os.makedirs('trade_results', exist_ok=True)
-        csv_path = os.path.join('trade_results', csv_filename)
+        results_dir = self.config.get('results_dir', 'trade_results')
+        os.makedirs(results_dir, exist_ok=True)
+        csv_path = os.path.join(results_dir, csv_filename)
 
         # Write CSV header
         with open(csv_path, 'w', newline='') as csvfile:
-            fieldnames = ['timestamp', 'wallet', 'asset', 'direction', 'size',
-                          'status', 'transaction_hash', 'error']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=TRADE_FIELDS)
             writer.writeheader()
 
         logging.info(f"Created CSV file for trade results: {csv_path}")
         return csv_path
 
-    def _record_trade_to_csv(self, result: Dict[str, Any], wallet: str):
+    @tracing.traced('trade.record')
+    def _record_trade_to_csv(self, result: Union[TradeResult, Dict[str, Any]], wallet: str,
+                             branch: Optional[int] = None):
         """Record trade result to CSV file"""
-        with open(self.csv_file, 'a', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=[
-                'timestamp', 'wallet', 'asset', 'direction', 'size',
-                'status', 'transaction_hash', 'error'
-            ])
-
-            # Prepare row data
-            row = {
-                'timestamp': result.get('timestamp', datetime.now().isoformat()),
-                # 'wallet': wallet[:10] + '...' if wallet else 'unknown',
-                'wallet': wallet if wallet else 'unknown',
-                'status': result.get('status', 'unknown'),
-                'transaction_hash': result.get('transaction_hash', ''),
-                'error': result.get('error', '')
-            }
-
-            # Add details if available
-            if 'details' in result:
-                row['asset'] = result['details'].get('asset', '')
-                row['direction'] = result['details'].get('direction', '')
-                row['size'] = result['details'].get('size', '')
+        if isinstance(result, TradeResult):
+            row = result.to_csv_row(wallet, branch)
+        else:
+            row = self._dict_result_row(result, wallet, branch)
 
+        with self._csv_lock, open(self.csv_file, 'a', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=TRADE_FIELDS)
             writer.writerow(row)
-            logging.info(f"Recorded trade result to CSV: {row}")
+            logging.info(f"Recorded trade result to CSV: {dict(row, wallet=row['wallet'][:8])}")
+
+        for listener in self.trade_listeners:
+            try:
+                listener(row, self.csv_file)
+            except Exception as e:
+                logging.error(f"Trade listener failed: {str(e)}")
+
+    def _dict_result_row(self, result: Dict[str, Any], wallet: str, branch: Optional[int] = None) -> Dict[str, Any]:
+        """CSV row for a result given as a plain dict"""
+        # Prepare row data
+        row = {
+            'timestamp': result.get('timestamp', datetime.now().isoformat()),
+            # 'wallet': wallet[:10] + '...' if wallet else 'unknown',
+            'wallet': wallet if wallet else 'unknown',
+            'status': result.get('status', 'unknown'),
+            'transaction_hash': result.get('transaction_hash', ''),
+            'error': result.get('error', ''),
+            'branch': '' if branch is None else branch
+        }
+
+        # Add details if available
+        if 'details' in result:
+            row['asset'] = result['details'].get('asset', '')
+            row['direction'] = result['details'].get('direction', '')
+            row['size'] = result['details'].get('size', '')
+        return row
+
+    def start_profiling(self):
+        if self.profiler:
+            self.profiler.start()
+
+    def stop_profiling(self) -> Dict[str, str]:
+        """Stop the profiler and write its reports next to the CSV file"""
+        if self.profiler:
+            return self.profiler.stop()
+        return {}
+
+    def profile_phase(self, phase: str):
+        """Mark a phase boundary for the profiler's allocation and timing report"""
+        if self.profiler:
+            self.profiler.mark(phase)
+
+    def add_trade_listener(self, listener: Callable[[Dict[str, Any], str], None]):
+        """Call listener(row, csv_path) after each trade result is written to CSV"""
+        self.trade_listeners.append(listener)
+
+    def _wallet_proxy(self, wallet: str) -> Optional[int]:
+        """Proxy index of a wallet key, looked up once per wallet
+
+        wallets.index() never waits on keystores that are still unlocking
+        or fails on ones that could not be, as walking the list would.
+        """
+        index = self._wallet_indexes.get(wallet)
+        if index is None:
+            try:
+                index = self._wallet_indexes[wallet] = self.wallet_manager.wallets.index(wallet)
+            except ValueError:
+                return None
+        if not self.proxy_manager.proxies:
+            return None
+        return self.proxy_manager.proxy_index(index)
 
     def execute_parallel_trading(self):
         """Execute trading in parallel threads"""
-        thread_count = self.config.get('thread_count', 10)
+        thread_count = self.settings.thread_count
         # delay_range = self.config.get('launch_delay', (0, 3600))#SHORTEN MAX DELAY RANGE
-        delay_range = self.config.get('launch_delay', (0, 20))
 
         wallets = self.wallet_manager.wallets.copy()
-        if self.config.get('enable_shuffling', True):
+        if self.settings.enable_shuffling:
             random.shuffle(wallets)
 
         x = wallets
@@ -245,17 +562,20 @@ class TradingSession:
         for i in range(0, len(wallets), thread_count):
             batch = wallets[i:i + thread_count]
             for wallet in batch:
+                # Read per wallet, so a reconfigured launch_delay applies to the rest of the run
+                delay_range = self.settings.launch_delay
                 delay = random.uniform(delay_range[0], delay_range[1])
                 time.sleep(delay)
                 self._process_wallet(wallet)
 
     def execute_branch_trading(self):
         """Execute trading with branches"""
-        branch_range = self.config.get('branch_wallet_range', (2, 5))
-        max_branches = self.config.get('max_parallel_branches', 5)
+        settings = self.settings
+        branch_range = settings.branch_wallet_range
+        max_branches = settings.max_parallel_branches
 
         wallets = self.wallet_manager.wallets.copy()
-        if self.config.get('enable_shuffling', True):
+        if settings.enable_shuffling:
             random.shuffle(wallets)
 
         active_branches = 0
@@ -273,10 +593,11 @@ class TradingSession:
 
             w = branch_wallets
             # Process branch
-            self._process_branch(branch_wallets, long_count, short_count)
+            self._process_branch(branch_wallets, long_count, short_count, branch=active_branches)
             o = active_branches
             active_branches += 1
 
+    @tracing.traced('trade')
     def _process_wallet(self, wallet_key: str):
         if not self.wallet_manager.wallets:  # Additional check prior to the trade
             return  # Exit if no available wallets
@@ -293,21 +614,28 @@ class TradingSession:
         )
 
         # Execute trade based on configuration
-        asset = random.choice(self.config.get('trading_assets', ['BTC', 'ETH', 'SOL']))
+        asset = random.choice(self.settings.trading_assets)
         direction = self._get_trade_direction()
         size = self._get_trade_size()
 
+        size, skipped = self._reserve_balance(wallet_key, asset, direction, size)
+        if skipped:
+            return
+
         result = self.transaction_manager.execute_trade(
             wallet_key, asset, direction, size, proxy
         )
+        if self.balance_cache and result.get('status') != 'success':
+            self.balance_cache.release(wallet_key, size)
 
         # Record trade result to CSV
         self._record_trade_to_csv(result, wallet_key)
 
-        if self.config.get('enable_logs', True):
+        if self.settings.enable_logs:
             logging.info(f"Wallet {wallet_key[:8]}: {result}")
 
-    def _process_branch(self, wallets: List[str], long_count: int, short_count: int):
+    def _process_branch(self, wallets: List[str], long_count: int, short_count: int,
+                        branch: Optional[int] = None):
         """Process branch of wallets"""
         total_size = self._get_trade_size()
 
@@ -315,60 +643,394 @@ class TradingSession:
         if long_count > 0:
             long_size = total_size / long_count
             for wallet in wallets[:long_count]:
-                self._process_wallet_with_size(wallet, "long", long_size)
+                self._process_wallet_with_size(wallet, "long", long_size, branch=branch)
 
         # Process short positions
         if short_count > 0:
             short_size = total_size / short_count
             for wallet in wallets[long_count:]:
-                self._process_wallet_with_size(wallet, "short", short_size)
+                self._process_wallet_with_size(wallet, "short", short_size, branch=branch)
 
     def _get_trade_direction(self) -> str:
         """Determine trade direction based on configuration"""
-        direction_config = self.config.get('position_direction', 'random')
+        direction_config = self.settings.position_direction
         if direction_config == 'random':
             return random.choice(['long', 'short'])
         return direction_config
 
     def _get_trade_size(self) -> float:
         """Determine trade size based on configuration"""
-        volume_range = self.config.get('volume_percentage_range', (10, 50))
-        b = random.uniform(*volume_range)
+        volume_range = self.settings.volume_percentage_range
         return random.uniform(*volume_range)
 
-    def _process_wallet_with_size(self, wallet: str, direction: str, size: float) -> Dict[str, Any]:
+    @tracing.traced('trade')
+    def _process_wallet_with_size(self, wallet: str, direction: str, size: float,
+                                  asset: Optional[str] = None,
+                                  branch: Optional[int] = None,
+                                  wallet_index: Optional[int] = None) -> Dict[str, Any]:
         """Process wallet with specific size and return result"""
-        proxy = self.proxy_manager.get_proxy(
-            self.wallet_manager.wallets.index(wallet)
-        )
+        if asset is None:
+            asset = random.choice(self.settings.trading_assets)
+
+        size, skipped = self._reserve_balance(wallet, asset, direction, size, branch)
+        if skipped:
+            return skipped
+
+        if wallet_index is None:
+            wallet_index = self.wallet_manager.wallets.index(wallet)
+        proxy = self.proxy_manager.get_proxy(wallet_index)
         p = wallet
-        asset = random.choice(self.config.get('trading_assets', ['BTC', 'ETH', 'SOL']))
 
         result = self.transaction_manager.execute_trade(
             wallet, asset, direction, size, proxy
         )
+        if self.balance_cache and result.get('status') != 'success':
+            self.balance_cache.release(wallet, size)
 
         # Record trade result to CSV
-        self._record_trade_to_csv(result, wallet)
+        self._record_trade_to_csv(result, wallet, branch)
 
-        if self.config.get('enable_logs', True):
+        if self.settings.enable_logs:
             logging.info(f"Branch trade - Wallet {wallet[:8]}: {result}")
 
         return result
 
+    def _reserve_balance(self, wallet: str, asset: str, direction: str, size: float,
+                         branch: Optional[int] = None) -> Tuple[float, Optional[TradeResult]]:
+        """Debit the feasible size from the balance cache; a recorded skip if there is none"""
+        if not self.balance_cache:
+            return size, None
+        feasible = self.balance_cache.feasible_size(wallet, size, self.settings.min_trade_size)
+        if not feasible or not self.balance_cache.reserve(wallet, feasible):
+            result = TradeResult.skipped('Insufficient balance', time.time(), wallet, asset, direction, size)
+            self._record_trade_to_csv(result, wallet, branch)
+            logging.info(f"Skipped infeasible trade for wallet {wallet[:8]}")
+            return size, result
+        return feasible, None
+
+    def build_plan(self, execution_mode: str = "parallel", seed: Optional[int] = None) -> ExecutionPlan:
+        """Precompute every random choice of a session as an ExecutionPlan"""
+        return plan_session(self.config, self.wallet_manager.wallets, execution_mode, seed)
+
+    def _start_plan(self, plan: ExecutionPlan) -> ExecutionPlan:
+        """Check the plan against the wallet list and drop or shrink infeasible legs"""
+        wallets = self.wallet_manager.wallets
+        if plan.fingerprint != wallet_fingerprint(wallets):
+            raise ValueError("Execution plan was built for a different wallet list")
+
+        if self.balance_cache:
+            # Wallets whose keystore failed have no key to check; their legs fail when traded
+            keys = {index: self._wallet_key(index) for index in sorted(set(plan.wallet))}
+            planned = [index for index, key in keys.items() if key]
+            balances = self.balance_cache.snapshot(keys[index] for index in planned)
+            available = {index: balances[keys[index]] for index in planned if keys[index] in balances}
+            plan, stats = plan.filter_feasible(available, self.settings.min_trade_size)
+            self.profile_phase('balance_check')
+            logging.info(f"Balance check: {stats['kept']} legs kept, {stats['resized']} resized, "
+                         f"{stats['dropped']} dropped")
+            refresh_interval = self.config.get('balance_refresh_interval')
+            if refresh_interval:
+                self.balance_cache.start(lambda: [keys[index] for index in planned], refresh_interval)
+        return plan
+
+    def _wallet_key(self, index: int) -> str:
+        """Key of a wallet by index, '' if its keystore could not be unlocked"""
+        try:
+            return self.wallet_manager.wallets[index]
+        except KeystoreError:
+            return ''
+
+    @session_traced
+    def execute_plan(self, plan: ExecutionPlan):
+        """Execute a precomputed plan, honouring each leg's launch offset
+
+        Consecutive legs due at the same time (a branch, or parallel legs
+        without launch delay) are traded as one group: see _process_leg_group.
+        """
+        plan = self._start_plan(plan)
+        logging.info(f"Executing {plan.mode} plan with {len(plan)} legs")
+        start = time.monotonic()
+        try:
+            for group in self._leg_groups(plan):
+                delay = start + group[0]['launch_at'] - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self._process_leg_group(group)
+        finally:
+            if self.balance_cache:
+                self.balance_cache.stop()
+        self.profile_phase('execute_plan')
+
+    def _leg_groups(self, plan: ExecutionPlan) -> Iterator[List[Dict[str, Any]]]:
+        """Runs of consecutive legs with the same launch offset, at most leg_group_size long"""
+        group_size = self.settings.leg_group_size
+        group: List[Dict[str, Any]] = []
+        for index in range(len(plan)):
+            leg = plan.leg(index)
+            if group and (leg['launch_at'] != group[0]['launch_at'] or len(group) >= group_size):
+                yield group
+                group = []
+            group.append(leg)
+        if group:
+            yield group
+
+    def _process_leg_group(self, legs: List[Dict[str, Any]]):
+        """Trade legs due together: one proxy lookup per shared proxy, one batch per wallet"""
+        wallets = self.wallet_manager.wallets
+        by_proxy: Dict[int, Dict[int, List[Dict[str, Any]]]] = {}
+        for leg in legs:
+            by_proxy.setdefault(self.proxy_manager.proxy_index(leg['wallet']), {}) \
+                .setdefault(leg['wallet'], []).append(leg)
+
+        for wallet_legs in by_proxy.values():
+            proxy = None
+            for wallet_index, group in wallet_legs.items():
+                try:
+                    wallet = wallets[wallet_index]
+                except KeystoreError as e:
+                    for leg in group:
+                        result = TradeResult.failed(f"Wallet {wallet_index} is locked: {str(e)}", time.time())
+                        self._record_trade_to_csv(result, '', leg['branch'])
+                    continue
+                orders = []
+                for leg in group:
+                    leg['size'], skipped = self._reserve_balance(
+                        wallet, leg['asset'], leg['direction'], leg['size'], leg['branch']
+                    )
+                    if not skipped:
+                        orders.append(leg)
+                if not orders:
+                    continue
+                if proxy is None:
+                    # Mobile proxies refresh once for all wallets behind them
+                    try:
+                        proxy = self.proxy_manager.get_proxy(wallet_index)
+                    except Exception as e:
+                        # The next wallet behind this proxy tries the lookup again
+                        logging.error(f"Proxy lookup for wallet {wallet_index} failed: {str(e)}")
+                        for leg in orders:
+                            if self.balance_cache:
+                                self.balance_cache.release(wallet, leg['size'])
+                            result = TradeResult.failed(f"Proxy lookup failed: {str(e)}", time.time())
+                            self._record_trade_to_csv(result, wallet, leg['branch'])
+                        continue
+
+                with tracing.span('trade', wallet=wallet_index, orders=len(orders)):
+                    results = self.transaction_manager.execute_trades(wallet, orders, proxy)
+                    for leg, result in zip(orders, results):
+                        if self.balance_cache and result.get('status') != 'success':
+                            self.balance_cache.release(wallet, leg['size'])
+                        self._record_trade_to_csv(result, wallet, leg['branch'])
+                        if self.settings.enable_logs:
+                            logging.info(f"Plan trade - Wallet {wallet[:8]}: {result}")
+
+    @session_traced
+    def execute_staged_plan(self, plan: ExecutionPlan) -> Dict[str, Dict[str, Any]]:
+        """Execute a plan through plan -> proxy -> sign -> submit -> record stages
+
+        Each stage has its own workers (config '<stage>_concurrency') and a
+        bounded queue in front of it (pipeline_queue_size), so a slow proxy
+        refresh or submit throttles the stages before it instead of piling
+        up legs in memory. The plan stage releases legs at their launch
+        offsets. Returns per-stage queue depth and utilisation; while the
+        plan runs, self.pipeline.stats() gives the live figures, and
+        reconfigure() can resize the stages.
+
+        With config['scheduler'] = 'fair', released legs wait in a
+        FairScheduler (see _scheduled_legs) instead of entering in plan
+        order, and legs that miss their launch_window are shed.
+        """
+        plan = self._start_plan(plan)
+        settings = self.settings
+        handlers = {'plan': self._plan_stage, 'proxy': self._proxy_stage, 'sign': self._sign_stage,
+                    'submit': self._submit_stage, 'record': self._record_stage}
+        self.pipeline = StagePipeline([
+            PipelineStage(name, handlers[name], workers=settings.concurrency(name),
+                          queue_size=settings.pipeline_queue_size)
+            for name in handlers
+        ], on_error=self._leg_failed)
+
+        logging.info(f"Executing {plan.mode} plan with {len(plan)} legs in stages")
+        start = time.monotonic()
+        if settings.scheduler == 'fair':
+            self.scheduler = FairScheduler(self._flow_weight, on_shed=self._shed_leg)
+            legs = self._scheduled_legs(plan, start)
+        else:
+            self.scheduler = None
+            legs = (dict(plan.leg(index), start=start) for index in range(len(plan)))
+        try:
+            self.pipeline_stats = self.pipeline.run(legs)
+        finally:
+            if self.balance_cache:
+                self.balance_cache.stop()
+        for stage, stats in self.pipeline_stats.items():
+            logging.info(f"Pipeline stage {stage}: {stats}")
+        if self.scheduler:
+            stats = self.scheduler.stats()
+            logging.info(f"Scheduler: {stats['dispatched']} legs dispatched, {stats['shed']} shed")
+        self.profile_phase('execute_staged_plan')
+        return self.pipeline_stats
+
+    def _scheduled_legs(self, plan: ExecutionPlan, start: float) -> Iterator[Dict[str, Any]]:
+        """Plan legs in fair scheduler order, each released at its launch offset
+
+        A leg joins the queue of its asset and proxy once its launch time
+        has passed, with a deadline of launch time plus launch_window (no
+        deadline without one). The pipeline pulls from here only when its
+        first queue has room, so while it is saturated released legs pile
+        up in the scheduler, and what goes next is decided by weight and
+        deadline rather than by the shuffled plan order.
+        """
+        launch_at = plan.launch_at
+        index = 0
+        next_reweight = start + EXPOSURE_REWEIGHT_INTERVAL
+        while True:
+            now = time.monotonic()
+            settings = self.settings
+            window = settings.launch_window
+            if settings.exposure_priority and now >= next_reweight:
+                self.scheduler.reweight()
+                next_reweight = now + EXPOSURE_REWEIGHT_INTERVAL
+            while index < len(plan) and start + launch_at[index] <= now:
+                leg = dict(plan.leg(index), start=start)
+                release = start + leg['launch_at']
+                leg['deadline'] = release + window if window is not None else None
+                leg['flow'] = (leg['asset'], self.proxy_manager.proxy_index(leg['wallet']))
+                # Without a window, legs of a queue go in launch order and are never shed
+                self.scheduler.push(leg, leg['flow'], release if window is None else leg['deadline'],
+                                    leg['deadline'])
+                index += 1
+            leg = self.scheduler.pop(now)
+            if leg is not None:
+                yield leg
+            elif index >= len(plan):
+                return
+            else:
+                time.sleep(max(0.0, start + launch_at[index] - time.monotonic()))
+
+    def _flow_weight(self, flow: Tuple[str, int]) -> float:
+        """Scheduler weight of an (asset, proxy index) queue: asset_weights x proxy_weights, default 1
+
+        With exposure_priority set, an asset whose filled legs so far lean
+        one way is weighted up by exposure_priority x |net / gross|, so the
+        legs still open on it (the other side of its branches) go sooner.
+        """
+        asset, proxy = flow
+        settings = self.settings
+        weight = settings.asset_weights.get(asset, 1.0) * settings.proxy_weights.get(str(proxy), 1.0)
+        if settings.exposure_priority:
+            weight *= 1.0 + settings.exposure_priority * abs(self.exposure.skew(asset))
+        return weight
+
+    def _shed_leg(self, leg: Dict[str, Any], reason: str):
+        """Record a leg that missed its launch window as skipped"""
+        wallet = self._wallet_key(leg['wallet'])
+        result = TradeResult.skipped(f"Missed launch window ({reason})", time.time(), wallet,
+                                     leg['asset'], leg['direction'], leg['size'])
+        self._record_trade_to_csv(result, wallet, leg['branch'])
+        logging.info(f"Shed {reason} trade for wallet {wallet[:8]}")
+
+    def _plan_stage(self, leg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Pipeline stage: wait for the leg's launch offset and reserve its balance"""
+        delay = leg['start'] + leg['launch_at'] - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        leg['wallet_key'] = self.wallet_manager.wallets[leg['wallet']]
+        # The trade span outlives this stage: each later stage re-activates it and the last ends it
+        leg['span'] = tracing.span('trade', wallet=leg['wallet'], asset=leg['asset'], staged=True)
+        with tracing.activate(leg['span']):
+            leg['size'], skipped = self._reserve_balance(
+                leg['wallet_key'], leg['asset'], leg['direction'], leg['size'], leg['branch']
+            )
+        if skipped:
+            leg['span'].end()
+            return None
+        leg['reserved'] = self.balance_cache is not None
+        return leg
+
+    def _proxy_stage(self, leg: Dict[str, Any]) -> Dict[str, Any]:
+        """Pipeline stage: proxy lookup, including any mobile IP refresh"""
+        with tracing.activate(leg['span']):
+            leg['proxy'] = self.proxy_manager.get_proxy(leg['wallet'])
+        return leg
+
+    def _sign_stage(self, leg: Dict[str, Any]) -> Dict[str, Any]:
+        """Pipeline stage: validate and sign; a failed check becomes the leg's result"""
+        with tracing.activate(leg['span']):
+            prepared = self.transaction_manager.prepare_trade(
+                leg['wallet_key'], leg['asset'], leg['direction'], leg['size']
+            )
+        leg['result' if isinstance(prepared, TradeResult) else 'prepared'] = prepared
+        return leg
+
+    def _submit_stage(self, leg: Dict[str, Any]) -> Dict[str, Any]:
+        """Pipeline stage: send the signed trade through the wallet's proxy, unless its window has passed
+
+        Sends are spaced to at most config submit_rate per second across workers.
+        """
+        if 'result' not in leg and leg.get('deadline') is not None and time.monotonic() > leg['deadline']:
+            self.scheduler.shed(leg['flow'], LATE)
+            self.transaction_manager.discard(leg['prepared'])
+            leg['result'] = TradeResult.skipped(f"Missed launch window ({LATE})", time.time(), leg['wallet_key'],
+                                                leg['asset'], leg['direction'], leg['size'])
+        if 'result' not in leg:
+            self.submit_limiter.acquire()
+            with tracing.activate(leg['span']):
+                leg['result'] = self.transaction_manager.submit_trade(leg['prepared'], leg['proxy'])
+        return leg
+
+    def _record_stage(self, leg: Dict[str, Any]) -> Dict[str, Any]:
+        """Pipeline stage: CSV row, trade listeners and log line"""
+        wallet, result = leg['wallet_key'], leg['result']
+        if leg.get('reserved') and result.get('status') != 'success':
+            self.balance_cache.release(wallet, leg['size'])
+        with tracing.activate(leg['span']):
+            self._record_trade_to_csv(result, wallet, leg['branch'])
+        leg['span'].set_attribute('status', str(result.get('status')))
+        leg['span'].end()
+        if self.settings.enable_logs:
+            logging.info(f"Staged trade - Wallet {wallet[:8]}: {result}")
+        return leg
+
+    def _leg_failed(self, stage: str, leg: Dict[str, Any], error: Exception):
+        """Pipeline error hook: a leg whose stage raised is recorded as failed
+
+        It still gets its CSV row, its balance reservation back and an ended
+        trade span, as if the record stage had seen it.
+        """
+        if 'wallet_key' not in leg:
+            leg['wallet_key'] = self._wallet_key(leg['wallet'])
+        if 'span' not in leg:
+            leg['span'] = tracing.span('trade', wallet=leg['wallet'], asset=leg['asset'], staged=True)
+        leg['span'].record_error(error)
+        if stage == 'submit' and 'prepared' in leg and 'result' not in leg:
+            self.transaction_manager.discard(leg['prepared'])
+        leg['result'] = TradeResult.failed(f"{stage} stage failed: {str(error)}", time.time())
+        if stage == 'record':
+            # Recording is what failed; do not try again, but do not leak the span
+            leg['span'].end()
+            return
+        self._record_stage(leg)
+
     # ADDITIONAL CODE
+    @session_traced
     def run_session(self, execution_mode: str = "parallel"):
         """Run the trading session based on the execution mode"""
         logging.info(f"Running session with execution mode: {execution_mode}")  # Output current mode
-        if execution_mode == "parallel":
-            logging.info("Execution mode is 'parallel', proceeding with parallel trading.")  # Для режима "parallel"
-            self.execute_parallel_trading()
-        elif execution_mode == "branch":
-            logging.info("Execution mode is 'branch', proceeding with branch trading.")  # Для режима "branch"
-            self.execute_branch_trading()
-        else:
-            logging.error(f"Invalid execution mode: {execution_mode}")  # Если режим некорректный
-            logging.error(f"Invalid execution mode: {execution_mode}")
+        self.start_profiling()
+        try:
+            if execution_mode == "parallel":
+                logging.info("Execution mode is 'parallel', proceeding with parallel trading.")  # Для режима "parallel"
+                self.execute_parallel_trading()
+            elif execution_mode == "branch":
+                logging.info("Execution mode is 'branch', proceeding with branch trading.")  # Для режима "branch"
+                self.execute_branch_trading()
+            else:
+                logging.error(f"Invalid execution mode: {execution_mode}")  # Если режим некорректный
+                logging.error(f"Invalid execution mode: {execution_mode}")
+            self.profile_phase(execution_mode)
+        finally:
+            self.stop_profiling()
 
 
 if __name__ == "__main__":
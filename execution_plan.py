@@ -0,0 +1,320 @@
+import argparse
+import bisect
+import hashlib
+import json
+import random
+from array import array
+from itertools import accumulate, chain, repeat
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PLAN_MAGIC = b'TPLAN1\n'
+
+LONG = 0
+SHORT = 1
+DIRECTIONS = ('long', 'short')
+
+# Column name -> array typecode
+COLUMNS = {
+    'wallet': 'I',     # index into the session's wallet list
+    'branch': 'i',     # branch number, -1 outside branch mode
+    'direction': 'b',  # LONG / SHORT
+    'size': 'd',
+    'asset': 'B',      # index into plan.assets
+    'launch_at': 'd',  # seconds after session start
+}
+
+
+def wallet_fingerprint(wallets: Sequence[str]) -> str:
+    """Identifies the wallet list a plan was built for without storing any key"""
+    if hasattr(wallets, 'fingerprint'):
+        # Keystore wallets hash their addresses, so plans need not wait for unlocking
+        return wallets.fingerprint()
+    return hashlib.sha256('\n'.join(wallets).encode('utf-8')).hexdigest()[:16]
+
+
+class ExecutionPlan:
+    """Array-backed session plan with one entry per trade leg
+
+    Columns are typed arrays (see COLUMNS), so a million-leg plan is a few
+    tens of megabytes, saves and loads as raw bytes and can be handed to any
+    executor. Legs are stored in execution order with non-decreasing
+    launch_at offsets.
+    """
+
+    def __init__(self, mode: str, assets: List[str], wallet_count: int,
+                 columns: Dict[str, array], seed: Optional[int] = None, fingerprint: str = ''):
+        self.mode = mode
+        self.assets = list(assets)
+        self.wallet_count = wallet_count
+        self.seed = seed
+        self.fingerprint = fingerprint
+        self.columns = columns
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Plan columns have different lengths: {lengths}")
+
+    def __len__(self) -> int:
+        return len(self.columns['size'])
+
+    def __getattr__(self, name: str) -> array:
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def leg(self, index: int) -> Dict[str, Any]:
+        """One leg as a dict with asset and direction names resolved"""
+        c = self.columns
+        return {
+            'wallet': c['wallet'][index],
+            'branch': c['branch'][index] if c['branch'][index] >= 0 else None,
+            'direction': DIRECTIONS[c['direction'][index]],
+            'size': c['size'][index],
+            'asset': self.assets[c['asset'][index]],
+            'launch_at': c['launch_at'][index]
+        }
+
+    def legs(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.leg(index)
+
+    def summary(self) -> Dict[str, Any]:
+        """Leg counts and volume per asset and direction"""
+        c = self.columns
+        per_asset = {asset: {'legs': 0, 'long': 0.0, 'short': 0.0} for asset in self.assets}
+        for asset, direction, size in zip(c['asset'], c['direction'], c['size']):
+            entry = per_asset[self.assets[asset]]
+            entry['legs'] += 1
+            entry['long' if direction == LONG else 'short'] += size
+        branches = {branch for branch in c['branch'] if branch >= 0}
+        return {
+            'mode': self.mode,
+            'legs': len(self),
+            'wallets': len(set(c['wallet'])),
+            'branches': len(branches),
+            'total_size': sum(c['size']),
+            'duration': c['launch_at'][-1] if len(self) else 0.0,
+            'assets': per_asset
+        }
+
+    def diff(self, other: 'ExecutionPlan') -> Dict[str, Any]:
+        """Which legs and columns differ between two plans"""
+        result: Dict[str, Any] = {'legs': (len(self), len(other)), 'columns': {}}
+        if self.assets != other.assets:
+            result['assets'] = (self.assets, other.assets)
+        common = min(len(self), len(other))
+        for name in COLUMNS:
+            mine, theirs = self.columns[name], other.columns[name]
+            changed = [index for index in range(common) if mine[index] != theirs[index]]
+            if changed:
+                result['columns'][name] = {'changed': len(changed), 'first': changed[:10]}
+        return result
+
+    def filter_feasible(self, available: Dict[int, float],
+                        min_size: float = 0.0) -> Tuple['ExecutionPlan', Dict[str, int]]:
+        """Drop or shrink legs the wallets cannot cover
+
+        available maps wallet index to available balance (wallets missing
+        from it are not limited) and is drawn down leg by leg in plan order.
+        The legs of a branch are scaled by one common factor so its long and
+        short sides stay balanced, and dropped together if a scaled leg
+        would fall below min_size.
+        """
+        c = self.columns
+        wallets, branches, sizes = c['wallet'], c['branch'], c['size']
+        remaining = dict(available)
+        keep: List[int] = []
+        new_sizes: List[float] = []
+        stats = {'kept': 0, 'resized': 0, 'dropped': 0}
+        index, n = 0, len(self)
+        while index < n:
+            end = index + 1
+            if branches[index] >= 0:
+                while end < n and branches[end] == branches[index]:
+                    end += 1
+            needed: Dict[int, float] = {}
+            for leg in range(index, end):
+                needed[wallets[leg]] = needed.get(wallets[leg], 0.0) + sizes[leg]
+            scale = min([remaining[wallet] / amount for wallet, amount in needed.items()
+                         if wallet in remaining and amount > 0] + [1.0])
+            smallest = min(sizes[index:end]) * scale
+            if scale <= 0 or smallest <= 0 or smallest < min_size:
+                stats['dropped'] += end - index
+            else:
+                stats['resized' if scale < 1.0 else 'kept'] += end - index
+                for leg in range(index, end):
+                    keep.append(leg)
+                    new_sizes.append(sizes[leg] * scale)
+                for wallet, amount in needed.items():
+                    if wallet in remaining:
+                        remaining[wallet] -= amount * scale
+            index = end
+
+        columns = {name: array(column.typecode, [column[leg] for leg in keep])
+                   for name, column in c.items() if name != 'size'}
+        columns['size'] = array('d', new_sizes)
+        plan = ExecutionPlan(self.mode, self.assets, self.wallet_count, columns, self.seed, self.fingerprint)
+        return plan, stats
+
+    def save(self, path: str):
+        """Write a JSON header followed by the raw column bytes"""
+        header = {
+            'mode': self.mode, 'assets': self.assets, 'wallet_count': self.wallet_count,
+            'seed': self.seed, 'fingerprint': self.fingerprint, 'legs': len(self),
+            'columns': {name: self.columns[name].typecode for name in COLUMNS}
+        }
+        with open(path, 'wb') as f:
+            f.write(PLAN_MAGIC)
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for name in COLUMNS:
+                self.columns[name].tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> 'ExecutionPlan':
+        with open(path, 'rb') as f:
+            if f.readline() != PLAN_MAGIC:
+                raise ValueError(f"{path} is not an execution plan")
+            header = json.loads(f.readline())
+            columns = {}
+            for name, typecode in header['columns'].items():
+                column = array(typecode)
+                column.fromfile(f, header['legs'])
+                columns[name] = column
+        return cls(header['mode'], header['assets'], header['wallet_count'], columns,
+                   header.get('seed'), header.get('fingerprint', ''))
+
+
+def _draw_indices(rng: random.Random, n: int, buckets: int) -> array:
+    """n uniform picks from range(buckets), drawn as blocks of random bytes
+
+    Bytes at or above the largest multiple of buckets are discarded rather
+    than folded, so the picks are unbiased.
+    """
+    limit = 256 - 256 % buckets
+    table = bytes(value % buckets for value in range(256))
+    rejected = bytes(range(limit, 256))
+    picks = b''
+    while len(picks) < n:
+        needed = n - len(picks)
+        picks += rng.randbytes(needed * 256 // limit + 16).translate(table, rejected)
+    return array('B', picks[:n])
+
+
+def _uniform(rng: random.Random, n: int, low: float, high: float) -> List[float]:
+    r = rng.random
+    span = high - low
+    return [low + span * r() for _ in repeat(None, n)]
+
+
+def plan_session(config: Dict, wallets: Sequence[str], mode: str = 'parallel',
+                 seed: Optional[int] = None) -> ExecutionPlan:
+    """Generate every random choice of a session up front
+
+    parallel: each wallet trades trades_per_wallet times with a random asset,
+    direction and size; consecutive legs are spaced by a launch_delay draw,
+    as execute_parallel_trading sleeps between wallets.
+    branch: wallets are split into branches of branch_wallet_range size (at
+    most max_parallel_branches); each branch splits one size draw across its
+    long and short legs, which launch back to back.
+
+    Every column is drawn in one block rather than leg by leg. Planning a
+    million legs takes about a second, over half of it random.shuffle of
+    the wallet order, which runs in pure Python.
+    """
+    rng = random.Random(seed)
+    assets = list(config.get('trading_assets', ['BTC', 'ETH', 'SOL']))
+    if not 0 < len(assets) <= 256:
+        raise ValueError(f"Plans support 1 to 256 trading assets, got {len(assets)}")
+    volume_range = config.get('volume_percentage_range', (10, 50))
+    wallet_count = len(wallets)
+
+    order = list(range(wallet_count))
+    if config.get('enable_shuffling', True):
+        rng.shuffle(order)
+
+    if mode == 'parallel':
+        order *= config.get('trades_per_wallet', 1)
+        n = len(order)
+        branch_column = array('i', [-1]) * n
+        direction_config = config.get('position_direction', 'random')
+        if direction_config == 'random':
+            direction_column = array('b', _draw_indices(rng, n, 2))
+        else:
+            direction_column = array('b', [DIRECTIONS.index(direction_config)]) * n
+        size_column = array('d', _uniform(rng, n, *volume_range))
+        launch_column = array('d', accumulate(_uniform(rng, n, *config.get('launch_delay', (0, 20)))))
+
+    elif mode == 'branch':
+        branch_low, branch_high = config.get('branch_wallet_range', (2, 5))
+        max_branches = min(config.get('max_parallel_branches', 5), wallet_count // branch_low)
+        sizes = [branch_low + pick for pick in _draw_indices(rng, max_branches, branch_high - branch_low + 1)]
+        # Stop at the first branch that no longer fits, as execute_branch_trading does
+        ends = list(accumulate(sizes))
+        count = bisect.bisect_right(ends, wallet_count)
+        sizes = sizes[:count]
+        longs = [1 + int(u * (size - 1)) for u, size in zip(_uniform(rng, count, 0.0, 1.0), sizes)]
+        totals = _uniform(rng, count, *volume_range)
+
+        patterns = {
+            (size, long_count): bytes(long_count) + b'\x01' * (size - long_count)
+            for size in range(branch_low, branch_high + 1) for long_count in range(1, size)
+        }
+        n = ends[count - 1] if count else 0
+        order = order[:n]
+        branch_column = array('i', chain.from_iterable(map(repeat, range(count), sizes)))
+        direction_column = array('b', b''.join(map(patterns.__getitem__, zip(sizes, longs))))
+        size_column = array('d', chain.from_iterable(
+            chain(repeat(total / long_count, long_count), repeat(total / (size - long_count), size - long_count))
+            for size, long_count, total in zip(sizes, longs, totals)
+        ))
+        launch_column = array('d', [0.0]) * n
+
+    else:
+        raise ValueError(f"Invalid execution mode: {mode}")
+
+    # Asset draws last so changing the asset list leaves the other columns alone
+    columns = {
+        'wallet': array('I', order), 'branch': branch_column, 'direction': direction_column,
+        'size': size_column, 'asset': _draw_indices(rng, n, len(assets)), 'launch_at': launch_column
+    }
+    return ExecutionPlan(mode, assets, wallet_count, columns, seed, wallet_fingerprint(wallets))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build, inspect and diff execution plans")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Plan a session for a wallet keys file")
+    build.add_argument('output')
+    build.add_argument('--keys-file', default='wallet_keys.txt')
+    build.add_argument('--mode', choices=['parallel', 'branch'], default='parallel')
+    build.add_argument('--seed', type=int, default=None)
+    build.add_argument('--config', help="JSON file with session config overrides")
+    inspect = commands.add_parser('inspect', help="Print a plan summary")
+    inspect.add_argument('plan')
+    inspect.add_argument('--legs', type=int, default=0, help="Also print the first N legs")
+    diff = commands.add_parser('diff', help="Compare two plans")
+    diff.add_argument('plan')
+    diff.add_argument('other')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        config = {}
+        if args.config:
+            with open(args.config, 'r') as f:
+                config = json.load(f)
+        with open(args.keys_file, 'r') as f:
+            wallets = [line.strip() for line in f if line.strip()]
+        plan = plan_session(config, wallets, args.mode, args.seed)
+        plan.save(args.output)
+        print(f"Saved {len(plan)} {plan.mode} legs to {args.output}")
+    elif args.command == 'inspect':
+        plan = ExecutionPlan.load(args.plan)
+        print(json.dumps(plan.summary(), indent=2))
+        for index in range(min(args.legs, len(plan))):
+            print(json.dumps(plan.leg(index)))
+    else:
+        print(json.dumps(ExecutionPlan.load(args.plan).diff(ExecutionPlan.load(args.other)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
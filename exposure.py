@@ -0,0 +1,127 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Cell:
+    """Filled long and short size and leg counts of one asset within one group"""
+    __slots__ = ('long', 'short', 'long_legs', 'short_legs')
+
+    def __init__(self):
+        self.long = 0.0
+        self.short = 0.0
+        self.long_legs = 0
+        self.short_legs = 0
+
+    def add(self, direction: str, size: float):
+        if direction == 'long':
+            self.long += size
+            self.long_legs += 1
+        else:
+            self.short += size
+            self.short_legs += 1
+
+    @property
+    def net(self) -> float:
+        return self.long - self.short
+
+    @property
+    def gross(self) -> float:
+        return self.long + self.short
+
+    @property
+    def skew(self) -> float:
+        """net / gross: 0 when long and short offset, +1 or -1 when one side only"""
+        gross = self.gross
+        return self.net / gross if gross else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        legs = self.long_legs + self.short_legs
+        return {
+            'long': self.long, 'short': self.short, 'net': self.net, 'gross': self.gross, 'skew': self.skew,
+            'long_legs': self.long_legs, 'short_legs': self.short_legs,
+            'leg_skew': (self.long_legs - self.short_legs) / legs if legs else 0.0
+        }
+
+
+class ExposureBook:
+    """Running net and gross exposure per asset, per branch and per proxy
+
+    A trade listener (see TradingSession.add_trade_listener): each
+    successful result row adds its size to three cells, the asset's own and
+    the asset's within its branch and within its proxy, so the cost per trade
+    is a few dict lookups under one lock however long the session runs.
+    Failed and skipped rows carry no exposure and are ignored. proxy_of maps
+    a row's wallet to its proxy index (None: not tracked per proxy).
+    """
+
+    def __init__(self, proxy_of: Optional[Callable[[str], Optional[int]]] = None):
+        self.proxy_of = proxy_of
+        self.trades = 0
+        self._assets: Dict[str, _Cell] = {}
+        self._branches: Dict[Tuple[Hashable, str], _Cell] = {}
+        self._proxies: Dict[Tuple[int, str], _Cell] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, row: Dict[str, Any], csv_path: Optional[str] = None):
+        if row.get('status') != 'success' or row.get('direction') not in ('long', 'short'):
+            return
+        try:
+            size = float(row.get('size'))
+        except (TypeError, ValueError):
+            return
+        self.add(row['asset'], row['direction'], size, row.get('branch'),
+                 self.proxy_of(row['wallet']) if self.proxy_of else None)
+
+    def add(self, asset: str, direction: str, size: float, branch: Optional[Hashable] = None,
+            proxy: Optional[int] = None):
+        """Count one filled leg"""
+        with self._lock:
+            self.trades += 1
+            cell = self._assets.get(asset)
+            if cell is None:
+                cell = self._assets[asset] = _Cell()
+            cell.add(direction, size)
+            if branch is not None and branch != '':
+                cell = self._branches.get((branch, asset))
+                if cell is None:
+                    cell = self._branches[(branch, asset)] = _Cell()
+                cell.add(direction, size)
+            if proxy is not None:
+                cell = self._proxies.get((proxy, asset))
+                if cell is None:
+                    cell = self._proxies[(proxy, asset)] = _Cell()
+                cell.add(direction, size)
+
+    def net(self, asset: str) -> float:
+        with self._lock:
+            cell = self._assets.get(asset)
+            return cell.net if cell else 0.0
+
+    def skew(self, asset: str) -> float:
+        """Net over gross exposure of an asset, in [-1, 1]"""
+        with self._lock:
+            cell = self._assets.get(asset)
+            return cell.skew if cell else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.trades = 0
+            self._assets.clear()
+            self._branches.clear()
+            self._proxies.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every cell as plain dicts: assets, then branches and proxies keyed by id then asset"""
+        with self._lock:
+            branches: Dict[str, Dict[str, Any]] = {}
+            for (branch, asset), cell in self._branches.items():
+                branches.setdefault(str(branch), {})[asset] = cell.to_dict()
+            proxies: Dict[str, Dict[str, Any]] = {}
+            for (proxy, asset), cell in self._proxies.items():
+                proxies.setdefault(str(proxy), {})[asset] = cell.to_dict()
+            return {
+                'trades': self.trades,
+                'assets': {asset: cell.to_dict() for asset, cell in self._assets.items()},
+                'branches': branches,
+                'proxies': proxies
+            }
@@ -0,0 +1,287 @@
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+PLACEHOLDER = re.compile(r'\{\{([\w.]+)\}\}')
+
+# Request headers the browser adds that must not be replayed verbatim
+DROPPED_HEADERS = {
+    'content-length', 'host', 'connection', 'cookie', 'accept-encoding',
+    'sec-ch-ua', 'sec-ch-ua-mobile', 'sec-ch-ua-platform', 'sec-fetch-dest',
+    'sec-fetch-mode', 'sec-fetch-site', 'referer', 'origin'
+}
+
+# Only values this distinctive are treated as ids to correlate between steps
+MIN_CORRELATION_LENGTH = 4
+
+
+def enable_network_recording(chrome_options):
+    """Ask Chrome to keep a performance log with every network event"""
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def collect_network_entries(driver) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """Pull XHR/fetch requests and their response bodies out of the performance log"""
+    entries = []
+    finished = set()
+    for log_entry in driver.get_log('performance'):
+        message = json.loads(log_entry['message'])['message']
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent' and params.get('type') in ('XHR', 'Fetch'):
+            request = params['request']
+            entries.append({
+                'request_id': params['requestId'],
+                'method': request['method'],
+                'url': request['url'],
+                'headers': request.get('headers', {}),
+                'body': request.get('postData'),
+                'wall_time': params.get('wallTime')
+            })
+        elif message.get('method') == 'Network.loadingFinished':
+            finished.add(params.get('requestId'))
+
+    responses = {}
+    for entry in entries:
+        if entry['request_id'] not in finished:
+            continue
+        try:
+            response = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': entry['request_id']})
+            responses[entry['request_id']] = response.get('body', '')
+        except Exception as e:
+            logging.warning(f"No response body for {entry['url']}: {str(e)}")
+    return entries, responses
+
+
+def _flatten(value: Any, path: str = '') -> List[Tuple[str, Any]]:
+    """Leaf values of a JSON document as (dotted path, value)"""
+    if isinstance(value, dict):
+        leaves = []
+        for key, child in value.items():
+            leaves.extend(_flatten(child, f"{path}.{key}" if path else str(key)))
+        return leaves
+    if isinstance(value, list):
+        leaves = []
+        for index, child in enumerate(value):
+            leaves.extend(_flatten(child, f"{path}.{index}" if path else str(index)))
+        return leaves
+    return [(path, value)]
+
+
+def _lookup(document: Any, path: str) -> Any:
+    for part in path.split('.'):
+        document = document[int(part)] if isinstance(document, list) else document[part]
+    return document
+
+
+def _parameterize(value: Any, replacements: Dict[str, str]) -> Any:
+    """Replace JSON leaves equal to a known value with its placeholder"""
+    if isinstance(value, dict):
+        return {key: _parameterize(child, replacements) for key, child in value.items()}
+    if isinstance(value, list):
+        return [_parameterize(child, replacements) for child in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    name = replacements.get(str(value))
+    return f"{{{{{name}}}}}" if name else value
+
+
+def _parameterize_url(url: str, replacements: Dict[str, str]) -> str:
+    """Replace path segments and query values equal to a known value"""
+    def replace(match):
+        name = replacements.get(match.group(2))
+        return match.group(1) + (f"{{{{{name}}}}}" if name else match.group(2))
+    return re.sub(r'([/=])([^/?&=#]+)', replace, url)
+
+
+def _is_distinctive(value: Any) -> bool:
+    if isinstance(value, bool) or value is None:
+        return False
+    return len(str(value)) >= MIN_CORRELATION_LENGTH
+
+
+def build_template(entries: List[Dict[str, Any]], params: Dict[str, Any],
+                   responses: Optional[Dict[str, str]] = None,
+                   hold_marks: Optional[List[float]] = None) -> Dict[str, Any]:
+    """Turn recorded requests into a replayable template
+
+    Values from params (wallet, asset, size, ...) become {{name}} placeholders.
+    Values returned by an earlier response and sent again later (portfolio
+    and position ids) become {{stepN.path}} variables extracted at replay time.
+    hold_marks are wall-clock times at which the UI started a position hold; a
+    hold step is inserted before the first request sent after each mark.
+    """
+    responses = responses or {}
+    replacements = {str(value): name for name, value in params.items()}
+    pending_holds = sorted(hold_marks or [])
+    steps = []
+    for entry in entries:
+        while pending_holds and entry.get('wall_time') and entry['wall_time'] >= pending_holds[0]:
+            steps.append({'hold': True})
+            pending_holds.pop(0)
+
+        index = len(steps)
+        headers = {
+            name: value for name, value in entry.get('headers', {}).items()
+            if name.lower() not in DROPPED_HEADERS
+        }
+        step = {
+            'method': entry['method'],
+            'url': _parameterize_url(entry['url'], replacements),
+            'headers': headers,
+            'extract': {}
+        }
+        body = entry.get('body')
+        if body:
+            try:
+                step['json'] = _parameterize(json.loads(body), replacements)
+            except ValueError:
+                step['body'] = body
+        steps.append(step)
+
+        # Later requests that reuse a value from this response refer to it by variable
+        response_text = responses.get(entry.get('request_id'))
+        if response_text:
+            try:
+                leaves = _flatten(json.loads(response_text))
+            except ValueError:
+                leaves = []
+            for path, value in leaves:
+                if _is_distinctive(value) and str(value) not in replacements:
+                    variable = f"step{index}.{path}"
+                    replacements[str(value)] = variable
+                    step['extract'][variable] = path
+
+    return {'version': 1, 'params': sorted(params), 'steps': steps}
+
+
+def save_template(template: Dict[str, Any], path: str):
+    with open(path, 'w') as f:
+        json.dump(template, f, indent=2)
+    logging.info(f"Saved HTTP replay template with {len(template['steps'])} steps: {path}")
+
+
+def load_template(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _render(value: Any, variables: Dict[str, Any]) -> Any:
+    """Fill placeholders, keeping the original type when a leaf is a single placeholder"""
+    if isinstance(value, dict):
+        return {key: _render(child, variables) for key, child in value.items()}
+    if isinstance(value, list):
+        return [_render(child, variables) for child in value]
+    if isinstance(value, str):
+        whole = PLACEHOLDER.fullmatch(value)
+        if whole:
+            return variables[whole.group(1)]
+        return PLACEHOLDER.sub(lambda m: str(variables[m.group(1)]), value)
+    return value
+
+
+def proxy_url(proxy: Optional[Dict]) -> Optional[Dict[str, str]]:
+    """requests proxies mapping for a ProxyManager proxy"""
+    if not proxy:
+        return None
+    url = f"http://{proxy['auth']}@{proxy['ip_port']}" if proxy.get('auth') else f"http://{proxy['ip_port']}"
+    return {'http': url, 'https': url}
+
+
+class FlowReplayer:
+    """Replays a recorded UI flow as direct HTTP requests over a shared connection pool"""
+
+    def __init__(self, template: Dict[str, Any], base_url: Optional[str] = None,
+                 pool_size: int = 32, timeout: float = 10, hold=time.sleep):
+        self.template = template
+        self.base_url = base_url
+        self.timeout = timeout
+        # Called with params['hold_time'] at each recorded position hold the replay does not defer
+        self.hold = hold
+        # One adapter shared by every flow: connections are pooled, cookies are per flow
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    def _session(self) -> requests.Session:
+        session = requests.Session()
+        session.mount('http://', self.adapter)
+        session.mount('https://', self.adapter)
+        return session
+
+    def _url(self, url: str) -> str:
+        if self.base_url:
+            # Point a template recorded elsewhere at another host
+            url = re.sub(r'^https?://[^/]+', self.base_url.rstrip('/'), url)
+        return url
+
+    def replay(self, params: Dict[str, Any], proxy: Optional[Dict] = None,
+               user_agent: Optional[str] = None, defer_holds: bool = False) -> Dict[str, Any]:
+        """Run every step of the template for one set of params
+
+        With defer_holds the replay stops at the next hold step instead of
+        calling hold and returns status 'held' with a 'flow' to hand to
+        resume() once the position is due to close.
+        """
+        session = self._session()
+        session.proxies = proxy_url(proxy) or {}
+        flow = {'variables': dict(params), 'session': session, 'next': 0, 'steps': 0}
+        return self.resume(flow, user_agent, defer_holds)
+
+    def resume(self, flow: Dict[str, Any], user_agent: Optional[str] = None,
+               defer_holds: bool = False) -> Dict[str, Any]:
+        """Carry on a flow returned by a held replay from the step after its hold"""
+        variables, session = flow['variables'], flow['session']
+        steps = self.template['steps']
+        started = time.perf_counter()
+        try:
+            while flow['next'] < len(steps):
+                index = flow['next']
+                step = steps[index]
+                if step.get('hold'):
+                    flow['next'] += 1
+                    if defer_holds:
+                        return {'status': 'held', 'steps': flow['steps'], 'flow': flow,
+                                'elapsed': time.perf_counter() - started}
+                    self.hold(variables.get('hold_time', 0))
+                    continue
+                headers = dict(step.get('headers', {}))
+                if user_agent:
+                    headers['User-Agent'] = user_agent
+                url = PLACEHOLDER.sub(
+                    lambda m: quote(str(variables[m.group(1)]), safe=''), self._url(step['url'])
+                )
+                kwargs = {'headers': headers, 'timeout': self.timeout}
+                if 'json' in step:
+                    kwargs['json'] = _render(step['json'], variables)
+                elif 'body' in step:
+                    kwargs['data'] = _render(step['body'], variables)
+
+                response = session.request(step['method'], url, **kwargs)
+                if response.status_code >= 400:
+                    raise Exception(f"step {index} {step['method']} {url} returned {response.status_code}")
+                if step.get('extract'):
+                    document = response.json()
+                    for variable, path in step['extract'].items():
+                        variables[variable] = _lookup(document, path)
+                flow['next'] += 1
+                flow['steps'] += 1
+
+            return {'status': 'success', 'steps': flow['steps'],
+                    'elapsed': time.perf_counter() - started}
+        except Exception as e:
+            logging.error(f"HTTP replay failed after {flow['steps']} steps: {str(e)}")
+            return {'status': 'failed', 'steps': flow['steps'], 'error': str(e),
+                    'elapsed': time.perf_counter() - started}
+
+    def replay_many(self, flows: List[Dict[str, Any]], workers: int = 16) -> List[Dict[str, Any]]:
+        """Replay many flows concurrently; each item has params and optional proxy/user_agent"""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda flow: self.replay(flow['params'], flow.get('proxy'), flow.get('user_agent')),
+                flows
+            ))
@@ -0,0 +1,287 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Union
+
+KEY_SIZE = 32
+# Slot states in UnlockedKeys
+PENDING, READY, FAILED = 0, 1, 2
+
+
+class KeystoreError(Exception):
+    """A keystore file could not be read or decrypted"""
+
+
+def keystore_files(directory: str) -> List[str]:
+    """Keystore files in a directory, in name order (geth's UTC--<time>--<address> sorts by creation)"""
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if not name.startswith('.') and os.path.isfile(os.path.join(directory, name))
+    ]
+
+
+def keystore_name(index: int) -> str:
+    return f"key-{index:06d}.json"
+
+
+def keystore_password(config: Dict) -> Optional[str]:
+    """config['keystore_password'], else the KEYSTORE_PASSWORD environment variable"""
+    return config.get('keystore_password') or os.environ.get('KEYSTORE_PASSWORD')
+
+
+def write_keystore(directory: str, name: str, private_key: str, password: str, kdf: str = 'scrypt',
+                   iterations: Optional[int] = None) -> str:
+    """Encrypt a hex private key into a version 3 keystore file; returns its path"""
+    import eth_keyfile
+    # pbkdf2 only takes the password as bytes; scrypt takes either
+    keyfile = eth_keyfile.create_keyfile_json(bytes.fromhex(private_key.replace('0x', '')),
+                                              password.encode('utf-8'), kdf=kdf, iterations=iterations)
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        json.dump(keyfile, f)
+    return path
+
+
+def _decrypt_chunk(paths: List[str], password: str) -> List[Union[bytes, str]]:
+    """Runs in a pool worker: raw key bytes per path, or an error message"""
+    import eth_keyfile
+    results: List[Union[bytes, str]] = []
+    for path in paths:
+        try:
+            with open(path) as f:
+                results.append(eth_keyfile.decode_keyfile_json(json.load(f), password.encode('utf-8')))
+        except Exception as e:
+            results.append(f"{type(e).__name__}: {e}")
+    return results
+
+
+def _keystore_address(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            address = json.load(f).get('address')
+    except (OSError, ValueError):
+        return None
+    return ('0x' + address.lower().replace('0x', '')) if address else None
+
+
+class UnlockedKeys(Sequence):
+    """Private keys decrypted from keystore files, as a read-only sequence of hex keys
+
+    Decryption (scrypt, about a second per key) runs across a process pool
+    as soon as the object is created. Key material is kept in one bytearray
+    of 32 bytes per wallet; hex strings are built only when a key is read.
+    Reading a key that is still being decrypted waits for it, so trading
+    can begin with the first wallets while the rest unlock. Reading one
+    whose file failed to decrypt raises KeystoreError by index; iteration
+    and copy() skip such wallets, so one bad file does not stop a session
+    that walks the whole list. Addresses come from the keystore files
+    themselves and are known before any decryption.
+    """
+
+    def __init__(self, paths: List[str], password: str, workers: Optional[int] = None, chunk_size: int = 1):
+        self.paths = list(paths)
+        self.addresses = [_keystore_address(path) for path in self.paths]
+        self.errors: Dict[int, str] = {}
+        self._buffer = bytearray(KEY_SIZE * len(self.paths))
+        self._state = bytearray(len(self.paths))
+        self._remaining = len(self.paths)
+        self._condition = threading.Condition()
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if not self.paths:
+            self.finished_at = self.started_at
+            return
+
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.paths)))
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Chunks go out in file order, so the first wallets unlock first
+        for start in range(0, len(self.paths), chunk_size):
+            future = self._executor.submit(_decrypt_chunk, self.paths[start:start + chunk_size], password)
+            count = min(chunk_size, len(self.paths) - start)
+            future.add_done_callback(lambda done, start=start, count=count: self._store(start, count, done))
+
+    @classmethod
+    def from_directory(cls, directory: str, password: str, workers: Optional[int] = None) -> 'UnlockedKeys':
+        return cls(keystore_files(directory), password, workers)
+
+    def _store(self, start: int, count: int, future: Future):
+        try:
+            results = future.result()
+        except Exception as e:
+            # The worker died or the pool was shut down
+            results = [f"{type(e).__name__}: {e}"] * count
+        with self._condition:
+            for index, result in enumerate(results, start):
+                if isinstance(result, bytes):
+                    self._buffer[index * KEY_SIZE:(index + 1) * KEY_SIZE] = result
+                    self._state[index] = READY
+                else:
+                    self.errors[index] = result
+                    self._state[index] = FAILED
+                    logging.error(f"Could not unlock keystore {os.path.basename(self.paths[index])}: {result}")
+            self._remaining -= len(results)
+            finished = self._remaining <= 0
+            if finished:
+                self.finished_at = time.monotonic()
+            self._condition.notify_all()
+        if finished:
+            logging.info(f"Unlocked {len(self.paths) - len(self.errors)} of {len(self.paths)} keystores "
+                         f"in {self.finished_at - self.started_at:.1f}s")
+            self._executor.shutdown(wait=False)
+
+    @property
+    def ready_count(self) -> int:
+        with self._condition:
+            return self._state.count(READY)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every keystore has been processed; False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._remaining <= 0, timeout)
+
+    def key_bytes(self, index: int, timeout: Optional[float] = None) -> bytes:
+        """Raw key of one wallet, waiting for it to be decrypted"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._state[index] != PENDING, timeout):
+                raise TimeoutError(f"Keystore {index} is still locked")
+            if self._state[index] == FAILED:
+                raise KeystoreError(self.errors[index])
+            return bytes(self._buffer[index * KEY_SIZE:(index + 1) * KEY_SIZE])
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return '0x' + self.key_bytes(index).hex()
+
+    def __iter__(self) -> Iterator[str]:
+        """Unlocked keys in order, waiting for pending ones and skipping failed ones"""
+        for index in range(len(self)):
+            try:
+                yield self[index]
+            except KeystoreError:
+                continue
+
+    def index(self, key: str, start: int = 0, stop: Optional[int] = None) -> int:
+        """Position of a hex key among the unlocked wallets (no per-wallet hex conversion)"""
+        try:
+            raw = bytes.fromhex(key.replace('0x', ''))
+        except (ValueError, AttributeError):
+            raise ValueError("Not a hex wallet key")
+        stop = len(self) if stop is None else stop
+        with self._condition:
+            offset = self._buffer.find(raw, start * KEY_SIZE, stop * KEY_SIZE) if len(raw) == KEY_SIZE else -1
+            while offset >= 0:
+                index = offset // KEY_SIZE
+                if offset % KEY_SIZE == 0 and self._state[index] == READY:
+                    return index
+                offset = self._buffer.find(raw, offset + 1, stop * KEY_SIZE)
+        raise ValueError("Wallet key is not loaded")
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self.index(key)
+        except ValueError:
+            return False
+        return True
+
+    def copy(self) -> List[str]:
+        """Every unlocked key as a list, without failed ones (waits for the whole directory to unlock)"""
+        return list(self)
+
+    def append(self, path: str, private_key: str):
+        """Add a wallet whose keystore file was just written"""
+        with self._condition:
+            self.paths.append(path)
+            self.addresses.append(_keystore_address(path))
+            self._buffer += bytes.fromhex(private_key.replace('0x', ''))
+            self._state.append(READY)
+
+    def fingerprint(self) -> str:
+        """Wallet list fingerprint from the keystore addresses, so plans can be built before unlocking"""
+        addresses = [address or self._derived_address(index) for index, address in enumerate(self.addresses)]
+        return hashlib.sha256('\n'.join(addresses).encode('utf-8')).hexdigest()[:16]
+
+    def failed(self, index: int) -> bool:
+        """True if the wallet's keystore could not be decrypted (does not wait)"""
+        with self._condition:
+            return self._state[index] == FAILED
+
+    def _derived_address(self, index: int) -> str:
+        from wallet_addresses import wallet_address
+        return wallet_address(self[index]).lower()
+
+    def close(self):
+        """Stop unlocking and zero the key buffer"""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._condition:
+            self._buffer[:] = bytes(len(self._buffer))
+            for index, state in enumerate(self._state):
+                if state != FAILED:
+                    self.errors[index] = 'closed'
+                    self._state[index] = FAILED
+            self._remaining = 0
+            self._condition.notify_all()
+
+    def __repr__(self) -> str:
+        return f"UnlockedKeys({self.ready_count}/{len(self)} unlocked)"
+
+
+def encrypt_key_file(keys_file: str, directory: str, password: str, workers: Optional[int] = None) -> int:
+    """Move a plaintext wallet_keys.txt into keystore files, encrypting across a process pool"""
+    with open(keys_file) as f:
+        private_keys = [line.strip() for line in f if line.strip()]
+    os.makedirs(directory, exist_ok=True)
+    # Numbered names keep the old file order, which plans and CSV history refer to
+    names = [keystore_name(index) for index in range(len(private_keys))]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        list(executor.map(write_keystore, [directory] * len(private_keys), names, private_keys,
+                          [password] * len(private_keys)))
+    return len(private_keys)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Encrypted wallet keystores")
+    commands = parser.add_subparsers(dest='command', required=True)
+    encrypt = commands.add_parser('encrypt', help="Encrypt a plaintext keys file into a keystore directory")
+    encrypt.add_argument('keys_file')
+    encrypt.add_argument('directory')
+    unlock = commands.add_parser('unlock', help="Time unlocking a keystore directory")
+    unlock.add_argument('directory')
+    for command in (encrypt, unlock):
+        command.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    password = os.environ.get('KEYSTORE_PASSWORD')
+    if not password:
+        parser.error("Set KEYSTORE_PASSWORD")
+    if args.command == 'encrypt':
+        count = encrypt_key_file(args.keys_file, args.directory, password, args.workers)
+        print(f"Wrote {count} keystores to {args.directory}")
+    else:
+        keys = UnlockedKeys.from_directory(args.directory, password, args.workers)
+        if len(keys):
+            keys.key_bytes(0)
+        first_key = time.monotonic() - keys.started_at
+        keys.wait()
+        print(json.dumps({
+            'keystores': len(keys), 'unlocked': keys.ready_count,
+            'first_key_seconds': round(first_key, 3),
+            'total_seconds': round(keys.finished_at - keys.started_at, 3)
+        }, indent=2))
+        keys.close()
@@ -0,0 +1,484 @@
+import argparse
+import base64
+import http.client
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from crypto_trading_bot import TransactionManager
+from http_replay import proxy_url
+from standin_servers import StandinServer, _QuietHandler
+from trade_result import PreparedTrade, TradeResult
+from wallet_addresses import wallet_address
+
+DIRECTIONS = ('long', 'short')
+# Response headers the proxy sets itself rather than copying from upstream
+HOP_HEADERS = ('content-length', 'connection', 'transfer-encoding', 'keep-alive', 'server', 'date')
+
+
+class LatencyModel:
+    """Random delay drawn from a named distribution
+
+    Specs are 'name:param,...': const:SECONDS, uniform:LOW,HIGH,
+    exponential:MEAN or lognormal:MEDIAN,SIGMA (long tailed, the usual
+    shape of exchange latency). An optional spike_rate adds spike seconds
+    to that fraction of draws, to model GC pauses or matching engine stalls.
+    """
+
+    def __init__(self, kind: str = 'const', params: Tuple[float, ...] = (0.0,),
+                 spike_rate: float = 0.0, spike: float = 0.0, seed: Optional[int] = None):
+        if kind not in ('const', 'uniform', 'exponential', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.params = params
+        self.spike_rate = spike_rate
+        self.spike = spike
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, **kwargs) -> 'LatencyModel':
+        kind, _, params = spec.partition(':')
+        return cls(kind, tuple(float(param) for param in params.split(',') if param), **kwargs)
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == 'const':
+                delay = self.params[0]
+            elif self.kind == 'uniform':
+                delay = self._rng.uniform(*self.params)
+            elif self.kind == 'exponential':
+                delay = self._rng.expovariate(1.0 / self.params[0]) if self.params[0] > 0 else 0.0
+            else:
+                delay = self._rng.lognormvariate(math.log(self.params[0]), self.params[1])
+            if self.spike_rate and self._rng.random() < self.spike_rate:
+                delay += self.spike
+        return max(0.0, delay)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(map(str, self.params))}"
+
+
+class TokenBucket:
+    """Rate limit of rate requests per second with bursts of up to burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Spend a token; 0 when granted, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Faults:
+    """Error injection shared by the exchange and the proxy"""
+
+    def __init__(self, error_rate: float = 0.0, stall_rate: float = 0.0, drop_rate: float = 0.0,
+                 stall: float = 30.0, seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.drop_rate = drop_rate
+        self.stall = stall
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> Optional[str]:
+        """'error', 'stall', 'drop' or None for a healthy request"""
+        with self._lock:
+            roll = self._rng.random()
+        for fault, rate in (('error', self.error_rate), ('stall', self.stall_rate), ('drop', self.drop_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+
+class MockExchangeServer(StandinServer):
+    """Stand-in exchange order API with latency, injected faults and rate limits
+
+    POST /api/orders takes one wallet's batch, {'wallet': address,
+    'signature': ..., 'orders': [{'tx_id', 'asset', 'direction', 'size'}]},
+    and answers {'orders': [{'tx_id', 'status': 'filled' | 'rejected', ...}]}.
+    Before answering it sleeps a latency draw. Faults: error_rate answers
+    500, stall_rate holds the request for stall seconds and answers 504,
+    drop_rate closes the connection without a response. Requests over the
+    global (rate, burst) or per-wallet (wallet_rate, wallet_burst) token
+    buckets get 429 with Retry-After. GET /stats returns the counters.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: Optional[LatencyModel] = None,
+                 error_rate: float = 0.0, stall_rate: float = 0.0, drop_rate: float = 0.0, stall: float = 30.0,
+                 rate: Optional[float] = None, burst: Optional[float] = None,
+                 wallet_rate: Optional[float] = None, wallet_burst: Optional[float] = None,
+                 seed: Optional[int] = None):
+        super().__init__(host, port)
+        self.latency = latency or LatencyModel()
+        self.faults = _Faults(error_rate, stall_rate, drop_rate, stall, seed)
+        self.bucket = TokenBucket(rate, burst or rate) if rate else None
+        self.wallet_rate = wallet_rate
+        self.wallet_burst = wallet_burst or wallet_rate
+        self.wallet_buckets: Dict[str, TokenBucket] = {}
+        self.responses: Counter = Counter()
+        self.orders = 0
+
+    def make_handler(self):
+        server = self
+
+        class Handler(_QuietHandler):
+            def do_GET(self):
+                if urlparse(self.path).path == '/stats':
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if urlparse(self.path).path != '/api/orders':
+                    self._send_json(404, {'error': 'not found'})
+                    return
+                body = self._read_json() or {}
+                status, payload, headers = server.handle_orders(body)
+                if status is None:
+                    # Dropped: no response at all
+                    self.close_connection = True
+                    return
+                self.send_response(status)
+                encoded = json.dumps(payload).encode('utf-8')
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(encoded)
+
+        return Handler
+
+    def _throttle(self, wallet: str) -> float:
+        """Seconds the caller must wait, 0 if the request is within the rate limits"""
+        now = time.monotonic()
+        with self.lock:
+            if self.bucket:
+                wait = self.bucket.take(now)
+                if wait:
+                    return wait
+            if self.wallet_rate:
+                bucket = self.wallet_buckets.get(wallet)
+                if bucket is None:
+                    bucket = self.wallet_buckets[wallet] = TokenBucket(self.wallet_rate, self.wallet_burst)
+                return bucket.take(now)
+        return 0.0
+
+    def handle_orders(self, body: Dict[str, Any]) -> Tuple[Optional[int], Any, Dict[str, str]]:
+        """Status, payload and extra headers for one order batch; status None drops the connection"""
+        orders = body.get('orders')
+        if not body.get('wallet') or not isinstance(orders, list):
+            return self._count(400, {'error': 'wallet and orders required'})
+        wait = self._throttle(body['wallet'])
+        if wait:
+            return self._count(429, {'error': 'rate limited', 'retry_after': wait},
+                               {'Retry-After': str(max(1, math.ceil(wait)))})
+
+        fault = self.faults.draw()
+        if fault == 'stall':
+            time.sleep(self.faults.stall)
+            return self._count(504, {'error': 'matching engine timeout'})
+        time.sleep(self.latency.sample())
+        if fault == 'error':
+            return self._count(500, {'error': 'internal error'})
+        if fault == 'drop':
+            with self.lock:
+                self.responses['dropped'] += 1
+            return None, None, {}
+
+        now = time.time()
+        fills = []
+        for order in orders:
+            size = order.get('size')
+            if order.get('direction') not in DIRECTIONS or not isinstance(size, (int, float)) or size <= 0:
+                fills.append({'tx_id': order.get('tx_id'), 'status': 'rejected', 'error': 'invalid order'})
+            else:
+                fills.append({'tx_id': order.get('tx_id'), 'status': 'filled', 'filled_at': now})
+        with self.lock:
+            self.orders += len(orders)
+        return self._count(200, {'orders': fills})
+
+    def _count(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        with self.lock:
+            self.responses[status] += 1
+        return status, payload, headers or {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'orders': self.orders, 'responses': {str(key): count for key, count in self.responses.items()},
+                    'wallets_limited': len(self.wallet_buckets)}
+
+
+class MockProxyServer(StandinServer):
+    """Stand-in HTTP forward proxy with its own hop latency and faults
+
+    Forwards absolute-URI requests (what clients send to an HTTP proxy)
+    over one upstream keep-alive connection per client connection. With
+    credentials set, requests need a matching Proxy-Authorization header;
+    without, any credentials are accepted. error_rate answers 502.
+    GET /refresh (a plain path) counts a mobile IP rotation, so the
+    server can also stand in for a refresh_link.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: Optional[LatencyModel] = None,
+                 error_rate: float = 0.0, credentials: Optional[str] = None, timeout: float = 60.0,
+                 seed: Optional[int] = None):
+        super().__init__(host, port)
+        self.latency = latency or LatencyModel()
+        self.faults = _Faults(error_rate, seed=seed)
+        self.credentials = credentials
+        self.timeout = timeout
+        self.forwarded = 0
+        self.refreshes = 0
+        self.responses: Counter = Counter()
+
+    def make_handler(self):
+        server = self
+
+        class Handler(_QuietHandler):
+            upstream: Optional[http.client.HTTPConnection] = None
+            upstream_address: Optional[Tuple[str, int]] = None
+
+            def do_GET(self):
+                self.forward()
+
+            def do_POST(self):
+                self.forward()
+
+            def forward(self):
+                target = urlparse(self.path)
+                if not target.scheme:
+                    if target.path == '/refresh':
+                        with server.lock:
+                            server.refreshes += 1
+                        self._send_json(200, {'refreshed': True})
+                    else:
+                        self._send_json(404, {'error': 'not found'})
+                    return
+                length = int(self.headers.get('Content-Length', 0) or 0)
+                body = self.rfile.read(length) if length else None
+                if not server.authorized(self.headers.get('Proxy-Authorization')):
+                    self._reply(407, b'{"error": "proxy authentication required"}',
+                                {'Proxy-Authenticate': 'Basic realm="proxy"'})
+                    return
+                time.sleep(server.latency.sample())
+                if server.faults.draw() == 'error':
+                    self._reply(502, b'{"error": "bad gateway"}')
+                    return
+
+                headers = {name: value for name, value in self.headers.items()
+                           if name.lower() not in ('proxy-authorization', 'proxy-connection', 'connection',
+                                                   'keep-alive', 'content-length')}
+                try:
+                    response = self._upstream(target).request_and_read(
+                        self.command, target.path + (f"?{target.query}" if target.query else ''), body, headers
+                    )
+                except (OSError, http.client.HTTPException) as e:
+                    self._close_upstream()
+                    self._reply(502, json.dumps({'error': f"upstream: {type(e).__name__}"}).encode('utf-8'))
+                    return
+                status, reply_headers, payload = response
+                with server.lock:
+                    server.forwarded += 1
+                self._reply(status, payload, reply_headers)
+
+            def _upstream(self, target) -> '_Upstream':
+                address = (target.hostname, target.port or 80)
+                if self.upstream is None or self.upstream_address != address:
+                    self._close_upstream()
+                    self.upstream = _Upstream(address, server.timeout)
+                    self.upstream_address = address
+                return self.upstream
+
+            def _close_upstream(self):
+                if self.upstream is not None:
+                    self.upstream.close()
+                    self.upstream = None
+
+            def _reply(self, status: int, payload: bytes, headers: Optional[Dict[str, str]] = None):
+                with server.lock:
+                    server.responses[status] += 1
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    if name.lower() not in HOP_HEADERS:
+                        self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def finish(self):
+                self._close_upstream()
+                super().finish()
+
+        return Handler
+
+    def authorized(self, header: Optional[str]) -> bool:
+        if self.credentials is None:
+            return True
+        expected = 'Basic ' + base64.b64encode(self.credentials.encode('utf-8')).decode('ascii')
+        return header == expected
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'forwarded': self.forwarded, 'refreshes': self.refreshes,
+                    'responses': {str(key): count for key, count in self.responses.items()}}
+
+
+class _Upstream:
+    """Keep-alive connection from the proxy to one upstream host
+
+    A failed request is not retried: orders are not idempotent, so the
+    client sees a 502 instead of a possible double fill.
+    """
+
+    def __init__(self, address: Tuple[str, int], timeout: float):
+        self.address = address
+        self.timeout = timeout
+        self.connection: Optional[http.client.HTTPConnection] = None
+
+    def request_and_read(self, method: str, path: str, body: Optional[bytes],
+                         headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(*self.address, timeout=self.timeout)
+        self.connection.request(method, path, body, headers)
+        response = self.connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class HttpExchangeBackend(TransactionManager):
+    """TransactionManager that sends each batch over HTTP to the order API above
+
+    Requests go through the wallet's proxy on one shared requests.Session,
+    whose pools are sized for pool_size concurrent submits. A 429 is
+    retried after its retry_after up to max_retries times; any other
+    failure becomes failed results for the whole batch.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0, max_retries: int = 2, pool_size: int = 16,
+                 use_proxy: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.url = base_url.rstrip('/') + '/api/orders'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.use_proxy = use_proxy
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+
+    def _send(self, prepared: List[PreparedTrade], proxy: Dict) -> List[TradeResult]:
+        body = {
+            'wallet': wallet_address(prepared[0].wallet_key),
+            'signature': prepared[0].signature,
+            'orders': [{'tx_id': trade.tx_id, 'asset': trade.asset, 'direction': str(trade.direction),
+                        'size': trade.size} for trade in prepared]
+        }
+        proxies = proxy_url(proxy) if self.use_proxy else None
+        error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.http.post(self.url, json=body, proxies=proxies, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            if response.status_code == 429 and attempt < self.max_retries:
+                time.sleep(float(response.json().get('retry_after')
+                                 or response.headers.get('Retry-After', 1)))
+                continue
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+                break
+            fills = {fill['tx_id']: fill for fill in response.json()['orders']}
+            results = []
+            for trade in prepared:
+                fill = fills.get(trade.tx_id, {'status': 'rejected', 'error': 'missing from response'})
+                if fill['status'] == 'filled':
+                    results.append(TradeResult.success(trade.tx_id, fill['filled_at'], trade.wallet_key,
+                                                       trade.asset, trade.direction, trade.size, trade.signature))
+                else:
+                    results.append(TradeResult.failed(fill.get('error', 'rejected'), time.time(), trade.tx_id))
+            return results
+
+        logging.warning(f"Order batch failed: {error}")
+        now = time.time()
+        return [TradeResult.failed(error, now, trade.tx_id) for trade in prepared]
+
+    def close(self):
+        self.http.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the stand-in exchange and proxy until interrupted")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    exchange, proxy = servers_from_args(args)
+    with exchange, proxy:
+        print(f"exchange {exchange.url}\nproxy {proxy.url}", flush=True)
+        try:
+            while True:
+                time.sleep(60)
+                logging.info(f"exchange {exchange.stats()} proxy {proxy.stats()}")
+        except KeyboardInterrupt:
+            pass
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """Options shared by this module's CLI and soak_harness.py"""
+    parser.add_argument('--exchange-port', type=int, default=0)
+    parser.add_argument('--proxy-port', type=int, default=0)
+    parser.add_argument('--latency', default='lognormal:0.02,0.5', help="Exchange latency, e.g. const:0.01")
+    parser.add_argument('--proxy-latency', default='const:0', help="Added latency per proxy hop")
+    parser.add_argument('--spike-rate', type=float, default=0.0, help="Fraction of exchange requests with a spike")
+    parser.add_argument('--spike', type=float, default=1.0, help="Spike length in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered 500")
+    parser.add_argument('--stall-rate', type=float, default=0.0, help="Fraction held for --stall seconds, then 504")
+    parser.add_argument('--stall', type=float, default=30.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Fraction closed without a response")
+    parser.add_argument('--proxy-error-rate', type=float, default=0.0, help="Fraction answered 502 by the proxy")
+    parser.add_argument('--rate', type=float, default=None, help="Global requests per second before 429s")
+    parser.add_argument('--burst', type=float, default=None)
+    parser.add_argument('--wallet-rate', type=float, default=None, help="Per-wallet requests per second")
+    parser.add_argument('--wallet-burst', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def servers_from_args(args: argparse.Namespace) -> Tuple[MockExchangeServer, MockProxyServer]:
+    exchange = MockExchangeServer(
+        port=args.exchange_port, latency=LatencyModel.parse(args.latency, spike_rate=args.spike_rate,
+                                                            spike=args.spike, seed=args.seed),
+        error_rate=args.error_rate, stall_rate=args.stall_rate, drop_rate=args.drop_rate, stall=args.stall,
+        rate=args.rate, burst=args.burst, wallet_rate=args.wallet_rate, wallet_burst=args.wallet_burst,
+        seed=args.seed
+    )
+    proxy = MockProxyServer(port=args.proxy_port, latency=LatencyModel.parse(args.proxy_latency, seed=args.seed),
+                            error_rate=args.proxy_error_rate, seed=args.seed)
+    return exchange, proxy
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+from eth_keys import keys
+from eth_utils import keccak, to_canonical_address
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+ORDER_TYPES = {
+    'EIP712Domain': [
+        {'name': 'name', 'type': 'string'},
+        {'name': 'version', 'type': 'string'},
+        {'name': 'chainId', 'type': 'uint256'},
+        {'name': 'verifyingContract', 'type': 'address'},
+    ],
+    'Order': [
+        {'name': 'wallet', 'type': 'address'},
+        {'name': 'asset', 'type': 'string'},
+        {'name': 'isLong', 'type': 'bool'},
+        {'name': 'size', 'type': 'uint256'},
+        {'name': 'nonce', 'type': 'uint256'},
+        {'name': 'expiry', 'type': 'uint256'},
+    ]
+}
+
+# Several orders of one wallet signed together
+ORDER_BATCH_TYPES = dict(ORDER_TYPES, OrderBatch=[{'name': 'orders', 'type': 'Order[]'}])
+
+ORDER_TYPE = 'Order(address wallet,string asset,bool isLong,uint256 size,uint256 nonce,uint256 expiry)'
+ORDER_TYPE_HASH = keccak(text=ORDER_TYPE)
+ORDER_BATCH_TYPE_HASH = keccak(text='OrderBatch(Order[] orders)' + ORDER_TYPE)
+DOMAIN_TYPE_HASH = keccak(
+    text='EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)'
+)
+# Order sizes are fixed-point with this many decimals
+SIZE_DECIMALS = 6
+KEY_SIZE = 32
+
+
+def _uint(value: int) -> bytes:
+    return value.to_bytes(32, 'big')
+
+
+def _address(value: str) -> bytes:
+    return b'\x00' * 12 + to_canonical_address(value)
+
+
+class OrderSigner:
+    """Signs EIP-712 typed-data orders with cached eth_keys private keys
+
+    Parsing a private key derives its public key, which costs about as much
+    as a signature, so parsed keys are cached per wallet. The domain
+    separator and type hash are computed once; each order then costs two
+    keccaks for its struct and digest plus one secp256k1 signature.
+    """
+
+    def __init__(self, chain_id: int = 1, verifying_contract: str = '0x' + '00' * 20,
+                 name: str = 'Variational', version: str = '1'):
+        self.domain = {
+            'name': name, 'version': version, 'chainId': chain_id,
+            'verifyingContract': verifying_contract
+        }
+        self.domain_separator = keccak(
+            DOMAIN_TYPE_HASH + keccak(text=name) + keccak(text=version)
+            + _uint(chain_id) + _address(verifying_contract)
+        )
+        self._keys: Dict[str, keys.PrivateKey] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['OrderSigner']:
+        """Signer for config['order_signing'] (chain_id, verifying_contract, ...), if set"""
+        settings = config.get('order_signing')
+        if not settings:
+            return None
+        return cls(**settings)
+
+    def private_key(self, wallet_key: str) -> keys.PrivateKey:
+        private_key = self._keys.get(wallet_key)
+        if private_key is None:
+            private_key = keys.PrivateKey(bytes.fromhex(wallet_key.replace('0x', '')))
+            self._keys[wallet_key] = private_key
+        return private_key
+
+    def address(self, wallet_key: str) -> str:
+        return self.private_key(wallet_key).public_key.to_checksum_address()
+
+    def build_order(self, wallet_key: str, asset: str, direction: str, size: float,
+                    nonce: int, expiry: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            'wallet': self.address(wallet_key),
+            'asset': asset,
+            'isLong': direction == 'long',
+            'size': round(size * 10 ** SIZE_DECIMALS),
+            'nonce': nonce,
+            'expiry': expiry if expiry is not None else int(time.time()) + 300
+        }
+
+    @staticmethod
+    def struct_hash(order: Dict[str, Any]) -> bytes:
+        return keccak(
+            ORDER_TYPE_HASH + _address(order['wallet']) + keccak(text=order['asset'])
+            + _uint(int(order['isLong'])) + _uint(order['size'])
+            + _uint(order['nonce']) + _uint(order['expiry'])
+        )
+
+    def digest(self, order: Dict[str, Any]) -> bytes:
+        return keccak(b'\x19\x01' + self.domain_separator + self.struct_hash(order))
+
+    def batch_digest(self, orders: Sequence[Dict[str, Any]]) -> bytes:
+        """Digest of an OrderBatch: an array of structs hashes as keccak of its members' struct hashes"""
+        orders_hash = keccak(b''.join(self.struct_hash(order) for order in orders))
+        return keccak(b'\x19\x01' + self.domain_separator + keccak(ORDER_BATCH_TYPE_HASH + orders_hash))
+
+    def _sign_digest(self, wallet_key: str, digest: bytes) -> str:
+        signature = self.private_key(wallet_key).sign_msg_hash(digest)
+        return '0x' + (_uint(signature.r) + _uint(signature.s) + bytes([signature.v + 27])).hex()
+
+    def sign_order(self, wallet_key: str, order: Dict[str, Any]) -> str:
+        """65-byte r || s || v signature as 0x-hex, v in {27, 28}"""
+        return self._sign_digest(wallet_key, self.digest(order))
+
+    def sign_order_batch(self, wallet_key: str, orders: Sequence[Dict[str, Any]]) -> str:
+        """One signature covering several orders of the same wallet"""
+        return self._sign_digest(wallet_key, self.batch_digest(orders))
+
+    def typed_data(self, order: Dict[str, Any]) -> Dict[str, Any]:
+        """Full EIP-712 message, e.g. for eth_signTypedData_v4 or an API payload"""
+        return {'types': ORDER_TYPES, 'primaryType': 'Order', 'domain': self.domain, 'message': order}
+
+    def batch_typed_data(self, orders: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        return {'types': ORDER_BATCH_TYPES, 'primaryType': 'OrderBatch', 'domain': self.domain,
+                'message': {'orders': list(orders)}}
+
+    def sign_batch(self, items: Sequence[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        return [self.sign_order(wallet_key, order) for wallet_key, order in items]
+
+
+# Per-process state of pool workers, set by _init_worker
+_worker_signer: Optional[OrderSigner] = None
+_worker_keys: Optional[List[Optional[str]]] = None
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+
+
+def _init_worker(memory_name: str, key_count: int, domain: Dict[str, Any]):
+    global _worker_signer, _worker_keys, _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    _worker_signer = OrderSigner(domain['chainId'], domain['verifyingContract'],
+                                 domain['name'], domain['version'])
+    _worker_keys = [None] * key_count
+
+
+def _worker_key(index: int) -> str:
+    key = _worker_keys[index]
+    if key is None:
+        offset = index * KEY_SIZE
+        key = '0x' + bytes(_worker_memory.buf[offset:offset + KEY_SIZE]).hex()
+        _worker_keys[index] = key
+    return key
+
+
+def _sign_chunk(chunk: List[Tuple[int, Dict[str, Any]]]) -> List[str]:
+    return [_worker_signer.sign_order(_worker_key(index), order) for index, order in chunk]
+
+
+class SigningPool:
+    """Signs order batches across worker processes
+
+    Wallet keys are copied once into a shared memory block; tasks carry only
+    a key index and the order, and each worker parses and caches the keys it
+    is handed. Use as a context manager so the block is always unlinked.
+    """
+
+    def __init__(self, signer: OrderSigner, wallet_keys: Sequence[str],
+                 workers: Optional[int] = None, chunk_size: int = 256):
+        self.signer = signer
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._index = {key: index for index, key in enumerate(wallet_keys)}
+        self._memory = shared_memory.SharedMemory(create=True, size=max(1, len(wallet_keys) * KEY_SIZE))
+        for index, key in enumerate(wallet_keys):
+            self._memory.buf[index * KEY_SIZE:(index + 1) * KEY_SIZE] = bytes.fromhex(key.replace('0x', ''))
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(self._memory.name, len(wallet_keys), signer.domain)
+        )
+
+    def sign_batch(self, items: Sequence[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """Signatures in the order of items"""
+        indexed = [(self._index[wallet_key], order) for wallet_key, order in items]
+        chunks = [indexed[i:i + self.chunk_size] for i in range(0, len(indexed), self.chunk_size)]
+        signatures: List[str] = []
+        for chunk_signatures in self._executor.map(_sign_chunk, chunks):
+            signatures.extend(chunk_signatures)
+        return signatures
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> 'SigningPool':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark(order_count: int = 2000, wallet_count: int = 50, workers: int = 0) -> Dict[str, Any]:
+    """Signatures/sec for the in-process signer and the process pool"""
+    wallet_keys = ['0x' + os.urandom(KEY_SIZE).hex() for _ in range(wallet_count)]
+    signer = OrderSigner()
+    items = [
+        (wallet_keys[i % wallet_count],
+         signer.build_order(wallet_keys[i % wallet_count], 'BTC', 'long', 10.0, i))
+        for i in range(order_count)
+    ]
+    report: Dict[str, Any] = {'orders': order_count, 'wallets': wallet_count}
+
+    start = time.perf_counter()
+    signer.sign_batch(items)
+    elapsed = time.perf_counter() - start
+    report['single_process'] = {'signatures_per_sec': order_count / elapsed}
+
+    workers = workers or os.cpu_count() or 1
+    with SigningPool(signer, wallet_keys, workers) as pool:
+        # Warm the workers so process start-up is not measured
+        pool.sign_batch(items[:workers])
+        start = time.perf_counter()
+        pool.sign_batch(items)
+        elapsed = time.perf_counter() - start
+    report['pool'] = {
+        'workers': workers,
+        'signatures_per_sec': order_count / elapsed,
+        'signatures_per_sec_per_core': order_count / elapsed / workers
+    }
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark EIP-712 order signing")
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--wallets', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=0, help="Pool size (default: CPU count)")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.orders, args.wallets, args.workers), indent=2))
@@ -0,0 +1,211 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Marks the end of input; each worker that takes it passes it on to the next
+_STOP = object()
+
+
+class RateLimiter:
+    """Spaces acquire() calls at least 1/rate seconds apart (rate None: unlimited)
+
+    rate may be changed while threads are waiting on the limiter.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        self.rate = rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        rate = self.rate
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + 1.0 / rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PipelineStage:
+    """One stage of a StagePipeline: a handler, its worker count and a bounded input queue
+
+    The handler receives an item and returns the item for the next stage.
+    Returning None drops the item (e.g. a wallet whose UI sequence failed).
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Any], workers: int = 1, queue_size: int = 100):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        # Live worker threads; above self.workers after a shrink, until the extra ones retire
+        self._running = 0
+        self._done = False
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        """Queue depth, counters and utilisation (busy time over worker time)"""
+        with self._lock:
+            capacity = self.workers * elapsed
+            return {
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.queue.maxsize,
+                'workers': self.workers,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'utilisation': self.busy_seconds / capacity if capacity > 0 else 0.0
+            }
+
+
+class StagePipeline:
+    """Runs items through stages that each have their own workers and bounded queue
+
+    A full queue blocks the stage in front of it, so a slow downstream stage
+    throttles everything upstream instead of letting memory grow. An item
+    whose handler raises leaves the pipeline through on_error(stage name,
+    item, exception), so its owner can still account for it.
+    """
+
+    def __init__(self, stages: List[PipelineStage], on_result: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[str, Any, Exception], None]] = None):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self.on_result = on_result
+        self.on_error = on_error
+        self.started_at: Optional[float] = None
+
+    def start(self):
+        """Start worker threads for every stage"""
+        self.started_at = time.monotonic()
+        for index, stage in enumerate(self.stages):
+            with stage._lock:
+                self._spawn(index, stage.workers)
+        logging.info(
+            "Pipeline started: " + ", ".join(f"{stage.name}x{stage.workers}" for stage in self.stages)
+        )
+
+    def _spawn(self, index: int, count: int):
+        """Start count more workers for stage index; the caller holds the stage lock"""
+        stage = self.stages[index]
+        for _ in range(count):
+            thread = threading.Thread(
+                target=self._run_worker, args=(index,),
+                name=f"{stage.name}-{len(stage._threads)}", daemon=True
+            )
+            stage._running += 1
+            stage._threads.append(thread)
+            thread.start()
+
+    def resize(self, name: str, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        """Change a stage's worker count or queue bound while the pipeline runs
+
+        New workers start at once. Surplus workers retire after their current
+        item, so a shrink never interrupts one. A smaller queue bound only
+        stops new puts until the queue has drained below it.
+        """
+        index = [stage.name for stage in self.stages].index(name)
+        stage = self.stages[index]
+        if queue_size is not None:
+            with stage.queue.mutex:
+                stage.queue.maxsize = max(1, queue_size)
+                stage.queue.not_full.notify_all()
+        if workers is not None:
+            with stage._lock:
+                stage.workers = max(1, workers)
+                if self.started_at is not None and not stage._done and stage._running < stage.workers:
+                    self._spawn(index, stage.workers - stage._running)
+        logging.info(f"Pipeline stage {name} resized: {stage.workers} workers, queue {stage.queue.maxsize}")
+
+    def submit(self, item: Any, timeout: Optional[float] = None):
+        """Feed an item into the first stage, blocking while its queue is full"""
+        self.stages[0].queue.put(item, timeout=timeout)
+
+    def close(self):
+        """Signal end of input; stages shut down in order once drained"""
+        self.stages[0].queue.put(_STOP)
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for every stage to finish"""
+        for stage in self.stages:
+            with stage._lock:
+                threads = list(stage._threads)
+            for thread in threads:
+                thread.join(timeout)
+
+    def run(self, items) -> Dict[str, Dict[str, Any]]:
+        """Start, feed all items, drain and return stage stats"""
+        self.start()
+        for item in items:
+            self.submit(item)
+        self.close()
+        self.join()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage queue depth and utilisation"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {stage.name: stage.stats(elapsed) for stage in self.stages}
+
+    def _run_worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            with stage._lock:
+                if stage._running > stage.workers:
+                    stage._running -= 1
+                    return
+            item = stage.queue.get()
+            if item is _STOP:
+                self._worker_finished(stage, next_stage)
+                return
+
+            started = time.monotonic()
+            error = None
+            try:
+                result = stage.handler(item)
+            except Exception as e:
+                logging.error(f"Pipeline stage {stage.name} failed: {str(e)}")
+                result, error = None, e
+            with stage._lock:
+                stage.busy_seconds += time.monotonic() - started
+                stage.processed += 1
+                if error is not None:
+                    stage.failed += 1
+                elif result is None:
+                    stage.dropped += 1
+
+            if error is not None and self.on_error:
+                try:
+                    self.on_error(stage.name, item, error)
+                except Exception as e:
+                    logging.error(f"Pipeline error handler for stage {stage.name} failed: {str(e)}")
+            if result is None:
+                continue
+            if next_stage is not None:
+                # Blocks while the next stage is saturated (backpressure)
+                next_stage.queue.put(result)
+            elif self.on_result:
+                self.on_result(result)
+
+    def _worker_finished(self, stage: PipelineStage, next_stage: Optional[PipelineStage]):
+        with stage._lock:
+            stage._running -= 1
+            last = stage._running == 0
+            stage._done = last
+        if not last:
+            # Everything upstream has finished, so this put never blocks
+            stage.queue.put(_STOP)
+        elif next_stage is not None:
+            next_stage.queue.put(_STOP)
@@ -0,0 +1,140 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PositionLifecycleManager:
+    """Holds open positions in a due-time heap and closes them as they come due
+
+    Opening a position only records it; no thread or browser is tied up for the
+    hold. A small pool of workers sleeps until the earliest position is due,
+    closes it through ``close_callback`` and moves on to the next one, so a
+    single process can hold thousands of positions at once.
+    """
+
+    def __init__(self, close_callback: Callable[[Dict[str, Any]], bool],
+                 worker_count: int = 4, clock: Callable[[], float] = time.monotonic):
+        self.close_callback = close_callback
+        self.worker_count = max(1, worker_count)
+        self.clock = clock
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._running = False
+        self._in_flight = 0
+        self.closed_count = 0
+        self.failed: List[Dict[str, Any]] = []
+
+    def start(self):
+        """Start the close workers"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        for index in range(self.worker_count):
+            worker = threading.Thread(
+                target=self._run_worker, name=f"position-closer-{index}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        logging.info(f"Position lifecycle manager started with {self.worker_count} workers")
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """Stop the workers, optionally closing every pending position first"""
+        if drain:
+            self.wait_until_empty(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def open_position(self, wallet_key: str, asset: str, direction: str, size: float,
+                      hold_time: float, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Record an open position that should be closed after hold_time seconds"""
+        position = {
+            'wallet_key': wallet_key,
+            'asset': asset,
+            'direction': direction,
+            'size': size,
+            'opened_at': self.clock(),
+            'due_at': self.clock() + hold_time,
+            'context': context or {}
+        }
+        with self._condition:
+            heapq.heappush(self._heap, (position['due_at'], next(self._sequence), position))
+            # Only the earliest deadline matters to sleeping workers
+            if self._heap[0][2] is position:
+                self._condition.notify()
+        return position
+
+    def pending_count(self) -> int:
+        """Number of positions that are open and not yet being closed"""
+        with self._condition:
+            return len(self._heap)
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next position is due, or None if nothing is held"""
+        with self._condition:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self.clock())
+
+    def wait_until_empty(self, timeout: Optional[float] = None) -> bool:
+        """Block until every held position has been closed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._heap or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _take_due_position(self) -> Optional[Dict[str, Any]]:
+        """Wait for the earliest position to come due and pop it"""
+        with self._condition:
+            while self._running:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                wait_for = self._heap[0][0] - self.clock()
+                if wait_for > 0:
+                    self._condition.wait(wait_for)
+                    continue
+                _, _, position = heapq.heappop(self._heap)
+                self._in_flight += 1
+                # Another worker may now be able to take the next due position
+                if self._heap:
+                    self._condition.notify()
+                return position
+            return None
+
+    def _run_worker(self):
+        while True:
+            position = self._take_due_position()
+            if position is None:
+                return
+            try:
+                closed = self.close_callback(position)
+            except Exception as e:
+                logging.error(f"Closing position for {position['wallet_key'][:8]} failed: {str(e)}")
+                closed = False
+            with self._condition:
+                self._in_flight -= 1
+                if closed:
+                    self.closed_count += 1
+                else:
+                    self.failed.append(position)
+                self._condition.notify_all()
+            if closed:
+                logging.info(
+                    f"Closed {position['direction']} {position['asset']} position for "
+                    f"{position['wallet_key'][:8]} after "
+                    f"{self.clock() - position['opened_at']:.1f}s"
+                )
@@ -0,0 +1,197 @@
+import itertools
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Answers that never change for a given endpoint
+CONSTANT_METHODS = {'eth_chainId', 'net_version'}
+
+
+class RpcError(Exception):
+    """JSON-RPC error object returned by the node"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class JsonRpcClient:
+    """JSON-RPC client for the configured web3_provider
+
+    Per-wallet reads are sent as JSON-RPC batches (up to max_batch_size calls
+    per HTTP request) over one keep-alive connection pool, and answers that
+    cannot change (chain id, network version) are fetched once.
+    """
+
+    def __init__(self, url: str, timeout: float = 10, max_batch_size: int = 100, pool_size: int = 10):
+        self.url = url
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        # requests is imported on first use, so sessions without web3_provider never load it
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._ids = itertools.count(1)
+        self._constants: Dict[Tuple[str, str], Any] = {}
+        self.http_requests = 0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['JsonRpcClient']:
+        if not config.get('web3_provider'):
+            return None
+        return cls(config['web3_provider'], config.get('rpc_timeout', 10),
+                   config.get('rpc_batch_size', 100))
+
+    def _post(self, payload: Union[Dict, List[Dict]]) -> Any:
+        self.http_requests += 1
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _result(reply: Any) -> Any:
+        if not isinstance(reply, dict):
+            return RpcError(-32603, f"malformed reply: {reply!r}")
+        if 'error' in reply:
+            error = reply['error']
+            return RpcError(error.get('code', 0), error.get('message', ''), error.get('data'))
+        result = reply.get('result')
+        if result is None:
+            # None of the methods used here answer null, and callers parse the result
+            return RpcError(-32603, 'reply has neither result nor error')
+        return result
+
+    def call(self, method: str, params: Optional[List] = None) -> Any:
+        """Single call; raises RpcError if the node returns an error"""
+        key = (method, repr(params))
+        if method in CONSTANT_METHODS and key in self._constants:
+            return self._constants[key]
+        result = self._result(self._post({
+            'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params or []
+        }))
+        if isinstance(result, RpcError):
+            raise result
+        if method in CONSTANT_METHODS:
+            self._constants[key] = result
+        return result
+
+    def batch(self, calls: Sequence[Tuple[str, List]]) -> List[Any]:
+        """Results in call order; failed calls are returned as RpcError instances"""
+        results: List[Any] = []
+        for start in range(0, len(calls), self.max_batch_size):
+            chunk = calls[start:start + self.max_batch_size]
+            ids = [next(self._ids) for _ in chunk]
+            replies = self._post([
+                {'jsonrpc': '2.0', 'id': call_id, 'method': method, 'params': params}
+                for call_id, (method, params) in zip(ids, chunk)
+            ])
+            if isinstance(replies, dict):
+                # The node rejected the batch as a whole
+                error = self._result(replies)
+                results.extend([error] * len(chunk))
+                continue
+            # Batch replies may come back in any order
+            by_id = {reply.get('id'): reply for reply in replies if isinstance(reply, dict)}
+            for call_id in ids:
+                reply = by_id.get(call_id)
+                results.append(self._result(reply) if reply else RpcError(-32603, 'missing batch reply'))
+        return results
+
+    def chain_id(self) -> int:
+        return int(self.call('eth_chainId'), 16)
+
+    def _per_address(self, method: str, addresses: Iterable[str], block: str) -> Dict[str, Any]:
+        addresses = list(addresses)
+        results = self.batch([(method, [address, block]) for address in addresses])
+        values = {}
+        for address, result in zip(addresses, results):
+            if not isinstance(result, RpcError):
+                try:
+                    values[address] = int(result, 16)
+                    continue
+                except (TypeError, ValueError):
+                    result = RpcError(-32603, f"not a hex quantity: {result!r}")
+            logging.warning(f"{method} failed for {address}: {result}")
+        return values
+
+    def get_transaction_counts(self, addresses: Iterable[str], block: str = 'pending') -> Dict[str, int]:
+        """Nonces for many wallets in one round trip; failed lookups are left out"""
+        return self._per_address('eth_getTransactionCount', addresses, block)
+
+    def get_balances(self, addresses: Iterable[str], block: str = 'latest') -> Dict[str, int]:
+        """Balances in wei for many wallets in one round trip; failed lookups are left out"""
+        return self._per_address('eth_getBalance', addresses, block)
+
+    def eth_calls(self, calls: Sequence[Dict[str, Any]], block: str = 'latest') -> List[Any]:
+        """Batched eth_call; each entry is a call object ({'to': ..., 'data': ...})"""
+        return self.batch([('eth_call', [call, block]) for call in calls])
+
+    def close(self):
+        self.session.close()
+
+
+class NonceManager:
+    """Hands out account nonces locally instead of asking the node per trade
+
+    The first nonce of each wallet comes from eth_getTransactionCount
+    (pending), batched across wallets by prime(); later nonces are counted
+    locally. When a transaction is not accepted, release() returns its nonce
+    if it was the last one issued, and otherwise resyncs the wallet from the
+    node, as does reconcile() after errors such as "nonce too low".
+    """
+
+    def __init__(self, client: JsonRpcClient):
+        self.client = client
+        self._next: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.resyncs = 0
+
+    def prime(self, addresses: Iterable[str]):
+        """Fetch starting nonces for wallets not seen yet, in one batch"""
+        with self._lock:
+            unknown = [address for address in addresses if address not in self._next]
+        if not unknown:
+            return
+        counts = self.client.get_transaction_counts(unknown)
+        with self._lock:
+            for address, count in counts.items():
+                self._next.setdefault(address, count)
+
+    def next_nonce(self, address: str) -> int:
+        with self._lock:
+            known = address in self._next
+        if not known:
+            self.prime([address])
+        with self._lock:
+            if address not in self._next:
+                raise RpcError(-32603, f"could not fetch nonce for {address}")
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+            return nonce
+
+    def release(self, address: str, nonce: int):
+        """The transaction using nonce was not accepted"""
+        with self._lock:
+            if self._next.get(address) == nonce + 1:
+                self._next[address] = nonce
+                return
+        # Later nonces are already out; the node decides what is next
+        self.reconcile([address])
+
+    def reconcile(self, addresses: Iterable[str]):
+        """Resync wallets from the node's pending transaction count"""
+        addresses = list(addresses)
+        counts = self.client.get_transaction_counts(addresses)
+        with self._lock:
+            for address in addresses:
+                if address in counts:
+                    self._next[address] = counts[address]
+                else:
+                    self._next.pop(address, None)
+            self.resyncs += 1
+        logging.info(f"Reconciled nonces for {len(addresses)} wallets")
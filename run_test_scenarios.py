@@ -1,10 +1,12 @@
 from test_data import TEST_WALLETS, TEST_PROXIES, TEST_CONFIGS, TEST_TRADE_SCENARIOS
 from test_utils import setup_test_files, cleanup_test_files
 from crypto_trading_bot import TradingSession
+from session_profiler import PROFILE_MODES
+import argparse
 import logging
 import time
 
-def run_test_scenarios():
+def run_test_scenarios(profile=None):
     # Setup logging
     logging.basicConfig(
         level=logging.INFO,
@@ -18,7 +20,8 @@ def run_test_scenarios():
     try:
         # 1. Test Parallel Trading
         logging.info("=== Testing Parallel Trading ===")
-        parallel_session = TradingSession(TEST_CONFIGS["parallel_trading"])
+        parallel_session = TradingSession(dict(TEST_CONFIGS["parallel_trading"], profile=profile))
+        parallel_session.start_profiling()
         
         for scenario in TEST_TRADE_SCENARIOS:
             logging.info(f"\nExecuting scenario: {scenario['name']}")
@@ -32,11 +35,13 @@ def run_test_scenarios():
             
             logging.info(f"Scenario {scenario['name']} result: {result}")
             time.sleep(2)  # Delay between scenarios
+            parallel_session.profile_phase(scenario['name'])
+        parallel_session.stop_profiling()
         
         # 2. Test Branch Trading
         logging.info("\n=== Testing Branch Trading ===")
-        branch_session = TradingSession(TEST_CONFIGS["branch_trading"])
-        branch_session.execute_branch_trading()
+        branch_session = TradingSession(dict(TEST_CONFIGS["branch_trading"], profile=profile))
+        branch_session.run_session("branch")
         
     except Exception as e:
         logging.error(f"Test scenario execution failed: {str(e)}")
@@ -46,4 +51,7 @@ def run_test_scenarios():
         logging.info("Test scenarios completed")
 
 if __name__ == "__main__":
-    run_test_scenarios() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the TEST_TRADE_SCENARIOS against test wallets")
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help="Profile each session and write reports next to its trade_results CSV")
+    run_test_scenarios(parser.parse_args().profile) 
\ No newline at end of file
@@ -1,7 +1,16 @@
 from crypto_trading_bot import TradingSession
+from session_profiler import PROFILE_MODES
+import argparse
 import logging
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the parallel and branch trading test session")
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help="Profile the session and write reports next to the trade_results CSV")
+    parser.add_argument('--journal', metavar='PATH',
+                        help="Record every order to a JSONL workload journal for workload_replay.py")
+    args = parser.parse_args()
+
     # Configure logging
     logging.basicConfig(
         level=logging.INFO,
@@ -23,25 +32,38 @@ def main():
         'trading_assets': ['BTC', 'ETH', 'SOL'],
         'position_direction': 'random',
         'volume_percentage_range': (10, 50),
-        'trades_per_wallet': 2
+        'trades_per_wallet': 2,
+        'profile': args.profile
     }
 
     # Initialize trading session
     session = TradingSession(config)
+    recorder = None
+    if args.journal:
+        from workload_replay import WorkloadRecorder
+        recorder = WorkloadRecorder(args.journal).attach(session)
 
+    session.start_profiling()
     try:
         # Test parallel trading
         logging.info("Starting parallel trading test...")
         session.execute_parallel_trading()
         logging.info("Parallel trading completed")
+        session.profile_phase('parallel')
 
         # Test branch trading
         logging.info("Starting branch trading test...")
         session.execute_branch_trading()
         logging.info("Branch trading completed")
+        session.profile_phase('branch')
 
     except Exception as e:
         logging.error(f"Trading error: {str(e)}")
 
+    finally:
+        session.stop_profiling()
+        if recorder:
+            recorder.close()
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
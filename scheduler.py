@@ -0,0 +1,142 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Why an item was shed: still queued past its deadline, or dispatched in time but late downstream
+EXPIRED = 'expired'
+LATE = 'late'
+
+
+def flow_name(flow: Hashable) -> str:
+    """Printable flow key, e.g. ('BTC', 3) -> 'BTC/3'"""
+    return '/'.join(map(str, flow)) if isinstance(flow, tuple) else str(flow)
+
+
+class _Flow:
+    __slots__ = ('key', 'weight', 'items', 'start_tag', 'finish_tag', 'dispatched', 'shed')
+
+    def __init__(self, key: Hashable, weight: float):
+        self.key = key
+        self.weight = weight
+        # (deadline, seq, expires, item)
+        self.items: List[Tuple[float, int, Optional[float], Any]] = []
+        self.start_tag = 0.0
+        self.finish_tag = 0.0
+        self.dispatched = 0
+        self.shed: Counter = Counter()
+
+
+class FairScheduler:
+    """Weighted fair queueing across flows, earliest deadline first within each flow
+
+    Items are queued per flow (for trade legs: an asset and proxy pair).
+    pop() serves flows in start-time fair queueing order: each dispatch
+    advances its flow's virtual finish tag by 1/weight, and an idle flow
+    that becomes busy starts at the current virtual time, so no flow can
+    bank credit or be starved by a burst on another. Within a flow the item
+    with the earliest deadline goes first. An item still queued after its
+    expiry is shed rather than dispatched: it is counted and handed to
+    on_shed, and costs its flow no virtual time. push and pop are O(log n).
+    """
+
+    def __init__(self, weight: Optional[Callable[[Hashable], float]] = None,
+                 on_shed: Optional[Callable[[Any, str], None]] = None, clock: Callable[[], float] = time.monotonic):
+        self.weight = weight or (lambda flow: 1.0)
+        self.on_shed = on_shed
+        self.clock = clock
+        self.flows: Dict[Hashable, _Flow] = {}
+        self.virtual_time = 0.0
+        self.queued = 0
+        self.dispatched = 0
+        self.shed_count = 0
+        # Busy flows as (start_tag, order, flow)
+        self._active: List[Tuple[float, int, _Flow]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, item: Any, flow: Hashable, deadline: float, expires: Optional[float] = None):
+        """Queue an item; it is shed if still queued at expires (None: never)"""
+        with self._lock:
+            state = self.flows.get(flow)
+            if state is None:
+                weight = self.weight(flow)
+                if weight <= 0:
+                    raise ValueError(f"Flow {flow_name(flow)} needs a positive weight, got {weight}")
+                state = self.flows[flow] = _Flow(flow, weight)
+            if not state.items:
+                state.start_tag = max(self.virtual_time, state.finish_tag)
+                heapq.heappush(self._active, (state.start_tag, next(self._seq), state))
+            heapq.heappush(state.items, (deadline, next(self._seq), expires, item))
+            self.queued += 1
+
+    def pop(self, now: Optional[float] = None) -> Optional[Any]:
+        """Next item to dispatch, or None when nothing is queued"""
+        now = self.clock() if now is None else now
+        shed: List[Any] = []
+        with self._lock:
+            item = None
+            while self._active and item is None:
+                _, _, state = heapq.heappop(self._active)
+                while state.items:
+                    _, _, expires, candidate = heapq.heappop(state.items)
+                    self.queued -= 1
+                    if expires is not None and now > expires:
+                        self._count_shed(state, EXPIRED)
+                        shed.append(candidate)
+                        continue
+                    item = candidate
+                    break
+                if item is None:
+                    # Every item of the flow had expired; it goes idle without being charged
+                    continue
+                self.virtual_time = state.start_tag
+                state.finish_tag = state.start_tag + 1.0 / state.weight
+                state.dispatched += 1
+                self.dispatched += 1
+                if state.items:
+                    state.start_tag = state.finish_tag
+                    heapq.heappush(self._active, (state.start_tag, next(self._seq), state))
+        if self.on_shed:
+            for candidate in shed:
+                self.on_shed(candidate, EXPIRED)
+        return item
+
+    def reweight(self):
+        """Ask the weight function again for every known flow, e.g. after a config change
+
+        A new weight applies from each flow's next dispatch on.
+        """
+        with self._lock:
+            for key, state in self.flows.items():
+                weight = self.weight(key)
+                if weight > 0:
+                    state.weight = weight
+
+    def shed(self, flow: Hashable, reason: str = LATE):
+        """Count an item of flow that was dropped after dispatch, e.g. because it missed its window downstream"""
+        with self._lock:
+            self._count_shed(self.flows[flow], reason)
+
+    def _count_shed(self, state: _Flow, reason: str):
+        state.shed[reason] += 1
+        self.shed_count += 1
+
+    def __len__(self) -> int:
+        return self.queued
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals and per-flow dispatched, shed (by reason) and queued counts"""
+        with self._lock:
+            return {
+                'queued': self.queued,
+                'dispatched': self.dispatched,
+                'shed': self.shed_count,
+                'flows': {
+                    flow_name(key): {'weight': state.weight, 'dispatched': state.dispatched,
+                                     'queued': len(state.items), 'shed': dict(state.shed)}
+                    for key, state in self.flows.items()
+                }
+            }
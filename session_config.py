@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import signal
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, NonNegativeFloat, NonNegativeInt, PositiveFloat, PositiveInt, \
+    model_validator
+
+if TYPE_CHECKING:
+    from crypto_trading_bot import TradingSession
+
+# Read once while a TradingSession is built; changing one needs a new session
+RESTART_KEYS = frozenset({
+    'keys_file', 'keystore_dir', 'keystore_password', 'unlock_workers', 'proxy_file', 'proxy_type',
+    'results_dir', 'web3_provider', 'rpc_timeout', 'rpc_batch_size', 'order_signing', 'tx_node_id',
+    'profile', 'tracing', 'balance_check', 'balance_ttl', 'margin_token', 'margin_token_decimals', 'wallet_balance'
+})
+
+# Staged pipeline stages, each sized by config '<stage>_concurrency'
+STAGES = ('plan', 'proxy', 'sign', 'submit', 'record')
+
+
+class SessionConfig(BaseModel):
+    """Validated, immutable snapshot of the settings a TradingSession reads while it trades
+
+    Built from the session's config dict (keys it does not know stay in
+    the dict) and replaced whole by TradingSession.reconfigure, so hot paths
+    read plain attributes and a leg never sees half of a change.
+    """
+
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
+    enable_logs: bool = True
+    enable_shuffling: bool = True
+    thread_count: PositiveInt = 10
+    launch_delay: Tuple[NonNegativeFloat, NonNegativeFloat] = (0, 20)
+    branch_wallet_range: Tuple[PositiveInt, PositiveInt] = (2, 5)
+    max_parallel_branches: NonNegativeInt = 5
+    trading_assets: Tuple[str, ...] = ('BTC', 'ETH', 'SOL')
+    position_direction: Literal['random', 'long', 'short'] = 'random'
+    volume_percentage_range: Tuple[NonNegativeFloat, NonNegativeFloat] = (10, 50)
+    min_trade_size: NonNegativeFloat = 0.0
+    max_batch_size: PositiveInt = 10
+    leg_group_size: PositiveInt = 256
+    pipeline_queue_size: PositiveInt = 100
+    plan_concurrency: PositiveInt = 1
+    proxy_concurrency: PositiveInt = 2
+    sign_concurrency: PositiveInt = 1
+    submit_concurrency: PositiveInt = 8
+    record_concurrency: PositiveInt = 1
+    # Staged submits per second across the session, None for no limit
+    submit_rate: Optional[PositiveFloat] = None
+    scheduler: Literal['fifo', 'fair'] = 'fifo'
+    launch_window: Optional[NonNegativeFloat] = None
+    asset_weights: Dict[str, PositiveFloat] = {}
+    proxy_weights: Dict[str, PositiveFloat] = {}
+    # Fair scheduler weight boost for assets whose filled legs are one-sided, see TradingSession._flow_weight
+    exposure_priority: NonNegativeFloat = 0.0
+
+    @model_validator(mode='after')
+    def _check_ranges(self) -> 'SessionConfig':
+        for name in ('launch_delay', 'branch_wallet_range', 'volume_percentage_range'):
+            low, high = getattr(self, name)
+            if low > high:
+                raise ValueError(f"{name} must be (low, high), got ({low}, {high})")
+        if self.branch_wallet_range[0] < 2:
+            raise ValueError("branch_wallet_range needs at least 2 wallets per branch")
+        if not self.trading_assets:
+            raise ValueError("trading_assets must not be empty")
+        return self
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SessionConfig':
+        """Snapshot of config; raises ValueError (a pydantic ValidationError) naming each bad key"""
+        return cls.model_validate(config)
+
+    def concurrency(self, stage: str) -> int:
+        return getattr(self, f'{stage}_concurrency')
+
+
+def restart_keys_changed(config: Dict[str, Any], changes: Dict[str, Any]) -> List[str]:
+    """Keys of changes that would alter a RESTART_KEYS setting of config"""
+    return sorted(key for key in changes if key in RESTART_KEYS and changes[key] != config.get(key))
+
+
+class ConfigWatcher:
+    """Applies a JSON file of config changes to a running session whenever it changes
+
+    The file holds only the keys to change, e.g. {"submit_concurrency": 16}.
+    It is polled every interval seconds, and re-read at once on SIGHUP where
+    the platform has it and start() runs on the main thread. Changes that
+    fail validation are logged and the running snapshot is kept; write the
+    file with a rename to avoid reading it half-written.
+    """
+
+    def __init__(self, session: 'TradingSession', path: str, interval: float = 2.0):
+        self.session = session
+        self.path = path
+        self.interval = interval
+        self.applied = 0
+        self.errors = 0
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous_handler = None
+
+    def check(self, force: bool = False) -> bool:
+        """Apply the file if it changed since the last check (or force); True if a snapshot was swapped in"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp and not force:
+            return False
+        self._stamp = stamp
+        try:
+            with open(self.path, 'r') as f:
+                changes = json.load(f)
+            if not isinstance(changes, dict):
+                raise ValueError("expected a JSON object of config keys")
+            self.session.reconfigure(changes)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            logging.error(f"Config changes in {self.path} not applied: {str(e)}")
+            return False
+        self.applied += 1
+        return True
+
+    def start(self) -> 'ConfigWatcher':
+        """Apply the file as it is now, then watch it from a daemon thread"""
+        self.check()
+        if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGHUP, lambda signum, frame: self._wake.set())
+        self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+        self._thread.start()
+        logging.info(f"Watching {self.path} for config changes")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGHUP, self._previous_handler)
+            self._previous_handler = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            woken = self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.check(force=woken)
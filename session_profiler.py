@@ -0,0 +1,297 @@
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+# Before 3.12 a cProfile profiler hooks only the thread that enables it, and
+# Profile.disable() only unhooks the calling thread. From 3.12 one profiler
+# covers every thread through sys.monitoring.
+_PROFILE_PER_THREAD = sys.version_info < (3, 12)
+
+
+def _label(filename: str, line: int, name: str) -> str:
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _thread_cpu_time(ident: int) -> Optional[float]:
+    """CPU seconds used so far by the thread with this ident, where the OS exposes it"""
+    if ident == threading.get_ident():
+        return time.thread_time()
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+
+def _thread_state() -> int:
+    """Address of the calling thread's PyThreadState"""
+    import ctypes
+    get_state = ctypes.pythonapi.PyThreadState_Get
+    get_state.restype = ctypes.c_void_p
+    return get_state()
+
+
+def _unhook_threads(thread_states: Set[int]):
+    """Remove the profile function of each live thread whose PyThreadState is listed
+
+    What threading.setprofile_all_threads(None) does from 3.12, limited to
+    the given threads; the GIL is held throughout.
+    """
+    import ctypes
+    api = ctypes.pythonapi
+    api.PyInterpreterState_Get.restype = ctypes.c_void_p
+    api.PyInterpreterState_ThreadHead.argtypes = [ctypes.c_void_p]
+    api.PyInterpreterState_ThreadHead.restype = ctypes.c_void_p
+    api.PyThreadState_Next.argtypes = [ctypes.c_void_p]
+    api.PyThreadState_Next.restype = ctypes.c_void_p
+    api._PyEval_SetProfile.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+    state = api.PyInterpreterState_ThreadHead(api.PyInterpreterState_Get())
+    while state:
+        if state in thread_states:
+            api._PyEval_SetProfile(state, None, None)
+        state = api.PyThreadState_Next(state)
+
+
+def folded_from_stats(stats: Dict, min_fraction: float = 1e-4, max_depth: int = 64) -> Counter:
+    """Approximate collapsed stacks (microseconds) from a cProfile call graph
+
+    cProfile keeps caller -> callee edges rather than stacks, so each callee's
+    own time is split across the paths leading to it in proportion to the
+    cumulative time spent along each edge.
+    """
+    callees: Dict[Tuple, Dict[Tuple, float]] = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    total = sum(stats[func][3] for func in roots) or 1.0
+    folded: Counter = Counter()
+
+    def walk(func: Tuple, path: str, seen: frozenset, fraction: float, depth: int):
+        self_time = stats[func][2] * fraction
+        if self_time > 0:
+            folded[path] += int(self_time * 1e6)
+        if depth >= max_depth:
+            return
+        for callee, edge_time in callees.get(func, {}).items():
+            callee_total = stats[callee][3]
+            if callee in seen or callee_total <= 0:
+                continue
+            callee_fraction = edge_time * fraction / callee_total
+            if callee_fraction * callee_total < min_fraction * total:
+                continue
+            walk(callee, f"{path};{_label(*callee)}", seen | {callee}, callee_fraction, depth + 1)
+
+    for root in roots:
+        walk(root, _label(*root), frozenset([root]), 1.0, 0)
+    return folded
+
+
+class SessionProfiler:
+    """Per-session profiling: cProfile or stack sampling, tracemalloc, thread CPU
+
+    mode 'cprofile' profiles the starting thread and every thread started
+    while it runs, and derives an approximate flamegraph from the call graph;
+    mode 'sampling' walks every thread's stack each interval seconds, which
+    costs far less per call and records real stacks. tracemalloc snapshots
+    are taken at each mark() so the allocation report shows what each phase
+    of the session added. Thread CPU is read at each mark() and polled about
+    every 0.1s, so threads that live shorter than that may be missing from
+    the thread report. On stop(), files are written next to output_base
+    (the trade_results CSV path without .csv): .folded (collapsed stacks for
+    flamegraph.pl or speedscope), .alloc.txt, .threads.txt and, for
+    cprofile, .prof.
+
+    TradingSession only builds a profiler when config['profile'] is set.
+    """
+
+    def __init__(self, output_base: str, mode: str = 'sampling', interval: float = 0.005,
+                 top: int = 25, trace_memory: bool = True):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Invalid profile mode: {mode}")
+        self.output_base = output_base
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+        self.trace_memory = trace_memory
+        self.samples: Counter = Counter()
+        self.phases: List[Tuple[str, float, Optional[tracemalloc.Snapshot]]] = []
+        self.thread_cpu: Dict[int, Tuple[str, float]] = {}
+        self._cpu_start: Dict[int, float] = {}
+        self._profiles: List[cProfile.Profile] = []
+        # PyThreadState addresses of threads hooked by _profile_new_thread
+        self._profiled_threads: Set[int] = set()
+        self._depth = 0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started_tracemalloc = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, csv_path: str) -> Optional['SessionProfiler']:
+        """config['profile'] is a mode name or a dict of SessionProfiler arguments"""
+        settings = config.get('profile')
+        if not settings:
+            return None
+        if isinstance(settings, str):
+            settings = {'mode': settings}
+        return cls(os.path.splitext(csv_path)[0], **settings)
+
+    def start(self):
+        """Begin profiling; nested start/stop pairs only profile once"""
+        self._depth += 1
+        if self._depth > 1:
+            return
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(16)
+            self._started_tracemalloc = True
+        self._sample_thread_cpu(start=True)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='session-profiler', daemon=True)
+        self._sampler.start()
+        if self.mode == 'cprofile':
+            if _PROFILE_PER_THREAD:
+                threading.setprofile(self._profile_new_thread)
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            profile.enable()
+        self.mark('start')
+
+    def _profile_new_thread(self, frame, event, arg):
+        # Runs once in each thread started while profiling: swap in a cProfile profiler
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            if self._depth == 0:
+                return
+            self._profiles.append(profile)
+            self._profiled_threads.add(_thread_state())
+            profile.enable()
+
+    def _sample_loop(self):
+        """Stack samples in sampling mode; in both modes, thread CPU about every 0.1s"""
+        own = threading.get_ident()
+        sampling = self.mode == 'sampling'
+        interval = self.interval if sampling else 0.1
+        last_cpu_poll = time.monotonic()
+        while not self._stop.wait(interval):
+            if time.monotonic() - last_cpu_poll >= 0.1:
+                # Catch threads before they exit
+                self._sample_thread_cpu()
+                last_cpu_poll = time.monotonic()
+            if not sampling:
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(_label(code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def _sample_thread_cpu(self, start: bool = False):
+        for thread in threading.enumerate():
+            if thread.ident is None or thread.name == 'session-profiler':
+                continue
+            cpu = _thread_cpu_time(thread.ident)
+            if cpu is None:
+                continue
+            # Threads started after start() are charged from zero
+            base = self._cpu_start.setdefault(thread.ident, cpu if start else 0.0)
+            self.thread_cpu[thread.ident] = (thread.name, cpu - base)
+
+    def mark(self, phase: str):
+        """Record a phase boundary: wall time, thread CPU and a tracemalloc snapshot"""
+        if self._depth == 0:
+            return
+        snapshot = tracemalloc.take_snapshot() if self.trace_memory and tracemalloc.is_tracing() else None
+        self._sample_thread_cpu()
+        self.phases.append((phase, time.perf_counter(), snapshot))
+
+    def stop(self) -> Dict[str, str]:
+        """Stop profiling and write the report files; returns their paths"""
+        if self._depth == 0:
+            return {}
+        if self._depth > 1:
+            self._depth -= 1
+            return {}
+        self.mark('stop')
+        self._depth = 0
+        if self.mode == 'cprofile':
+            with self._lock:
+                threading.setprofile(None)
+                for profile in self._profiles:
+                    profile.disable()
+                if self._profiled_threads:
+                    # disable() above only unhooked this thread
+                    _unhook_threads(self._profiled_threads)
+                    self._profiled_threads.clear()
+        self._stop.set()
+        self._sampler.join()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return self.write_reports()
+
+    def write_reports(self) -> Dict[str, str]:
+        paths = {'folded': self.output_base + '.folded',
+                 'alloc': self.output_base + '.alloc.txt',
+                 'threads': self.output_base + '.threads.txt'}
+
+        if self.mode == 'cprofile':
+            paths['prof'] = self.output_base + '.prof'
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(paths['prof'])
+            folded = folded_from_stats(stats.stats)
+        else:
+            folded = self.samples
+        with open(paths['folded'], 'w') as f:
+            for stack, count in sorted(folded.items()):
+                if count:
+                    f.write(f"{stack} {count}\n")
+
+        with open(paths['alloc'], 'w') as f:
+            f.write(self.allocation_report())
+
+        with open(paths['threads'], 'w') as f:
+            f.write(f"{'thread':<32} {'cpu_s':>10}\n")
+            for name, cpu in sorted(self.thread_cpu.values(), key=lambda item: -item[1]):
+                f.write(f"{name:<32} {cpu:>10.3f}\n")
+            f.write("\nphase                            wall_s\n")
+            for (phase, started, _), (_, ended, _) in zip(self.phases, self.phases[1:]):
+                f.write(f"{phase:<32} {ended - started:>10.3f}\n")
+
+        logging.info(f"Profile written to {self.output_base}.*")
+        return paths
+
+    def allocation_report(self) -> str:
+        """Top allocation sites added during each phase, then live at the end"""
+        own_frames = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        snapshots = [(phase, snapshot.filter_traces(own_frames))
+                     for phase, _, snapshot in self.phases if snapshot is not None]
+        if not snapshots:
+            return "tracemalloc was off\n"
+        lines = []
+        for (phase, before), (_, after) in zip(snapshots, snapshots[1:]):
+            lines.append(f"== {phase}: top {self.top} allocation sites by growth")
+            for stat in after.compare_to(before, 'lineno')[:self.top]:
+                lines.append(f"  {stat}")
+            lines.append("")
+        lines.append(f"== live at stop: top {self.top} allocation sites")
+        for stat in snapshots[-1][1].statistics('lineno')[:self.top]:
+            lines.append(f"  {stat}")
+        return "\n".join(lines) + "\n"
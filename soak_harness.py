@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from crypto_trading_bot import TradingSession
+from execution_plan import plan_session
+from mock_exchange import HttpExchangeBackend, add_server_arguments, servers_from_args
+from session_config import ConfigWatcher
+from trade_result import TradeResult, TradeStatus
+from workload_replay import percentile
+
+
+def process_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where /proc is missing)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def open_fds() -> Optional[int]:
+    """Open file descriptors of this process, None where /proc is missing"""
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+
+def generate_wallets(count: int, seed: int = 0) -> List[str]:
+    """Deterministic throwaway private keys for load tests"""
+    return ['0x' + hashlib.sha256(f"soak-{seed}-{index}".encode('utf-8')).hexdigest() for index in range(count)]
+
+
+def _slope(points: Sequence[Sequence[float]]) -> Optional[float]:
+    """Least squares slope of (x, y) points"""
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+class SoakMonitor:
+    """Submit listener that turns a long run into per-interval samples
+
+    Each sample covers the requests since the previous one: latency
+    p50/p99, error rate and throughput, plus the process RSS and open file
+    descriptors at the time. Whole-run percentiles come from a fixed-size
+    reservoir, so memory stays flat however long the soak runs.
+    """
+
+    def __init__(self, reservoir_size: int = 100_000, seed: Optional[int] = None):
+        self.reservoir_size = reservoir_size
+        self.reservoir: List[float] = []
+        self.samples: List[Dict[str, Any]] = []
+        self.trades = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._seen = 0
+        self._window: List[float] = []
+        self._window_trades = 0
+        self._window_errors = 0
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self._window_start = self.started
+
+    def __call__(self, results: List[TradeResult], submitted_at: float, latency: float):
+        failed = sum(result.status is not TradeStatus.SUCCESS for result in results)
+        with self._lock:
+            self._window.append(latency)
+            self._window_trades += len(results)
+            self._window_errors += failed
+            self.trades += len(results)
+            self.errors += failed
+            # Algorithm R: every request is equally likely to be in the reservoir
+            self._seen += 1
+            if len(self.reservoir) < self.reservoir_size:
+                self.reservoir.append(latency)
+            else:
+                slot = self._rng.randrange(self._seen)
+                if slot < self.reservoir_size:
+                    self.reservoir[slot] = latency
+
+    def sample(self) -> Dict[str, Any]:
+        """Close the current window and record it"""
+        now = time.monotonic()
+        with self._lock:
+            window, trades, errors = self._window, self._window_trades, self._window_errors
+            self._window, self._window_trades, self._window_errors = [], 0, 0
+            elapsed = now - self._window_start
+            self._window_start = now
+        sample = {
+            'elapsed': now - self.started,
+            'requests': len(window),
+            'trades': trades,
+            'throughput': trades / elapsed if elapsed > 0 else None,
+            'error_rate': errors / trades if trades else None,
+            'latency_p50': percentile(window, 0.5),
+            'latency_p99': percentile(window, 0.99),
+            'rss_bytes': process_rss(),
+            'open_fds': open_fds()
+        }
+        self.samples.append(sample)
+        return sample
+
+    def summary(self, warmup: float = 0.2, rss_threshold_mb: float = 50.0, fd_threshold: int = 50) -> Dict[str, Any]:
+        """Whole-run figures and growth after the first warmup fraction of samples
+
+        RSS growth is a least squares slope in MB per hour, so one large
+        allocation late in the run does not read as a leak; descriptor
+        growth is the last sample minus the first one after warm-up.
+        """
+        with self._lock:
+            latencies = list(self.reservoir)
+        steady = self.samples[int(len(self.samples) * warmup):]
+        rss_slope = _slope([(s['elapsed'] / 3600, s['rss_bytes'] / 2 ** 20) for s in steady])
+        fds = [s['open_fds'] for s in steady if s['open_fds'] is not None]
+        fd_growth = fds[-1] - fds[0] if fds else None
+        leaks = []
+        if rss_slope is not None and rss_slope > rss_threshold_mb:
+            leaks.append('rss')
+        if fd_growth is not None and fd_growth > fd_threshold:
+            leaks.append('fds')
+        return {
+            'duration': time.monotonic() - self.started,
+            'trades': self.trades,
+            'errors': self.errors,
+            'error_rate': self.errors / self.trades if self.trades else None,
+            'latency_p50': percentile(latencies, 0.5),
+            'latency_p99': percentile(latencies, 0.99),
+            'rss_start_mb': self.samples[0]['rss_bytes'] / 2 ** 20 if self.samples else None,
+            'rss_end_mb': self.samples[-1]['rss_bytes'] / 2 ** 20 if self.samples else None,
+            'rss_growth_mb_per_hour': rss_slope,
+            'fds_start': self.samples[0]['open_fds'] if self.samples else None,
+            'fds_end': self.samples[-1]['open_fds'] if self.samples else None,
+            'fd_growth': fd_growth,
+            'suspected_leaks': leaks
+        }
+
+
+def run_soak(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run staged plans against the stand-in exchange until args.duration has passed"""
+    if args.exchange_url and not args.proxy_address:
+        raise ValueError("A running exchange needs a running proxy too (--proxy-address)")
+    workdir = tempfile.mkdtemp(prefix='soak_')
+    exchange = proxy = None
+    if not args.exchange_url:
+        exchange, proxy = servers_from_args(args)
+        exchange.start()
+        proxy.start()
+    exchange_url = args.exchange_url or exchange.url
+    proxy_address = args.proxy_address or f"{proxy.host}:{proxy.port}"
+
+    keys_file = os.path.join(workdir, 'wallet_keys.txt')
+    proxy_file = os.path.join(workdir, 'proxies.txt')
+    with open(keys_file, 'w') as f:
+        f.write("\n".join(generate_wallets(args.wallets, args.seed or 0)))
+    with open(proxy_file, 'w') as f:
+        # Distinct credentials give each entry its own client connection pool, as with real proxies
+        f.write("\n".join(f"{proxy_address}@soak{index}:soak" for index in range(args.proxies)))
+
+    config = {
+        'keys_file': keys_file, 'proxy_file': proxy_file, 'enable_logs': False,
+        'results_dir': args.results_dir or os.path.join(workdir, 'trade_results'),
+        'trades_per_wallet': 1, 'enable_shuffling': True,
+        # Mean launch spacing of 1/rate keeps the offered load at about rate trades per second
+        'launch_delay': (0, 2.0 / args.trade_rate) if args.trade_rate else (0, 0),
+        'submit_concurrency': args.concurrency, 'pipeline_queue_size': args.concurrency * 4
+    }
+    session = TradingSession(config)
+    manager = session.transaction_manager
+    backend = HttpExchangeBackend(exchange_url, timeout=args.timeout, pool_size=args.concurrency,
+                                  id_generator=manager.id_generator, order_signer=manager.order_signer,
+                                  max_batch_size=manager.max_batch_size, nonce_manager=manager.nonce_manager)
+    session.transaction_manager = backend
+    watcher = ConfigWatcher(session, args.control).start() if args.control else None
+    monitor = SoakMonitor(seed=args.seed)
+    backend.submit_listeners.append(monitor)
+    wallets = session.wallet_manager.wallets
+
+    stop = threading.Event()
+    output = open(args.output, 'a') if args.output else None
+
+    def sampler():
+        while not stop.wait(args.interval):
+            sample = monitor.sample()
+            if output:
+                output.write(json.dumps(sample) + "\n")
+                output.flush()
+            logging.warning(f"soak {sample['elapsed']:.0f}s: {sample['trades']} trades, "
+                            f"p50 {sample['latency_p50']}, p99 {sample['latency_p99']}, "
+                            f"errors {sample['error_rate']}, rss {sample['rss_bytes'] / 2 ** 20:.1f} MB, "
+                            f"fds {sample['open_fds']}")
+
+    thread = threading.Thread(target=sampler, name='soak-sampler', daemon=True)
+    monitor.sample()
+    thread.start()
+    deadline = time.monotonic() + args.duration
+    rounds = 0
+    try:
+        # Rounds run to completion; the soak stops at the first round boundary past the deadline
+        while time.monotonic() < deadline:
+            # session.config, so --control changes reach the next round's plan
+            plan = plan_session(session.config, wallets, 'parallel', seed=(args.seed or 0) + rounds)
+            session.execute_staged_plan(plan)
+            rounds += 1
+    finally:
+        stop.set()
+        thread.join()
+        if watcher:
+            watcher.stop()
+        monitor.sample()
+        backend.close()
+        if output:
+            output.close()
+        if proxy:
+            proxy.stop()
+        if exchange:
+            exchange.stop()
+        if not args.keep_files:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = monitor.summary(args.warmup, args.rss_threshold, args.fd_threshold)
+    report['rounds'] = rounds
+    report['wallets'] = len(wallets)
+    if exchange:
+        report['exchange'] = exchange.stats()
+        report['proxy'] = proxy.stats()
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Soak TradingSession against the stand-in exchange and proxy, watching latency and leaks"
+    )
+    parser.add_argument('--duration', type=float, default=3600, help="Seconds to keep starting rounds")
+    parser.add_argument('--wallets', type=int, default=20000)
+    parser.add_argument('--proxies', type=int, default=16)
+    parser.add_argument('--trade-rate', type=float, default=50.0, help="Offered trades per second, 0 for unpaced")
+    parser.add_argument('--concurrency', type=int, default=32, help="Submit stage workers")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Client request timeout")
+    parser.add_argument('--interval', type=float, default=30.0, help="Seconds per sample")
+    parser.add_argument('--warmup', type=float, default=0.2, help="Fraction of samples left out of leak checks")
+    parser.add_argument('--rss-threshold', type=float, default=50.0, help="MB per hour of RSS growth to flag")
+    parser.add_argument('--fd-threshold', type=int, default=50, help="Descriptor growth to flag")
+    parser.add_argument('--exchange-url', default=None, help="Use a running exchange instead of starting one")
+    parser.add_argument('--proxy-address', default=None, help="host:port of a running proxy")
+    parser.add_argument('--output', default=None, help="Append per-interval samples to this JSONL file")
+    parser.add_argument('--results-dir', default=None, help="Keep the trade_results CSV here")
+    parser.add_argument('--keep-files', action='store_true', help="Keep the generated keys and proxies")
+    parser.add_argument('--control', default=None,
+                        help="JSON file of session config changes, applied mid-soak when it changes or on SIGHUP")
+    add_server_arguments(parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger().setLevel(logging.WARNING)
+    report = run_soak(args)
+    print(json.dumps(report, indent=2))
+    if report['suspected_leaks']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+# Page served by the stand-in platform. Element ids and classes match
+# TradingPlatformUI.SELECTORS and every button calls the same JSON API the
+# replay engine talks to.
+PLATFORM_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Stand-in trading platform</title></head>
+<body>
+<form id="waitlist"><input name="waitlist-email"><button id="submit-waitlist-btn" type="button">Join</button></form>
+<button id="connect-wallet-btn" onclick="connectWallet()">Connect Wallet</button>
+<button id="create-portfolio-btn" onclick="createPortfolio()">Create portfolio</button>
+<button class="deposit-usdc-button" onclick="deposit()">Deposit USDC</button>
+<select id="asset-selector"><option value="BTC">BTC</option><option value="ETH">ETH</option><option value="SOL">SOL</option></select>
+<button id="long-position-btn" onclick="state.direction='long'">Long</button>
+<button id="short-position-btn" onclick="state.direction='short'">Short</button>
+<input id="leverage-slider" type="range" min="1" max="50" value="1">
+<input name="trade-volume" type="number">
+<button id="approve-usdc-btn" style="display:none">Approve USDC</button>
+<button id="confirm-trade-btn" onclick="trade()">Confirm</button>
+<button id="close-position-btn" onclick="closePosition()">Close position</button>
+<table class="trading-history-table"><tbody></tbody></table>
+<script>
+var state = {wallet: null, portfolio: null, position: null, direction: 'long'};
+var post = function (path, body) {
+    return fetch(path, {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(body)})
+        .then(function (r) { return r.json(); });
+};
+function connectWallet() {
+    state.wallet = window.walletAddress || 'unknown';
+    return post('/api/wallet/connect', {wallet: state.wallet});
+}
+function createPortfolio() {
+    return post('/api/portfolio', {wallet: state.wallet}).then(function (r) { state.portfolio = r.portfolio_id; });
+}
+function deposit() {
+    return post('/api/deposit', {portfolio_id: state.portfolio, amount: 10000});
+}
+function trade() {
+    return post('/api/trade', {
+        portfolio_id: state.portfolio,
+        asset: document.getElementById('asset-selector').value,
+        direction: state.direction,
+        leverage: Number(document.getElementById('leverage-slider').value),
+        size: Number(document.querySelector('input[name="trade-volume"]').value)
+    }).then(function (r) { state.position = r.position_id; });
+}
+function closePosition() {
+    return post('/api/position/close', {position_id: state.position});
+}
+</script>
+</body>
+</html>
+"""
+
+
+class _StandinHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StandinServer:
+    """Base class: runs a ThreadingHTTPServer on a free local port in a background thread"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def make_handler(self):
+        raise NotImplementedError
+
+    def start(self) -> 'StandinServer':
+        self.httpd = _StandinHTTPServer((self.host, self.port), self.make_handler())
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True
+        )
+        self._thread.start()
+        logging.info(f"{type(self).__name__} listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Send headers and body in one segment so keep-alive clients don't hit delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any):
+        self._send(status, json.dumps(payload).encode('utf-8'))
+
+
+class StandinPlatformServer(StandinServer):
+    """Stand-in for the trading platform: serves the SELECTORS page and its JSON API"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        super().__init__(host, port)
+        self.calls: List[Dict[str, Any]] = []
+        self.portfolios: Dict[str, str] = {}
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1001)
+
+    def make_handler(self):
+        server = self
+
+        class Handler(_QuietHandler):
+            def do_GET(self):
+                if urlparse(self.path).path in ('/', '/index.html'):
+                    self._send(200, PLATFORM_PAGE.encode('utf-8'), 'text/html')
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                body = self._read_json() or {}
+                status, payload = server.handle_api(path, body)
+                self._send_json(status, payload)
+
+        return Handler
+
+    def handle_api(self, path: str, body: Dict[str, Any]):
+        """Apply one API call to the in-memory platform state"""
+        with self.lock:
+            self.calls.append({'path': path, 'body': body})
+            if path == '/api/wallet/connect':
+                if not body.get('wallet'):
+                    return 400, {'error': 'wallet required'}
+                return 200, {'connected': True, 'wallet': body['wallet']}
+            if path == '/api/portfolio':
+                portfolio_id = f"pf_{next(self._ids)}"
+                self.portfolios[portfolio_id] = body.get('wallet')
+                return 200, {'portfolio_id': portfolio_id}
+            if path == '/api/deposit':
+                if body.get('portfolio_id') not in self.portfolios:
+                    return 404, {'error': 'unknown portfolio'}
+                return 200, {'deposited': body.get('amount')}
+            if path == '/api/trade':
+                if body.get('portfolio_id') not in self.portfolios:
+                    return 404, {'error': 'unknown portfolio'}
+                position_id = f"pos_{next(self._ids)}"
+                self.positions[position_id] = dict(body, open=True)
+                return 200, {'position_id': position_id}
+            if path == '/api/position/close':
+                position = self.positions.get(body.get('position_id'))
+                if not position or not position['open']:
+                    return 404, {'error': 'unknown position'}
+                position['open'] = False
+                return 200, {'closed': True}
+            return 404, {'error': 'not found'}
+
+
+class StandinRpcServer(StandinServer):
+    """Stand-in Ethereum JSON-RPC node with in-memory accounts
+
+    Answers single and batched calls; every HTTP request is recorded in
+    http_requests as the list of methods it carried, so tests can check
+    batching. Methods listed in fail_methods return a JSON-RPC error.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, chain_id: int = 421614):
+        super().__init__(host, port)
+        self.chain_id = chain_id
+        self.nonces: Dict[str, int] = {}
+        self.balances: Dict[str, int] = {}
+        self.call_results: Dict[str, str] = {}
+        self.fail_methods: Dict[str, str] = {}
+        self.http_requests: List[List[str]] = []
+
+    def make_handler(self):
+        server = self
+
+        class Handler(_QuietHandler):
+            def do_POST(self):
+                payload = self._read_json()
+                if isinstance(payload, list):
+                    with server.lock:
+                        server.http_requests.append([call.get('method') for call in payload])
+                    self._send_json(200, [server.handle_call(call) for call in payload])
+                else:
+                    with server.lock:
+                        server.http_requests.append([payload.get('method')])
+                    self._send_json(200, server.handle_call(payload))
+
+        return Handler
+
+    def handle_call(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        method = call.get('method')
+        params = call.get('params') or []
+        reply: Dict[str, Any] = {'jsonrpc': '2.0', 'id': call.get('id')}
+        with self.lock:
+            if method in self.fail_methods:
+                reply['error'] = {'code': -32000, 'message': self.fail_methods[method]}
+            elif method == 'eth_chainId':
+                reply['result'] = hex(self.chain_id)
+            elif method == 'net_version':
+                reply['result'] = str(self.chain_id)
+            elif method == 'eth_getTransactionCount':
+                reply['result'] = hex(self.nonces.get(params[0].lower(), 0))
+            elif method == 'eth_getBalance':
+                reply['result'] = hex(self.balances.get(params[0].lower(), 0))
+            elif method == 'eth_call':
+                reply['result'] = self.call_results.get(params[0].get('to', '').lower(), '0x')
+            else:
+                reply['error'] = {'code': -32601, 'message': 'the method does not exist'}
+        return reply
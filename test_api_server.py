@@ -0,0 +1,192 @@
+import csv
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from aiohttp.test_utils import AioHTTPTestCase
+
+from api_server import TradingAPI
+from wallet_addresses import wallet_address
+from crypto_trading_bot import TradingSession
+from trade_history import TRADE_FIELDS, TradeHistoryIndex
+from test_data import TEST_WALLETS, TEST_PROXIES, TEST_CONFIGS
+from test_utils import setup_test_files, cleanup_test_files
+
+
+def write_results(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=TRADE_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def trade_row(wallet, n):
+    return {'timestamp': f'2025-02-15T16:{n // 60:02d}:{n % 60:02d}', 'wallet': wallet, 'asset': 'BTC',
+            'direction': 'long', 'size': n, 'status': 'success', 'transaction_hash': f'tx_{wallet}_{n}',
+            'error': ''}
+
+
+class TestTradeHistoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.results_dir = tempfile.mkdtemp()
+        self.index = TradeHistoryIndex(self.results_dir, min_refresh_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.results_dir)
+
+    def test_incremental_refresh_reads_only_new_rows(self):
+        """Appended rows are indexed without re-reading older ones"""
+        path = os.path.join(self.results_dir, 'trade_results_1.csv')
+        write_results(path, [trade_row('w1', 1), trade_row('w2', 2)])
+        self.assertEqual(self.index.refresh(), 2)
+        self.assertEqual(self.index.refresh(), 0)
+
+        with open(path, 'a', newline='') as f:
+            csv.DictWriter(f, fieldnames=TRADE_FIELDS).writerow(trade_row('w1', 3))
+            f.write('2025-02-15T16:00:04,w1,BTC')  # row still being written
+        self.assertEqual(self.index.refresh(), 1)
+        page, _ = self.index.page('w1')
+        self.assertEqual([row['size'] for row in page], ['3', '1'])
+
+    def test_cursor_pagination_is_stable(self):
+        """Cursors keep pointing at the same rows while new trades arrive"""
+        path = os.path.join(self.results_dir, 'trade_results_1.csv')
+        write_results(path, [trade_row('w1', n) for n in range(5)])
+        self.index.refresh()
+
+        first, cursor = self.index.page('w1', limit=2)
+        self.assertEqual([row['size'] for row in first], ['4', '3'])
+        write_results(os.path.join(self.results_dir, 'trade_results_2.csv'), [trade_row('w1', 99)])
+        self.index.refresh()
+        second, cursor = self.index.page('w1', limit=2, cursor=cursor)
+        self.assertEqual([row['size'] for row in second], ['2', '1'])
+        last, cursor = self.index.page('w1', limit=2, cursor=cursor)
+        self.assertEqual([row['size'] for row in last], ['0'])
+        self.assertIsNone(cursor)
+
+    def test_many_files_answer_quickly(self):
+        """With hundreds of result files a page lookup takes milliseconds"""
+        for n in range(300):
+            write_results(os.path.join(self.results_dir, f'trade_results_{n:04d}.csv'),
+                          [trade_row(f'w{n % 10}', n), trade_row(f'w{(n + 1) % 10}', n)])
+        self.index.refresh()
+        self.assertEqual(self.index.row_count, 600)
+
+        started = time.perf_counter()
+        self.index.refresh()
+        page, _ = self.index.page('w3', limit=20)
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertEqual(len(page), 20)
+
+
+class TestTradingAPI(AioHTTPTestCase):
+    async def get_application(self):
+        setup_test_files(TEST_WALLETS, TEST_PROXIES)
+        self.results_dir = tempfile.mkdtemp()
+        self.session = TradingSession(dict(TEST_CONFIGS["parallel_trading"], results_dir=self.results_dir))
+        self.api = TradingAPI(self.session, TradeHistoryIndex(self.results_dir, min_refresh_interval=0))
+        return self.api.build_app()
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        cleanup_test_files()
+        shutil.rmtree(self.results_dir)
+
+    async def test_assets(self):
+        response = await self.client.get('/assets')
+        self.assertEqual((await response.json())['assets'], ["BTC", "ETH", "SOL"])
+
+    async def test_register_returns_address(self):
+        response = await self.client.post('/register', json={'email': 'trader@example.com'})
+        body = await response.json()
+        self.assertTrue(body['wallet_address'].startswith('0x'))
+        self.assertEqual(len(body['wallet_address']), 42)
+
+    async def test_register_stores_the_wallet_off_the_event_loop(self):
+        add_wallet = self.session.wallet_manager.add_wallet
+        threads = []
+
+        def record_thread(private_key):
+            threads.append(threading.current_thread())
+            add_wallet(private_key)
+
+        with patch.object(self.session.wallet_manager, 'add_wallet', side_effect=record_thread):
+            body = await (await self.client.post('/register', json={'email': 'other@example.com'})).json()
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+        # The new wallet can trade straight away
+        response = await self.client.post('/trade', json={
+            'wallet_address': body['wallet_address'], 'direction': 'long', 'size': 1
+        })
+        self.assertNotEqual(response.status, 404)
+
+    async def test_raw_keys_are_not_accepted_as_wallets(self):
+        private_key = TEST_WALLETS[0]["private_key"]
+        response = await self.client.post('/trade', json={
+            'wallet_address': private_key, 'asset': 'ETH', 'direction': 'long', 'size': 1
+        })
+        self.assertEqual(response.status, 404)
+        response = await self.client.get(f'/trading-history/{private_key}')
+        self.assertEqual(response.status, 404)
+
+    @patch('crypto_trading_bot.time.sleep')
+    async def test_trade_shows_up_in_history(self, mock_sleep):
+        """A trade written by the session is served from the index without a rescan"""
+        address = wallet_address(TEST_WALLETS[0]["private_key"])
+        response = await self.client.post('/trade', json={
+            'wallet_address': address, 'asset': 'ETH', 'direction': 'short', 'size': 100
+        })
+        self.assertEqual(response.status, 200)
+        transaction_hash = (await response.json())['transaction_hash']
+
+        response = await self.client.get(f'/trading-history/{address}?limit=10')
+        body = await response.json()
+        self.assertEqual(body['history'][0]['transaction_hash'], transaction_hash)
+        self.assertEqual(body['history'][0]['asset'], 'ETH')
+        self.assertEqual(body['history'][0]['wallet'], address)
+        self.assertIsNone(body['next_cursor'])
+
+    @patch('crypto_trading_bot.time.sleep')
+    async def test_history_rejects_bad_cursors_and_clamps_limit(self, mock_sleep):
+        address = wallet_address(TEST_WALLETS[0]["private_key"])
+        for size in (100, 200):
+            response = await self.client.post('/trade', json={
+                'wallet_address': address, 'asset': 'ETH', 'direction': 'long', 'size': size
+            })
+            self.assertEqual(response.status, 200)
+
+        for cursor in ('abc', '-1', '1.5'):
+            response = await self.client.get(f'/trading-history/{address}?cursor={cursor}')
+            self.assertEqual(response.status, 400, cursor)
+        for limit in (0, -3):
+            body = await (await self.client.get(f'/trading-history/{address}?limit={limit}')).json()
+            self.assertEqual(len(body['history']), 1)
+            self.assertEqual(body['next_cursor'], '1')
+
+    @patch('crypto_trading_bot.time.sleep')
+    async def test_metrics_report_exposure_of_filled_trades(self, mock_sleep):
+        address = wallet_address(TEST_WALLETS[0]["private_key"])
+        response = await self.client.post('/trade', json={
+            'wallet_address': address, 'asset': 'ETH', 'direction': 'short', 'size': 100
+        })
+        self.assertEqual(response.status, 200)
+
+        exposure = (await (await self.client.get('/metrics')).json())['exposure']
+        self.assertEqual(exposure['trades'], 1)
+        self.assertEqual(exposure['assets']['ETH']['net'], -100.0)
+        self.assertEqual(exposure['assets']['ETH']['skew'], -1.0)
+
+    async def test_invalid_trade_rejected(self):
+        address = wallet_address(TEST_WALLETS[0]["private_key"])
+        response = await self.client.post('/trade', json={
+            'wallet_address': address, 'direction': 'sideways', 'size': 1
+        })
+        self.assertEqual(response.status, 400)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,154 @@
+import csv
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from balance_cache import BalanceCache, rpc_balance_source
+from execution_plan import plan_session
+from rpc_client import JsonRpcClient
+from standin_servers import StandinRpcServer
+from test_utils import make_session
+from wallet_addresses import wallet_address
+
+WALLETS = ['0x' + f"{index:02x}" * 32 for index in range(1, 7)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBalanceCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetches = []
+        self.balances = {wallet: 100.0 for wallet in WALLETS}
+
+        def fetch(wallets):
+            self.fetches.append(list(wallets))
+            return {wallet: self.balances[wallet] for wallet in wallets}
+
+        self.cache = BalanceCache(fetch, ttl=30, clock=self.clock)
+
+    def test_stale_wallets_are_fetched_in_bulk(self):
+        self.cache.snapshot(WALLETS)
+        self.cache.available(WALLETS[0])
+        self.assertEqual(self.fetches, [WALLETS])
+        self.clock.now += 31
+        self.cache.snapshot(WALLETS)
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_optimistic_debit_and_release(self):
+        self.assertTrue(self.cache.reserve(WALLETS[0], 60))
+        self.assertEqual(self.cache.available(WALLETS[0]), 40)
+        self.assertFalse(self.cache.reserve(WALLETS[0], 50))
+        self.assertEqual(self.cache.feasible_size(WALLETS[0], 50), 40)
+        self.assertEqual(self.cache.feasible_size(WALLETS[0], 50, min_size=45), 0)
+        self.cache.release(WALLETS[0], 60)
+        self.assertEqual(self.cache.available(WALLETS[0]), 100)
+
+    def test_refresh_drops_debits_the_node_has_seen(self):
+        self.cache.reserve(WALLETS[1], 30)
+        self.balances[WALLETS[1]] = 70.0
+        self.clock.now += 1
+        self.cache.refresh([WALLETS[1]], force=True)
+        self.assertEqual(self.cache.available(WALLETS[1]), 70)
+
+    def test_failed_fetch_leaves_trades_unchecked(self):
+        cache = BalanceCache(lambda wallets: 1 / 0, clock=self.clock)
+        self.assertEqual(cache.feasible_size(WALLETS[0], 25), 25)
+
+
+class TestFeasibilityFilter(unittest.TestCase):
+    def test_parallel_legs_are_resized_or_dropped(self):
+        config = {'volume_percentage_range': (40, 40), 'trades_per_wallet': 2}
+        plan = plan_session(config, WALLETS[:2], 'parallel', seed=1)
+        filtered, stats = plan.filter_feasible({0: 60.0, 1: 100.0}, min_size=25)
+        self.assertEqual(stats, {'kept': 3, 'resized': 0, 'dropped': 1})
+        filtered, stats = plan.filter_feasible({0: 60.0}, min_size=10)
+        self.assertEqual(stats['resized'], 1)
+        self.assertAlmostEqual(sum(size for wallet, size in zip(filtered.wallet, filtered.size) if wallet == 0), 60)
+
+    def test_branch_legs_scale_together(self):
+        config = {'volume_percentage_range': (30, 30), 'branch_wallet_range': (2, 2), 'max_parallel_branches': 3}
+        plan = plan_session(config, WALLETS, 'branch', seed=4)
+        poor = plan.wallet[0]
+        filtered, stats = plan.filter_feasible({poor: 15.0})
+        self.assertEqual(stats['resized'], 2)
+        self.assertEqual(list(filtered.size[:2]), [15.0, 15.0])
+        _, stats = plan.filter_feasible({poor: 0.0})
+        self.assertEqual(stats['dropped'], 2)
+
+
+class TestRpcBalanceSource(unittest.TestCase):
+    def test_margin_token_balances_in_one_batch(self):
+        with StandinRpcServer() as server:
+            token = '0x' + 'cd' * 20
+            server.call_results[token] = hex(2500 * 10 ** 6)
+            client = JsonRpcClient(server.url)
+            balances = rpc_balance_source(client, token)(WALLETS)
+            self.assertEqual(balances[WALLETS[0]], 2500)
+            server.balances[wallet_address(WALLETS[0]).lower()] = 3 * 10 ** 18
+            self.assertEqual(rpc_balance_source(client)(WALLETS[:1]), {WALLETS[0]: 3})
+            self.assertEqual(server.http_requests, [['eth_call'] * len(WALLETS), ['eth_getBalance']])
+
+
+class TestSessionBalanceCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = make_session(self.tmp.name, WALLETS[:2], ["127.0.0.1:8080@user:pass"],
+                                    balance_check=True, wallet_balance=50, min_trade_size=5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_infeasible_trade_never_reaches_transaction_manager(self):
+        with patch.object(self.session.transaction_manager, 'execute_trade',
+                          return_value={'status': 'success'}) as execute_trade:
+            self.session._process_wallet_with_size(WALLETS[0], 'long', 40, 'BTC')
+            resized = self.session._process_wallet_with_size(WALLETS[0], 'long', 40, 'BTC')
+            skipped = self.session._process_wallet_with_size(WALLETS[0], 'long', 40, 'BTC')
+        self.assertEqual(execute_trade.call_count, 2)
+        self.assertEqual(execute_trade.call_args_list[1].args[3], 10)
+        self.assertEqual(resized['status'], 'success')
+        self.assertEqual(skipped['status'], 'skipped')
+
+    def test_failed_trade_releases_debit(self):
+        with patch.object(self.session.transaction_manager, 'execute_trade',
+                          return_value={'status': 'failed'}):
+            self.session._process_wallet_with_size(WALLETS[1], 'short', 40, 'ETH')
+        self.assertEqual(self.session.balance_cache.available(WALLETS[1]), 50)
+
+    def test_failed_proxy_lookup_releases_the_group(self):
+        plan = self.session.build_plan('parallel', seed=4)
+        with patch.object(self.session.proxy_manager, 'get_proxy', side_effect=RuntimeError("no route")), \
+                patch.object(self.session.transaction_manager, 'execute_trades') as execute_trades:
+            self.session.execute_plan(plan)
+        execute_trades.assert_not_called()
+        for wallet in WALLETS[:2]:
+            self.assertEqual(self.session.balance_cache.available(wallet), 50)
+        with open(self.session.csv_file, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), len(plan))
+        self.assertIn('failed', {row['status'] for row in rows})
+        self.assertNotIn('success', {row['status'] for row in rows})
+
+
+    def test_parallel_mode_checks_and_releases_balances(self):
+        self.session.reconfigure({'volume_percentage_range': (40, 40), 'launch_delay': (0, 0)})
+        with patch.object(self.session.transaction_manager, 'execute_trade',
+                          return_value={'status': 'success'}) as execute_trade:
+            for _ in range(3):
+                self.session._process_wallet(WALLETS[0])
+        # 40, then the remaining 10, then nothing left to trade
+        self.assertEqual([call.args[3] for call in execute_trade.call_args_list], [40, 10])
+        with patch.object(self.session.transaction_manager, 'execute_trade', return_value={'status': 'failed'}):
+            self.session._process_wallet(WALLETS[1])
+        self.assertEqual(self.session.balance_cache.available(WALLETS[1]), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import cli
+from execution_plan import ExecutionPlan
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Modules a dry run must not load: each is a subsystem some other subcommand needs
+HEAVY_MODULES = ('requests', 'urllib3', 'selenium', 'eth_keys', 'eth_utils', 'eth_keyfile', 'pydantic',
+                 'aiohttp', 'websockets', 'crypto_trading_bot', 'trading_ui_automation', 'order_signing')
+# Imports after interpreter startup for `cli.py trade --dry-run`; about 15 ms today, 250 ms with eth and requests
+IMPORT_BUDGET_MS = 100
+
+
+def import_times(stderr: str):
+    """(module, self microseconds) per -X importtime line, from after interpreter startup"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), int(self_us), len(name) - len(name.lstrip())))
+    # Everything up to and including the top-level site import is interpreter startup
+    start = max((index for index, (name, _, depth) in enumerate(entries) if name == 'site' and depth == 1),
+                default=-1)
+    return [(name, self_us) for name, self_us, _ in entries[start + 1:]]
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.keys_file = os.path.join(self.tmp.name, 'keys.txt')
+        with open(self.keys_file, 'w') as f:
+            f.write("\n".join(f"0x{index:064x}" for index in range(1, 7)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_light_imports(self, args, allowed=()):
+        """Run python -X importtime args; no heavy module but those allowed loads, within budget"""
+        done = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                              capture_output=True, text=True, cwd=self.tmp.name, timeout=60,
+                              env=dict(os.environ, PYTHONPATH=HERE))
+        self.assertEqual(done.returncode, 0, done.stderr[-2000:])
+        loaded = import_times(done.stderr)
+        names = {name.split('.')[0] for name, _ in loaded}
+        self.assertEqual(sorted(names.intersection(HEAVY_MODULES).difference(allowed)), [])
+        total_ms = sum(self_us for _, self_us in loaded) / 1000
+        self.assertLess(total_ms, IMPORT_BUDGET_MS, sorted(loaded, key=lambda entry: -entry[1])[:10])
+        return done
+
+    def test_dry_run_cold_start_stays_within_budget(self):
+        done = self.assert_light_imports([os.path.join(HERE, 'cli.py'), 'trade', '--dry-run',
+                                          '--keys-file', self.keys_file, '--seed', '3'])
+        self.assertEqual(json.loads(done.stdout)['legs'], 12)
+
+    def test_session_module_imports_without_optional_subsystems(self):
+        """pydantic, requests and the rest load when a session or subcommand needs them"""
+        self.assert_light_imports(['-c', 'import crypto_trading_bot'], allowed=('crypto_trading_bot',))
+
+    def test_dry_run_matches_the_plan_a_run_executes(self):
+        saved = os.path.join(self.tmp.name, 'plan.json')
+        with patch('builtins.print'):
+            cli.main(['branch', '--dry-run', '--keys-file', self.keys_file, '--seed', '5', '--save-plan', saved])
+        with patch('crypto_trading_bot.TradingSession') as session_class:
+            session_class.return_value.wallet_manager.wallets = cli._read_keys(self.keys_file)
+            cli.main(['branch', '--keys-file', self.keys_file, '--seed', '5', '--staged'])
+        executed = session_class.return_value.execute_staged_plan.call_args[0][0]
+        self.assertEqual(executed.summary(), ExecutionPlan.load(saved).summary())
+        self.assertEqual(executed.mode, 'branch')
+        session_class.return_value.stop_profiling.assert_called_once()
+
+    def test_config_file_overrides_defaults(self):
+        config_path = os.path.join(self.tmp.name, 'config.json')
+        with open(config_path, 'w') as f:
+            json.dump({'trades_per_wallet': 1, 'trading_assets': ['BTC']}, f)
+        with patch('builtins.print') as printed:
+            cli.main(['trade', '--dry-run', '--config', config_path, '--keys-file', self.keys_file])
+        summary = json.loads(printed.call_args[0][0])
+        self.assertEqual(summary['legs'], 6)
+        self.assertEqual(list(summary['assets']), ['BTC'])
+
+    def test_analyze_and_bench_delegate_their_arguments(self):
+        with patch('trade_analytics.main') as analytics_main:
+            cli.main(['analyze', '--results-dir', self.tmp.name, '--json'])
+        analytics_main.assert_called_once_with(['--results-dir', self.tmp.name, '--json'])
+        with patch('workload_replay.main') as replay_main:
+            cli.main(['bench', 'replay', 'trade_results', '--speed', 'max'])
+        replay_main.assert_called_once_with(['trade_results', '--speed', 'max'])
+
+
+if __name__ == '__main__':
+    unittest.main()
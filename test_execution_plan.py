@@ -0,0 +1,141 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from crypto_trading_bot import TradingSession
+from execution_plan import ExecutionPlan, _draw_indices, plan_session
+
+WALLETS = [f"0x{index:064x}" for index in range(1, 41)]
+
+
+class TestExecutionPlan(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            'trading_assets': ['BTC', 'ETH', 'SOL'],
+            'volume_percentage_range': (10, 50),
+            'launch_delay': (0, 2),
+            'branch_wallet_range': (2, 5),
+            'max_parallel_branches': 5
+        }
+
+    def test_parallel_plan(self):
+        plan = plan_session(self.config, WALLETS, 'parallel', seed=7)
+        self.assertEqual(len(plan), len(WALLETS))
+        self.assertEqual(sorted(plan.wallet), list(range(len(WALLETS))))
+        self.assertTrue(all(10 <= size <= 50 for size in plan.size))
+        self.assertTrue(all(b >= a for a, b in zip(plan.launch_at, plan.launch_at[1:])))
+        self.assertLessEqual(plan.launch_at[-1], 2 * len(WALLETS))
+        self.assertEqual(set(plan.branch), {-1})
+
+    def test_branch_plan_splits_size(self):
+        plan = plan_session(self.config, WALLETS, 'branch', seed=7)
+        summary = plan.summary()
+        self.assertLessEqual(summary['branches'], 5)
+        for branch in range(summary['branches']):
+            legs = [plan.leg(i) for i in range(len(plan)) if plan.branch[i] == branch]
+            self.assertTrue(2 <= len(legs) <= 5)
+            longs = [leg for leg in legs if leg['direction'] == 'long']
+            shorts = [leg for leg in legs if leg['direction'] == 'short']
+            self.assertTrue(longs and shorts)
+            # Both sides carry the same total size
+            self.assertAlmostEqual(sum(leg['size'] for leg in longs), sum(leg['size'] for leg in shorts))
+        self.assertEqual(len(set(plan.wallet)), len(plan))
+
+    def test_branch_plan_stops_when_wallets_run_out(self):
+        self.config['max_parallel_branches'] = 100
+        plan = plan_session(self.config, WALLETS[:7], 'branch', seed=3)
+        self.assertLessEqual(len(plan), 7)
+        self.assertGreater(len(plan), 7 - 5)
+
+    def test_seed_is_reproducible(self):
+        first = plan_session(self.config, WALLETS, 'parallel', seed=11)
+        second = plan_session(self.config, WALLETS, 'parallel', seed=11)
+        self.assertEqual(first.diff(second)['columns'], {})
+        other = plan_session(self.config, WALLETS, 'parallel', seed=12)
+        self.assertIn('size', other.diff(first)['columns'])
+
+    def test_draw_indices_is_uniform(self):
+        import random
+        picks = _draw_indices(random.Random(1), 30000, 3)
+        counts = [picks.count(value) for value in range(3)]
+        self.assertEqual(sum(counts), 30000)
+        self.assertTrue(all(9500 < count < 10500 for count in counts))
+
+    def test_save_and_load(self):
+        plan = plan_session(self.config, WALLETS, 'branch', seed=5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'session.plan')
+            plan.save(path)
+            loaded = ExecutionPlan.load(path)
+        self.assertEqual(loaded.mode, 'branch')
+        self.assertEqual(loaded.fingerprint, plan.fingerprint)
+        self.assertEqual(loaded.diff(plan)['columns'], {})
+        self.assertEqual(loaded.leg(0), plan.leg(0))
+
+    def test_planning_is_fast(self):
+        # About 0.06 s per 100k legs in either mode today
+        wallets = [str(index) for index in range(100000)]
+        config = dict(self.config, max_parallel_branches=len(wallets))
+        for mode in ('parallel', 'branch'):
+            start = time.perf_counter()
+            plan = plan_session(config, wallets, mode, seed=1)
+            elapsed = time.perf_counter() - start
+            self.assertGreater(len(plan), 99990, mode)
+            self.assertLess(elapsed, 0.15, mode)
+
+
+class TestSessionPlanExecution(unittest.TestCase):
+    def setUp(self):
+        self.keys_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        self.keys_file.write("\n".join(WALLETS[:6]) + "\n")
+        self.keys_file.close()
+        self.proxy_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        self.proxy_file.write("127.0.0.1:8080@user:pass\n")
+        self.proxy_file.close()
+        self.session = TradingSession({
+            'keys_file': self.keys_file.name,
+            'proxy_file': self.proxy_file.name,
+            'enable_logs': False,
+            'launch_delay': (0, 0)
+        })
+
+    def tearDown(self):
+        os.unlink(self.keys_file.name)
+        os.unlink(self.proxy_file.name)
+        os.remove(self.session.csv_file)
+
+    def test_execute_plan_runs_every_leg(self):
+        plan = self.session.build_plan('branch', seed=2)
+        with patch.object(self.session.transaction_manager, 'execute_trade',
+                          return_value={'status': 'success'}) as execute_trade:
+            self.session.execute_plan(plan)
+        self.assertEqual(execute_trade.call_count, len(plan))
+        first = plan.leg(0)
+        self.assertEqual(execute_trade.call_args_list[0].args[:4],
+                         (WALLETS[first['wallet']], first['asset'], first['direction'], first['size']))
+
+    def test_legs_due_together_are_batched_per_wallet_and_proxy(self):
+        self.session.config.update(trades_per_wallet=3)
+        plan = self.session.build_plan('parallel', seed=4)
+        with patch.object(self.session.proxy_manager, 'get_proxy', return_value={}) as get_proxy, \
+                patch.object(self.session.transaction_manager, 'execute_trades',
+                             side_effect=lambda wallet, orders, proxy: [{'status': 'success'}] * len(orders)) \
+                as execute_trades:
+            self.session.execute_plan(plan)
+        # Every wallet shares the single proxy; each wallet's three legs go out together
+        self.assertEqual(get_proxy.call_count, 1)
+        self.assertEqual(execute_trades.call_count, 6)
+        self.assertTrue(all(len(call.args[1]) == 3 for call in execute_trades.call_args_list))
+        with open(self.session.csv_file) as f:
+            self.assertEqual(len(f.readlines()), 1 + len(plan))
+
+    def test_execute_plan_rejects_other_wallets(self):
+        plan = plan_session({}, WALLETS, 'parallel', seed=2)
+        with self.assertRaises(ValueError):
+            self.session.execute_plan(plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
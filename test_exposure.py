@@ -0,0 +1,96 @@
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from exposure import ExposureBook
+from test_utils import make_session
+
+WALLETS = ['0x' + f"{index:02x}" * 32 for index in range(1, 13)]
+# Per recorded row; about 1.3 us today
+ROW_BUDGET_US = 20
+
+
+def row(asset, direction, size, status='success', branch='', wallet='w0'):
+    return {'asset': asset, 'direction': direction, 'size': size, 'status': status, 'branch': branch,
+            'wallet': wallet}
+
+
+class TestExposureBook(unittest.TestCase):
+    def test_net_gross_and_skew_per_asset_branch_and_proxy(self):
+        book = ExposureBook(proxy_of={'w0': 0, 'w1': 1}.get)
+        book(row('BTC', 'long', 30, branch=0, wallet='w0'))
+        book(row('BTC', 'short', 10, branch=0, wallet='w1'))
+        book(row('BTC', 'short', 10, branch=0, wallet='w1'))
+        book(row('ETH', 'short', '5.5', wallet='w1'))
+        book(row('ETH', 'long', 99, status='failed'))
+        book(row('ETH', 'long', 99, status='skipped'))
+
+        snapshot = book.snapshot()
+        self.assertEqual(snapshot['trades'], 4)
+        btc = snapshot['assets']['BTC']
+        self.assertEqual((btc['net'], btc['gross'], btc['skew']), (10.0, 50.0, 0.2))
+        self.assertAlmostEqual(btc['leg_skew'], -1 / 3)
+        self.assertEqual(snapshot['assets']['ETH']['net'], -5.5)
+        self.assertEqual(list(snapshot['branches']), ['0'])
+        self.assertEqual(snapshot['branches']['0']['BTC']['net'], 10.0)
+        self.assertEqual(snapshot['proxies']['0']['BTC']['long'], 30.0)
+        self.assertEqual(snapshot['proxies']['1']['BTC']['short'], 20.0)
+        self.assertEqual((book.net('ETH'), book.skew('ETH'), book.skew('SOL')), (-5.5, -1.0, 0.0))
+
+        book.reset()
+        self.assertEqual(book.snapshot(), {'trades': 0, 'assets': {}, 'branches': {}, 'proxies': {}})
+
+    def test_update_cost_stays_flat(self):
+        book = ExposureBook(lambda wallet: len(wallet) % 4)
+        rows = [row(('BTC', 'ETH', 'SOL')[n % 3], ('long', 'short')[n % 2], 10.0, branch=n % 50,
+                    wallet=f"w{n % 1000}") for n in range(50000)]
+        started = time.perf_counter()
+        for entry in rows:
+            book(entry, 'results.csv')
+        per_row_us = (time.perf_counter() - started) / len(rows) * 1e6
+        self.assertLess(per_row_us, ROW_BUDGET_US)
+        self.assertEqual(book.trades, len(rows))
+
+
+class TestSessionExposure(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        proxies = [f"127.0.0.1:{port}@user:pass" for port in (8080, 8081, 8082)]
+        self.session = make_session(self.tmp.name, WALLETS, proxies,
+                                    branch_wallet_range=(2, 4), max_parallel_branches=4)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_branch_plan_exposure_tracks_every_filled_leg(self):
+        plan = self.session.build_plan('branch', seed=6)
+        with patch.object(self.session.transaction_manager, 'execute_trades',
+                          side_effect=lambda wallet, orders, proxy: [
+                              {'status': 'success', 'details': dict(leg)} for leg in orders]):
+            self.session.execute_plan(plan)
+
+        snapshot = self.session.exposure.snapshot()
+        self.assertEqual(snapshot['trades'], len(plan))
+        summary = plan.summary()['assets']
+        for asset, totals in summary.items():
+            self.assertAlmostEqual(snapshot['assets'][asset]['net'], totals['long'] - totals['short'])
+        # Each branch splits one size across its long and short legs
+        for branch, assets in snapshot['branches'].items():
+            self.assertAlmostEqual(sum(cell['net'] for cell in assets.values()), 0.0, msg=branch)
+        gross_by_proxy = sum(cell['gross'] for assets in snapshot['proxies'].values() for cell in assets.values())
+        self.assertAlmostEqual(gross_by_proxy, sum(totals['long'] + totals['short'] for totals in summary.values()))
+        self.assertEqual(set(snapshot['proxies']), {'0', '1', '2'})
+
+    def test_exposure_priority_weights_up_one_sided_assets(self):
+        self.assertEqual(self.session._flow_weight(('BTC', 0)), 1.0)
+        self.session.exposure.add('BTC', 'long', 30)
+        self.session.exposure.add('BTC', 'short', 10)
+        self.assertEqual(self.session._flow_weight(('BTC', 0)), 1.0)
+        self.session.reconfigure({'exposure_priority': 2.0})
+        self.assertEqual(self.session._flow_weight(('BTC', 0)), 2.0)
+        self.assertEqual(self.session._flow_weight(('ETH', 0)), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from http_replay import FlowReplayer, build_template, collect_network_entries
+from standin_servers import PLATFORM_PAGE, StandinPlatformServer
+from trading_ui_automation import TradingPlatformUI, UITradingSession
+from ui_steps import compile_locators
+from wallet_addresses import wallet_address
+
+KEYS = ['0x' + f"{index:02x}" * 32 for index in range(1, 4)]
+
+
+def record_flow(base_url, wallet, asset, direction, size):
+    """Drive the stand-in API the way the page does and capture it like Chrome's network log"""
+    entries, responses = [], {}
+    state = {}
+
+    def post(path, body):
+        request_id = str(len(entries))
+        entries.append({'request_id': request_id, 'method': 'POST', 'url': base_url + path,
+                        'headers': {'Content-Type': 'application/json', 'Content-Length': '10'},
+                        'body': json.dumps(body), 'wall_time': len(entries)})
+        response = requests.post(base_url + path, json=body)
+        responses[request_id] = response.text
+        return response.json()
+
+    post('/api/wallet/connect', {'wallet': wallet})
+    state['portfolio'] = post('/api/portfolio', {'wallet': wallet})['portfolio_id']
+    post('/api/deposit', {'portfolio_id': state['portfolio'], 'amount': 10000})
+    position = post('/api/trade', {'portfolio_id': state['portfolio'], 'asset': asset,
+                                   'direction': direction, 'leverage': 5, 'size': size})['position_id']
+    post('/api/position/close', {'position_id': position})
+    return entries, responses
+
+
+class TestHttpReplay(unittest.TestCase):
+    def setUp(self):
+        self.server = StandinPlatformServer().start()
+        self.params = {'wallet': '0xrecordedwallet', 'asset': 'BTC', 'direction': 'long', 'size': 1234}
+        entries, responses = record_flow(self.server.url, **self.params)
+        # The close request was sent after the UI started its hold
+        self.template = build_template(entries, self.params, responses, hold_marks=[3.5])
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_template_is_parameterized(self):
+        """Wallet, trade values and returned ids become placeholders"""
+        steps = self.template['steps']
+        self.assertEqual(steps[0]['json'], {'wallet': '{{wallet}}'})
+        self.assertEqual(steps[2]['json']['portfolio_id'], '{{step1.portfolio_id}}')
+        self.assertEqual(steps[3]['json']['size'], '{{size}}')
+        self.assertEqual(steps[4], {'hold': True})
+        self.assertEqual(steps[5]['json']['position_id'], '{{step3.position_id}}')
+        self.assertNotIn('Content-Length', steps[0]['headers'])
+
+    def test_replay_for_other_wallets(self):
+        """Replaying the template runs the full flow for each wallet over HTTP"""
+        holds = []
+        replayer = FlowReplayer(self.template, pool_size=4, hold=holds.append)
+        flows = [{'params': {'wallet': f'0xwallet{i}', 'asset': 'ETH', 'direction': 'short',
+                             'size': 10 + i, 'hold_time': 0}} for i in range(20)]
+        results = replayer.replay_many(flows, workers=4)
+
+        self.assertTrue(all(result['status'] == 'success' for result in results))
+        self.assertEqual(len(holds), 20)
+        replayed = [p for p in self.server.positions.values() if p['asset'] == 'ETH']
+        self.assertEqual(len(replayed), 20)
+        self.assertTrue(all(not p['open'] and p['direction'] == 'short' for p in replayed))
+        self.assertEqual(sorted(p['size'] for p in replayed), [10 + i for i in range(20)])
+
+    def test_replay_reports_failure(self):
+        """A rejected step fails the replay with the step index"""
+        self.template['steps'][2]['json']['portfolio_id'] = 'pf_unknown'
+        result = FlowReplayer(self.template, hold=lambda seconds: None).replay(dict(self.params, hold_time=0))
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(result['steps'], 2)
+
+    def test_deferred_hold_resumes_later(self):
+        """A deferred replay stops at the hold and resume() closes the position"""
+        replayer = FlowReplayer(self.template, hold=lambda seconds: self.fail("hold was not deferred"))
+        result = replayer.replay(dict(self.params, asset='ETH', hold_time=0), defer_holds=True)
+        self.assertEqual((result['status'], result['steps']), ('held', 4))
+        [position] = [p for p in self.server.positions.values() if p['asset'] == 'ETH']
+        self.assertTrue(position['open'])
+
+        result = replayer.resume(result['flow'])
+        self.assertEqual((result['status'], result['steps']), ('success', 5))
+        self.assertFalse(position['open'])
+
+    def test_session_holds_replayed_positions_in_the_lifecycle_manager(self):
+        """With deferred closes the replay hands its hold to the PositionLifecycleManager"""
+        session = UITradingSession({'defer_position_close': True, 'position_hold_time': 0.05,
+                                    'trading_assets': ['SOL'], 'position_direction': 'short'})
+        session.replayer = FlowReplayer(self.template, hold=lambda seconds: self.fail("hold was not deferred"))
+        try:
+            for key in KEYS:
+                self.assertTrue(session.execute_trading_sequence(key, None, "agent"))
+            self.assertEqual(session.position_manager.pending_count(), 3)
+        finally:
+            session.shutdown(timeout=5)
+        self.assertEqual(session.position_manager.closed_count, 3)
+        replayed = [p for p in self.server.positions.values() if p['asset'] == 'SOL']
+        self.assertEqual(len(replayed), 3)
+        self.assertTrue(all(not p['open'] for p in replayed))
+
+    def test_replay_sends_the_address_never_the_key(self):
+        session = UITradingSession({'position_hold_time': 0})
+        session.replayer = FlowReplayer(self.template, hold=lambda seconds: None)
+        self.assertTrue(session.execute_trading_sequence(KEYS[0], None, "agent"))
+        sent = json.dumps([call['body'] for call in self.server.calls])
+        self.assertIn(wallet_address(KEYS[0]), sent)
+        self.assertNotIn(KEYS[0][2:], sent)
+
+
+class TestRecording(unittest.TestCase):
+    def test_collect_network_entries(self):
+        """XHR/fetch requests and response bodies are read from the performance log"""
+        def message(method, params):
+            return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+        driver = MagicMock()
+        driver.get_log.return_value = [
+            message('Network.requestWillBeSent', {
+                'requestId': '1', 'type': 'Fetch', 'wallTime': 100.0,
+                'request': {'method': 'POST', 'url': 'http://x/api/portfolio', 'postData': '{}'}}),
+            message('Network.requestWillBeSent', {
+                'requestId': '2', 'type': 'Image', 'request': {'method': 'GET', 'url': 'http://x/a.png'}}),
+            message('Network.loadingFinished', {'requestId': '1'})
+        ]
+        driver.execute_cdp_cmd.return_value = {'body': '{"portfolio_id": "pf_1"}'}
+
+        entries, responses = collect_network_entries(driver)
+        self.assertEqual([entry['url'] for entry in entries], ['http://x/api/portfolio'])
+        self.assertEqual(responses, {'1': '{"portfolio_id": "pf_1"}'})
+
+    def test_standin_page_serves_selectors(self):
+        """Every CSS selector in SELECTORS has a matching element on the stand-in page"""
+        for key, (strategy, value) in compile_locators(TradingPlatformUI.SELECTORS).items():
+            if strategy == 'xpath':
+                self.assertIn('Connect Wallet', PLATFORM_PAGE)
+            elif value.startswith('#'):
+                self.assertIn(f'id="{value[1:]}"', PLATFORM_PAGE, key)
+            elif value.startswith('.'):
+                self.assertIn(f'class="{value[1:]}"', PLATFORM_PAGE, key)
+            else:
+                self.assertIn('name="', PLATFORM_PAGE, key)
+
+
+class TestBrowserFallback(unittest.TestCase):
+    @patch('trading_ui_automation.TradingPlatformUI')
+    def test_browser_used_when_replay_fails(self, mock_ui_class):
+        """Selenium runs the sequence when the HTTP fast path fails"""
+        session = UITradingSession({'trades_per_wallet': 1, 'position_hold_time': 0,
+                                    'position_direction': 'long'})
+        session.replayer = MagicMock()
+        session.replayer.replay.return_value = {'status': 'failed', 'steps': 0}
+
+        self.assertTrue(session.execute_trading_sequence(KEYS[0], None, "agent"))
+        mock_ui_class.return_value.connect_wallet.assert_called_once_with(wallet_address(KEYS[0]))
+
+    @patch.object(TradingPlatformUI, 'wait_and_click', return_value=True)
+    @patch('trading_ui_automation.webdriver.Chrome')
+    def test_page_scripts_never_see_the_key(self, mock_chrome, mock_click):
+        """The browser fallback hands the page the wallet's address"""
+        driver = mock_chrome.return_value
+        driver.execute_async_script.return_value = {'ok': True, 'completed': [], 'stopped_at': None}
+        driver.find_elements.return_value = []
+        session = UITradingSession({'trades_per_wallet': 1, 'position_hold_time': 0})
+        session.replayer = MagicMock()
+        session.replayer.replay.return_value = {'status': 'failed', 'steps': 0}
+
+        self.assertTrue(session.execute_trading_sequence(KEYS[1], None, "agent"))
+        scripts = repr(driver.execute_script.call_args_list + driver.execute_async_script.call_args_list)
+        self.assertIn(wallet_address(KEYS[1]), scripts)
+        self.assertNotIn(KEYS[1][2:], scripts)
+        self.assertNotIn(KEYS[1][2:], repr(session.replayer.replay.call_args))
+
+    @patch('trading_ui_automation.TradingPlatformUI')
+    def test_partial_replay_is_not_rerun_in_the_browser(self, mock_ui_class):
+        """Once the replay got past its first step the browser would repeat it, so the wallet fails"""
+        session = UITradingSession({'trades_per_wallet': 1})
+        session.replayer = MagicMock()
+        session.replayer.replay.return_value = {'status': 'failed', 'steps': 3}
+
+        self.assertFalse(session.execute_trading_sequence(KEYS[0], None, "agent"))
+        mock_ui_class.assert_not_called()
+
+    @patch('trading_ui_automation.TradingPlatformUI')
+    def test_replay_skips_browser(self, mock_ui_class):
+        """A successful replay never starts Chrome"""
+        session = UITradingSession({'trades_per_wallet': 1})
+        session.replayer = MagicMock()
+        session.replayer.replay.return_value = {'status': 'success', 'steps': 6}
+
+        self.assertTrue(session.execute_trading_sequence(KEYS[0], None, "agent"))
+        mock_ui_class.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
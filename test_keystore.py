@@ -0,0 +1,174 @@
+import csv
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from crypto_trading_bot import TradingSession, WalletManager
+from execution_plan import plan_session, wallet_fingerprint
+from keystore import KeystoreError, UnlockedKeys, keystore_files, keystore_name, write_keystore
+from trade_result import TradeResult
+from wallet_addresses import wallet_address
+
+KEYS = ['0x' + f"{index:02x}" * 32 for index in range(1, 6)]
+PASSWORD = 'correct horse'
+# Cheap scrypt parameters keep the tests fast; real keystores use n=262144
+FAST = 2 ** 4
+
+
+class TestUnlockedKeys(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        for index, key in enumerate(KEYS):
+            write_keystore(self.dir, keystore_name(index), key, PASSWORD, iterations=FAST)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_keys_unlock_in_file_order(self):
+        keys = UnlockedKeys.from_directory(self.dir, PASSWORD, workers=2)
+        self.assertTrue(keys.wait(30))
+        self.assertEqual(list(keys), KEYS)
+        self.assertEqual(keys.index(KEYS[3]), 3)
+        self.assertIn(KEYS[1], keys)
+        self.assertNotIn('0x' + 'ff' * 32, keys)
+        self.assertEqual(keys[1:3], KEYS[1:3])
+        keys.close()
+        self.assertEqual(bytes(keys._buffer), bytes(len(KEYS) * 32))
+
+    def test_first_keys_are_readable_while_later_ones_decrypt(self):
+        slow = write_keystore(self.dir, keystore_name(len(KEYS)), '0x' + 'aa' * 32, PASSWORD, iterations=2 ** 18)
+        keys = UnlockedKeys(keystore_files(self.dir), PASSWORD, workers=1)
+        self.assertEqual(keys[0], KEYS[0])
+        self.assertIsNone(keys.finished_at)
+        self.assertLess(keys.ready_count, len(keys))
+        self.assertEqual(keys.paths[-1], slow)
+        keys.close()
+
+    def test_undecryptable_file_fails_only_its_own_slot(self):
+        write_keystore(self.dir, keystore_name(1), KEYS[1], 'wrong password', iterations=FAST)
+        keys = UnlockedKeys.from_directory(self.dir, PASSWORD, workers=2)
+        keys.wait(30)
+        with self.assertRaises(KeystoreError):
+            keys[1]
+        self.assertEqual(keys[2], KEYS[2])
+        self.assertEqual(list(keys.errors), [1])
+        self.assertTrue(keys.failed(1))
+        self.assertEqual(keys.copy(), KEYS[:1] + KEYS[2:])
+
+    def test_pbkdf2_keystores(self):
+        path = write_keystore(self.dir, keystore_name(0), KEYS[0], PASSWORD, kdf='pbkdf2', iterations=1000)
+        keys = UnlockedKeys([path], PASSWORD, workers=1)
+        self.assertEqual(keys[0], KEYS[0])
+        keys.close()
+
+    def test_plan_fingerprint_uses_addresses_not_keys(self):
+        keys = UnlockedKeys.from_directory(self.dir, PASSWORD, workers=1)
+        plan = plan_session({}, keys, 'parallel', seed=1)
+        self.assertEqual(plan.fingerprint, wallet_fingerprint(keys))
+        self.assertEqual(keys.addresses, [wallet_address(key).lower() for key in KEYS])
+        keys.close()
+
+
+class TestKeystoreWalletManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for index, key in enumerate(KEYS[:2]):
+            write_keystore(self.tmp.name, keystore_name(index), key, PASSWORD, iterations=FAST)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_keys_never_reach_the_log(self):
+        with self.assertLogs(level='INFO') as logs:
+            manager = WalletManager(keystore_dir=self.tmp.name, keystore_password=PASSWORD)
+            manager.wallets.wait(30)
+            manager.add_wallet(KEYS[2])
+        output = "\n".join(logs.output)
+        for key in KEYS[:3]:
+            self.assertNotIn(key[2:10], output)
+        self.assertEqual(manager.get_next_wallet(2), KEYS[2])
+        self.assertEqual(len(keystore_files(self.tmp.name)), 3)
+        reloaded = UnlockedKeys.from_directory(self.tmp.name, PASSWORD, workers=1)
+        reloaded.wait(30)
+        self.assertEqual(list(reloaded), KEYS[:3])
+
+    def test_keystore_needs_a_password(self):
+        with self.assertRaises(ValueError):
+            WalletManager(keystore_dir=self.tmp.name)
+
+
+class TestSessionWithBadKeystore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        keystore_dir = os.path.join(self.tmp.name, 'keystores')
+        os.makedirs(keystore_dir)
+        for index, key in enumerate(KEYS):
+            write_keystore(keystore_dir, keystore_name(index), key, PASSWORD, iterations=FAST)
+        # A corrupted MAC: the file parses but never decrypts
+        write_keystore(keystore_dir, keystore_name(2), KEYS[2], 'other password', iterations=FAST)
+        proxy_file = os.path.join(self.tmp.name, 'proxies.txt')
+        with open(proxy_file, 'w') as f:
+            f.write("127.0.0.1:8080@user:pass\n")
+        self.session = TradingSession({
+            'keystore_dir': keystore_dir, 'keystore_password': PASSWORD, 'proxy_file': proxy_file,
+            'results_dir': os.path.join(self.tmp.name, 'results'), 'enable_logs': False, 'launch_delay': (0, 0),
+            'balance_check': True, 'branch_wallet_range': (2, 2), 'max_parallel_branches': 2
+        })
+        self.session.wallet_manager.wallets.wait(30)
+
+    def tearDown(self):
+        self.session.wallet_manager.wallets.close()
+        self.tmp.cleanup()
+
+    def rows(self):
+        with open(self.session.csv_file) as f:
+            return list(csv.DictReader(f))
+
+    def test_legacy_modes_trade_the_other_wallets(self):
+        with patch.object(self.session.transaction_manager, 'execute_trade',
+                          return_value={'status': 'success'}) as execute_trade:
+            self.session.run_session('parallel')
+            self.session.run_session('branch')
+        traded = {call.args[0] for call in execute_trade.call_args_list}
+        self.assertNotIn(KEYS[2], traded)
+        self.assertEqual(len(self.rows()), len(KEYS) - 1 + 4)
+
+    def test_plans_record_the_locked_wallet_as_failed(self):
+        plan = self.session.build_plan('parallel', seed=1)
+        with patch.object(self.session.transaction_manager, 'execute_trades',
+                          side_effect=lambda wallet, orders, proxy: [
+                              {'status': 'success', 'details': dict(leg)} for leg in orders]):
+            self.session.execute_plan(plan)
+
+        def submit_trade(prepared, proxy):
+            return TradeResult.success(prepared.tx_id, time.time(), prepared.wallet_key, prepared.asset,
+                                       prepared.direction, prepared.size, prepared.signature)
+
+        with patch.object(self.session.transaction_manager, 'submit_trade', side_effect=submit_trade):
+            self.session.execute_staged_plan(plan)
+        rows = self.rows()
+        self.assertEqual(len(rows), 2 * len(plan))
+        failed = [row for row in rows if row['status'] == 'failed']
+        self.assertEqual(len(failed), 2)
+        self.assertTrue(all(row['wallet'] == 'unknown' for row in failed))
+        # Exposure still counts the fills of every unlocked wallet
+        self.assertEqual(self.session.exposure.trades, 2 * (len(plan) - 1))
+
+    @patch('crypto_trading_bot.time.sleep')
+    def test_unlocked_keys_never_reach_the_log(self, mock_sleep):
+        with self.assertLogs(level='INFO') as logs:
+            self.session._process_wallet_with_size(KEYS[0], 'long', 1, 'BTC')
+            self.session.transaction_manager.prepare_trades(KEYS[1], [
+                {'asset': 'ETH', 'direction': 'short', 'size': size} for size in (1, 20000)
+            ])
+        output = "\n".join(logs.output)
+        self.assertIn('Executing trade', output)
+        for key in KEYS[:2]:
+            self.assertNotIn(key[2:], output)
+
+
+if __name__ == '__main__':
+    unittest.main()
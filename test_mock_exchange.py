@@ -0,0 +1,124 @@
+import unittest
+
+import requests
+
+from mock_exchange import (HttpExchangeBackend, LatencyModel, MockExchangeServer, MockProxyServer,
+                           TokenBucket)
+from soak_harness import SoakMonitor, build_parser, generate_wallets, run_soak
+from trade_result import PreparedTrade, TradeResult
+
+WALLET = '0x' + '01' * 32
+
+
+def prepared(count=1, size=10.0):
+    return [PreparedTrade(f"tx{index}", WALLET, 'BTC', 'long', size, 'sig') for index in range(count)]
+
+
+class TestModels(unittest.TestCase):
+    def test_latency_specs(self):
+        self.assertEqual(LatencyModel.parse('const:0.25').sample(), 0.25)
+        uniform = LatencyModel.parse('uniform:0.1,0.2', seed=1)
+        self.assertTrue(all(0.1 <= uniform.sample() <= 0.2 for _ in range(100)))
+        lognormal = LatencyModel.parse('lognormal:0.05,0.5', seed=1)
+        draws = sorted(lognormal.sample() for _ in range(2001))
+        self.assertAlmostEqual(draws[1000], 0.05, delta=0.01)
+        spiky = LatencyModel.parse('const:0', spike_rate=1.0, spike=2.0)
+        self.assertEqual(spiky.sample(), 2.0)
+        with self.assertRaises(ValueError):
+            LatencyModel.parse('gamma:1')
+
+    def test_token_bucket_allows_bursts_then_refills(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        now = bucket.updated
+        self.assertEqual(bucket.take(now), 0.0)
+        self.assertEqual(bucket.take(now), 0.0)
+        self.assertAlmostEqual(bucket.take(now), 0.1)
+        self.assertEqual(bucket.take(now + 0.11), 0.0)
+
+
+class TestMockExchange(unittest.TestCase):
+    def start(self, **kwargs):
+        exchange = MockExchangeServer(**kwargs).start()
+        self.addCleanup(exchange.stop)
+        return exchange
+
+    def test_batch_is_filled_through_the_proxy(self):
+        exchange = self.start()
+        proxy = MockProxyServer(credentials='user:pass').start()
+        self.addCleanup(proxy.stop)
+        backend = HttpExchangeBackend(exchange.url)
+        self.addCleanup(backend.close)
+        results = backend.submit_trades(prepared(3), {'ip_port': f"127.0.0.1:{proxy.port}", 'auth': 'user:pass'})
+        self.assertEqual([str(result.status) for result in results], ['success'] * 3)
+        self.assertEqual(exchange.stats()['orders'], 3)
+        self.assertEqual(proxy.stats()['forwarded'], 1)
+
+        rejected = backend.submit_trades(prepared(), {'ip_port': f"127.0.0.1:{proxy.port}", 'auth': 'user:wrong'})
+        self.assertEqual(rejected[0].error, 'HTTP 407')
+
+    def test_invalid_orders_are_rejected_individually(self):
+        backend = HttpExchangeBackend(self.start().url, use_proxy=False)
+        self.addCleanup(backend.close)
+        results = backend.submit_trades(prepared() + [PreparedTrade('bad', WALLET, 'BTC', 'long', -1, 'sig')], {})
+        self.assertEqual([str(result.status) for result in results], ['success', 'failed'])
+        self.assertEqual(results[1].error, 'invalid order')
+
+    def test_rate_limited_batches_are_retried(self):
+        exchange = self.start(wallet_rate=20, wallet_burst=1)
+        backend = HttpExchangeBackend(exchange.url, use_proxy=False, max_retries=2)
+        self.addCleanup(backend.close)
+        results = [backend.submit_trades(prepared(), {})[0] for _ in range(3)]
+        self.assertTrue(all(isinstance(result, TradeResult) and str(result.status) == 'success' for result in results))
+        self.assertGreater(exchange.stats()['responses']['429'], 0)
+
+    def test_injected_faults_fail_the_batch(self):
+        for kwargs, error in (({'error_rate': 1.0}, 'HTTP 500'), ({'stall_rate': 1.0, 'stall': 0.05}, 'HTTP 504')):
+            backend = HttpExchangeBackend(self.start(**kwargs).url, use_proxy=False)
+            self.addCleanup(backend.close)
+            self.assertEqual(backend.submit_trades(prepared(), {})[0].error, error)
+
+        backend = HttpExchangeBackend(self.start(drop_rate=1.0).url, use_proxy=False)
+        self.addCleanup(backend.close)
+        self.assertIn('ConnectionError', backend.submit_trades(prepared(), {})[0].error)
+        direct = requests.get(f"{backend.url.rsplit('/api', 1)[0]}/stats").json()
+        self.assertEqual(direct['responses'], {'dropped': 1})
+
+
+class TestSoakHarness(unittest.TestCase):
+    def test_monitor_windows_and_leak_flags(self):
+        monitor = SoakMonitor(reservoir_size=10, seed=1)
+        results = [TradeResult.success('tx', 0.0, WALLET, 'BTC', 'long', 1.0, 'sig'), TradeResult.failed('x', 0.0)]
+        for latency in range(100):
+            monitor(results, 0.0, latency / 100)
+        sample = monitor.sample()
+        self.assertEqual(sample['trades'], 200)
+        self.assertEqual(sample['error_rate'], 0.5)
+        self.assertEqual(len(monitor.reservoir), 10)
+        self.assertEqual(monitor.sample()['requests'], 0)
+        monitor.samples = [{'elapsed': t * 360, 'rss_bytes': (100 + 20 * t) * 2 ** 20, 'open_fds': 10 + t * 20}
+                           for t in range(10)]
+        summary = monitor.summary(warmup=0.2)
+        self.assertAlmostEqual(summary['rss_growth_mb_per_hour'], 200.0)
+        self.assertEqual(summary['fd_growth'], 140)
+        self.assertEqual(summary['suspected_leaks'], ['rss', 'fds'])
+
+    def test_short_soak_against_stand_ins(self):
+        args = build_parser().parse_args([
+            '--duration', '0.5', '--wallets', '40', '--proxies', '2', '--trade-rate', '0', '--concurrency', '4',
+            '--interval', '0.2', '--rss-threshold', '1e9', '--fd-threshold', '1000000',
+            '--latency', 'const:0.001', '--error-rate', '0.1', '--seed', '1'
+        ])
+        report = run_soak(args)
+        self.assertGreaterEqual(report['rounds'], 1)
+        self.assertEqual(report['trades'], report['rounds'] * 40)
+        self.assertGreater(report['errors'], 0)
+        self.assertEqual(report['exchange']['responses']['500'], report['errors'])
+        self.assertEqual(report['suspected_leaks'], [])
+
+    def test_generated_wallets_are_stable(self):
+        self.assertEqual(generate_wallets(3, seed=2), generate_wallets(3, seed=2))
+        self.assertEqual(len(set(generate_wallets(1000))), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
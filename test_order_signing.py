@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+
+from crypto_trading_bot import TransactionManager
+from order_signing import OrderSigner, SigningPool
+
+WALLET_KEYS = ['0x' + f"{index:02x}" * 32 for index in range(1, 5)]
+
+
+class TestOrderSigner(unittest.TestCase):
+    def setUp(self):
+        self.signer = OrderSigner(chain_id=8453, verifying_contract='0x' + 'ab' * 20)
+
+    def test_signature_recovers_to_wallet(self):
+        key = WALLET_KEYS[0]
+        order = self.signer.build_order(key, 'ETH', 'short', 12.5, nonce=7, expiry=1700000000)
+        self.assertEqual(order['size'], 12500000)
+        self.assertFalse(order['isLong'])
+        signature = self.signer.sign_order(key, order)
+
+        # Cross-check the hand-rolled struct hash against eth_account's encoder
+        message = encode_typed_data(full_message=self.signer.typed_data(order))
+        self.assertEqual(Account.recover_message(message, signature=signature),
+                         Account.from_key(key).address)
+
+    def test_parsed_keys_are_cached(self):
+        key = WALLET_KEYS[1]
+        order = self.signer.build_order(key, 'BTC', 'long', 1.0, nonce=1)
+        with patch('order_signing.keys.PrivateKey', wraps=__import__('eth_keys').keys.PrivateKey) as parse:
+            self.signer._keys.clear()
+            self.signer.sign_order(key, order)
+            self.signer.sign_order(key, order)
+        self.assertEqual(parse.call_count, 1)
+
+    def test_from_config(self):
+        self.assertIsNone(OrderSigner.from_config({}))
+        signer = OrderSigner.from_config({'order_signing': {'chain_id': 10}})
+        self.assertEqual(signer.domain['chainId'], 10)
+
+    def test_pool_matches_in_process_signatures(self):
+        items = [
+            (key, self.signer.build_order(key, 'SOL', 'long', 2.0, nonce=n, expiry=1700000000))
+            for n, key in enumerate(WALLET_KEYS * 3)
+        ]
+        with SigningPool(self.signer, WALLET_KEYS, workers=2, chunk_size=4) as pool:
+            signatures = pool.sign_batch(items)
+        self.assertEqual(signatures, self.signer.sign_batch(items))
+
+    def test_transaction_manager_signs_orders(self):
+        manager = TransactionManager(order_signer=self.signer)
+        with patch('crypto_trading_bot.time.sleep'):
+            result = manager.execute_trade(WALLET_KEYS[2], 'BTC', 'long', 100, {})
+        self.assertEqual(result['status'], 'success')
+        self.assertTrue(result['signature'].startswith('0x'))
+        self.assertEqual(len(result['signature']), 2 + 65 * 2)
+
+    def test_batch_signature_covers_every_order(self):
+        key = WALLET_KEYS[0]
+        orders = [self.signer.build_order(key, asset, 'long', 3.0, nonce=n, expiry=1700000000)
+                  for n, asset in enumerate(['BTC', 'ETH', 'SOL'])]
+        signature = self.signer.sign_order_batch(key, orders)
+        message = encode_typed_data(full_message=self.signer.batch_typed_data(orders))
+        self.assertEqual(Account.recover_message(message, signature=signature),
+                         Account.from_key(key).address)
+        self.assertNotEqual(signature, self.signer.sign_order_batch(key, orders[:2]))
+
+    def test_execute_trades_signs_and_submits_once_per_batch(self):
+        manager = TransactionManager(order_signer=self.signer, max_batch_size=3)
+        orders = [{'asset': 'BTC', 'direction': 'long', 'size': 10.0 + n} for n in range(4)]
+        orders[1]['size'] = 20000
+        with patch('crypto_trading_bot.time.sleep') as sleep, \
+                patch.object(self.signer, 'sign_order_batch', wraps=self.signer.sign_order_batch) as sign_batch:
+            results = manager.execute_trades(WALLET_KEYS[3], orders, {})
+        self.assertEqual([result['status'] for result in results], ['success', 'failed', 'success', 'success'])
+        self.assertEqual(sign_batch.call_count, 1)
+        # One request for the first three orders, one for the last
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(results[0]['signature'], results[2]['signature'])
+        self.assertEqual(results[3]['details']['size'], 13.0)
+        self.assertEqual(len({result['transaction_hash'] for result in results if 'transaction_hash' in result}), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+import threading
+import time
+
+from pipeline import PipelineStage, RateLimiter, StagePipeline
+from trading_ui_automation import connect_to_main_trading_bot
+from test_data import TEST_WALLETS, TEST_PROXIES, TEST_CONFIGS
+from test_utils import setup_test_files, cleanup_test_files
+
+
+class TestStagePipeline(unittest.TestCase):
+    def test_items_flow_through_all_stages(self):
+        """Every item passes each stage once and dropped items stop early"""
+        results = []
+        pipeline = StagePipeline([
+            PipelineStage('double', lambda x: x * 2, workers=3, queue_size=2),
+            PipelineStage('skip_odd_input', lambda x: None if x % 4 else x, workers=2, queue_size=2)
+        ], on_result=results.append)
+        stats = pipeline.run(range(10))
+
+        self.assertEqual(sorted(results), [0, 4, 8, 12, 16])
+        self.assertEqual(stats['double']['processed'], 10)
+        self.assertEqual(stats['skip_odd_input']['dropped'], 5)
+
+    def test_slow_stage_applies_backpressure(self):
+        """A slow downstream stage keeps upstream queues bounded"""
+        max_depth = []
+        gate = threading.Event()
+
+        def slow(item):
+            gate.wait(0.01)
+            return item
+
+        fast = PipelineStage('fast', lambda x: x, workers=1, queue_size=3)
+        slow_stage = PipelineStage('slow', slow, workers=1, queue_size=3)
+        pipeline = StagePipeline([fast, slow_stage])
+        pipeline.start()
+        for i in range(30):
+            pipeline.submit(i)
+            max_depth.append(slow_stage.queue.qsize())
+        pipeline.close()
+        pipeline.join()
+
+        self.assertLessEqual(max(max_depth), 3)
+        self.assertEqual(pipeline.stats()['slow']['processed'], 30)
+        self.assertGreater(pipeline.stats()['slow']['utilisation'], 0)
+
+    def test_handler_error_is_counted(self):
+        """An exception in a handler drops the item and counts a failure"""
+        def broken(item):
+            raise RuntimeError("boom")
+
+        stats = StagePipeline([PipelineStage('broken', broken)]).run([1, 2])
+        self.assertEqual(stats['broken']['failed'], 2)
+
+    def test_rate_limiter_spaces_calls(self):
+        """acquire() holds callers to the configured rate; no rate means no wait"""
+        limiter = RateLimiter(50)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        limiter.rate = None
+        started = time.monotonic()
+        for _ in range(100):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    def test_resize_while_running(self):
+        """Workers added or retired mid-run still process every item exactly once"""
+        results = []
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow(item):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.005)
+            with lock:
+                active[0] -= 1
+            return item
+
+        pipeline = StagePipeline([PipelineStage('slow', slow, workers=1, queue_size=2)], on_result=results.append)
+        pipeline.start()
+        for i in range(60):
+            if i == 10:
+                pipeline.resize('slow', workers=4, queue_size=8)
+            if i == 40:
+                pipeline.resize('slow', workers=1)
+            pipeline.submit(i)
+        pipeline.close()
+        pipeline.join()
+
+        self.assertEqual(sorted(results), list(range(60)))
+        self.assertGreater(peak[0], 1)
+        self.assertEqual(pipeline.stats()['slow']['workers'], 1)
+        self.assertEqual(pipeline.stats()['slow']['queue_capacity'], 8)
+
+
+class TestCombinedPipeline(unittest.TestCase):
+    def setUp(self):
+        setup_test_files(TEST_WALLETS, TEST_PROXIES)
+        self.tmp = tempfile.TemporaryDirectory()
+        config = dict(TEST_CONFIGS["parallel_trading"], ui_concurrency=2, backend_concurrency=2,
+                      results_dir=os.path.join(self.tmp.name, 'results'))
+        self.session = connect_to_main_trading_bot()(config)
+        self.session.transaction_manager = MagicMock()
+        self.session.transaction_manager.execute_trade.return_value = {'status': 'success'}
+
+    def tearDown(self):
+        cleanup_test_files()
+        self.tmp.cleanup()
+
+    @patch('trading_ui_automation.UITradingSession.execute_trading_sequence')
+    def test_ui_failures_skip_backend(self, mock_sequence):
+        """Only wallets whose UI sequence succeeds reach the backend stage"""
+        failing = TEST_WALLETS[1]["private_key"]
+        mock_sequence.side_effect = lambda wallet, proxy, agent: wallet != failing
+
+        stats = self.session.execute_pipelined_trading()
+
+        self.assertEqual(stats['ui']['processed'], len(TEST_WALLETS))
+        self.assertEqual(stats['backend']['processed'], len(TEST_WALLETS) - 1)
+        traded = [c.args[0] for c in self.session.transaction_manager.execute_trade.call_args_list]
+        self.assertNotIn(failing, traded)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import threading
+import time
+
+from position_manager import PositionLifecycleManager
+from trading_ui_automation import UITradingSession
+
+
+class TestPositionLifecycleManager(unittest.TestCase):
+    def setUp(self):
+        self.closed = []
+        self.lock = threading.Lock()
+
+    def _close(self, position):
+        with self.lock:
+            self.closed.append(position['wallet_key'])
+        return True
+
+    def test_positions_close_in_due_order(self):
+        """Positions are closed by due time, not by opening order"""
+        manager = PositionLifecycleManager(self._close, worker_count=1)
+        manager.start()
+        manager.open_position("wallet_slow", "BTC", "long", 10, 0.15)
+        manager.open_position("wallet_fast", "ETH", "short", 10, 0.05)
+        self.assertTrue(manager.wait_until_empty(timeout=5))
+        manager.stop()
+        self.assertEqual(self.closed, ["wallet_fast", "wallet_slow"])
+
+    def test_many_positions_with_few_workers(self):
+        """Thousands of held positions need only a handful of workers"""
+        manager = PositionLifecycleManager(self._close, worker_count=2)
+        manager.start()
+        for i in range(2000):
+            manager.open_position(f"wallet_{i}", "BTC", "long", 1, 0.01 * (i % 5))
+        self.assertLess(threading.active_count(), 10)
+        manager.stop(drain=True, timeout=10)
+        self.assertEqual(manager.closed_count, 2000)
+        self.assertEqual(manager.pending_count(), 0)
+
+    def test_failed_close_is_recorded(self):
+        """A close callback that raises leaves the position in the failed list"""
+        def broken_close(position):
+            raise RuntimeError("browser crashed")
+
+        manager = PositionLifecycleManager(broken_close, worker_count=1)
+        manager.start()
+        manager.open_position("wallet_1", "SOL", "long", 5, 0)
+        manager.stop(drain=True, timeout=5)
+        self.assertEqual(len(manager.failed), 1)
+        self.assertEqual(manager.closed_count, 0)
+
+
+class TestUITradingSessionHolds(unittest.TestCase):
+    @patch('trading_ui_automation.time.sleep')
+    @patch('trading_ui_automation.TradingPlatformUI')
+    def test_hold_is_deferred_to_manager(self, mock_ui_class, mock_sleep):
+        """With a lifecycle manager the sequence returns without sleeping through the hold"""
+        mock_ui_class.return_value = MagicMock()
+        manager = MagicMock()
+        session = UITradingSession(
+            {'trades_per_wallet': 2, 'position_hold_time': 120, 'position_direction': 'long'},
+            position_manager=manager
+        )
+
+        self.assertTrue(session.execute_trading_sequence("0x" + "01" * 32, {'ip_port': '127.0.0.1:8080'}, "agent"))
+        mock_sleep.assert_not_called()
+        self.assertEqual(manager.open_position.call_count, 2)
+        mock_ui_class.return_value.close_position.assert_not_called()
+        mock_ui_class.return_value.close_session.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,147 @@
+import unittest
+from unittest.mock import patch
+
+from crypto_trading_bot import TransactionManager
+from order_signing import OrderSigner
+from rpc_client import JsonRpcClient, NonceManager, RpcError
+from standin_servers import StandinRpcServer
+from trade_result import PreparedTrade, TradeResult
+from tx_ids import TxIdGenerator
+
+ADDRESSES = [f"0x{index:040x}" for index in range(1, 6)]
+
+
+class TestJsonRpcClient(unittest.TestCase):
+    def setUp(self):
+        self.server = StandinRpcServer().start()
+        for index, address in enumerate(ADDRESSES):
+            self.server.nonces[address] = index * 10
+            self.server.balances[address] = 10 ** 18 + index
+        self.client = JsonRpcClient(self.server.url, max_batch_size=3)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_per_wallet_reads_are_batched(self):
+        balances = self.client.get_balances(ADDRESSES)
+        self.assertEqual(balances[ADDRESSES[2]], 10 ** 18 + 2)
+        # Five addresses with a batch size of three: two HTTP requests
+        self.assertEqual(self.server.http_requests, [['eth_getBalance'] * 3, ['eth_getBalance'] * 2])
+
+    def test_failed_calls_are_returned_in_place(self):
+        self.server.fail_methods['eth_call'] = 'execution reverted'
+        results = self.client.eth_calls([{'to': ADDRESSES[0], 'data': '0x'}] * 2)
+        self.assertTrue(all(isinstance(result, RpcError) for result in results))
+        self.assertEqual(self.client.get_transaction_counts([]), {})
+
+    def test_chain_constants_are_cached(self):
+        self.assertEqual(self.client.chain_id(), 421614)
+        self.assertEqual(self.client.chain_id(), 421614)
+        self.assertEqual(len(self.server.http_requests), 1)
+
+    def test_call_raises_rpc_errors(self):
+        with self.assertRaises(RpcError):
+            self.client.call('eth_unknownMethod')
+
+    def test_replies_without_a_result_are_errors(self):
+        with patch.object(self.client, '_post', return_value={'jsonrpc': '2.0', 'id': 1}):
+            with self.assertRaises(RpcError):
+                self.client.chain_id()
+        with patch.object(self.client, '_post', return_value=[{'jsonrpc': '2.0', 'id': None, 'result': None}]):
+            self.assertEqual(self.client.get_balances(ADDRESSES[:1]), {})
+
+    def test_from_config(self):
+        self.assertIsNone(JsonRpcClient.from_config({}))
+        client = JsonRpcClient.from_config({'web3_provider': self.server.url, 'rpc_batch_size': 7})
+        self.assertEqual(client.max_batch_size, 7)
+
+
+class TestNonceManager(unittest.TestCase):
+    def setUp(self):
+        self.server = StandinRpcServer().start()
+        for index, address in enumerate(ADDRESSES):
+            self.server.nonces[address] = index
+        self.client = JsonRpcClient(self.server.url)
+        self.nonces = NonceManager(self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_nonces_are_counted_locally(self):
+        self.nonces.prime(ADDRESSES)
+        self.assertEqual([self.nonces.next_nonce(ADDRESSES[3]) for _ in range(3)], [3, 4, 5])
+        self.assertEqual(self.nonces.next_nonce(ADDRESSES[0]), 0)
+        # One batch for all five wallets, nothing per trade
+        self.assertEqual(len(self.server.http_requests), 1)
+
+    def test_release_of_last_nonce_reuses_it(self):
+        nonce = self.nonces.next_nonce(ADDRESSES[1])
+        self.nonces.release(ADDRESSES[1], nonce)
+        self.assertEqual(self.nonces.next_nonce(ADDRESSES[1]), nonce)
+
+    def test_release_with_later_nonces_out_resyncs(self):
+        first = self.nonces.next_nonce(ADDRESSES[1])
+        self.nonces.next_nonce(ADDRESSES[1])
+        # Only the second transaction reached the node
+        self.server.nonces[ADDRESSES[1]] = first + 1
+        self.nonces.release(ADDRESSES[1], first)
+        self.assertEqual(self.nonces.resyncs, 1)
+        self.assertEqual(self.nonces.next_nonce(ADDRESSES[1]), first + 1)
+
+    def test_reconcile_after_nonce_too_low(self):
+        self.nonces.next_nonce(ADDRESSES[2])
+        self.server.nonces[ADDRESSES[2]] = 40
+        self.nonces.reconcile([ADDRESSES[2]])
+        self.assertEqual(self.nonces.next_nonce(ADDRESSES[2]), 40)
+
+    def test_unreachable_nonce_raises(self):
+        self.server.fail_methods['eth_getTransactionCount'] = 'unavailable'
+        with self.assertRaises(RpcError):
+            self.nonces.next_nonce(ADDRESSES[0])
+
+
+class TestSignedOrderNonces(unittest.TestCase):
+    WALLET = '0x' + '42' * 32
+
+    def setUp(self):
+        self.server = StandinRpcServer().start()
+        self.client = JsonRpcClient(self.server.url)
+        self.signer = OrderSigner()
+        self.address = self.signer.address(self.WALLET)
+        self.server.nonces[self.address.lower()] = 7
+        self.manager = TransactionManager(TxIdGenerator(node_id=1), self.signer, max_batch_size=3,
+                                          nonce_manager=NonceManager(self.client))
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_orders_are_signed_with_chain_nonces(self):
+        first = self.manager.prepare_trade(self.WALLET, 'BTC', 'long', 10)
+        batch = self.manager.prepare_trades(self.WALLET, [
+            {'asset': 'ETH', 'direction': 'short', 'size': size} for size in (1, 20000, 2)
+        ])
+        self.assertEqual(first.nonce, 7)
+        self.assertEqual([getattr(entry, 'nonce', None) for entry in batch], [8, None, 9])
+        self.assertIsInstance(batch[1], TradeResult)
+
+    def test_nonces_of_rejected_trades_are_reused(self):
+        def reject(prepared, proxy):
+            return [TradeResult.failed('rejected', 0, trade.tx_id) for trade in prepared]
+
+        with patch.object(self.manager, '_send', side_effect=reject):
+            results = self.manager.execute_trades(self.WALLET, [
+                {'asset': 'SOL', 'direction': 'long', 'size': size} for size in (1, 2)
+            ], {})
+        self.assertTrue(all(result['status'] == 'failed' for result in results))
+        prepared = self.manager.prepare_trade(self.WALLET, 'SOL', 'long', 3)
+        self.assertIsInstance(prepared, PreparedTrade)
+        self.assertEqual(prepared.nonce, 7)
+        self.manager.discard(prepared)
+        self.assertEqual(self.manager.prepare_trade(self.WALLET, 'SOL', 'long', 3).nonce, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import csv
+import tempfile
+import time
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+from crypto_trading_bot import TradingSession
+from scheduler import EXPIRED, LATE, FairScheduler
+from test_utils import session_config
+from trade_result import TradeResult
+
+WALLETS = ['0x' + f"{index:02x}" * 32 for index in range(1, 9)]
+
+
+def drain(scheduler, now=0.0):
+    items = []
+    while True:
+        item = scheduler.pop(now)
+        if item is None:
+            return items
+        items.append(item)
+
+
+class TestFairScheduler(unittest.TestCase):
+    def test_burst_on_one_flow_does_not_starve_another(self):
+        scheduler = FairScheduler()
+        for index in range(100):
+            scheduler.push(('BTC', index), 'BTC', deadline=index)
+        for index in range(10):
+            scheduler.push(('ETH', index), 'ETH', deadline=index)
+        first = drain(scheduler)[:20]
+        self.assertEqual(Counter(flow for flow, _ in first), {'BTC': 10, 'ETH': 10})
+
+    def test_weights_set_the_dispatch_ratio(self):
+        scheduler = FairScheduler(weight={'BTC': 3.0, 'ETH': 1.0}.get)
+        for index in range(40):
+            scheduler.push('BTC', 'BTC', deadline=index)
+            scheduler.push('ETH', 'ETH', deadline=index)
+        self.assertEqual(Counter(drain(scheduler)[:20]), {'BTC': 15, 'ETH': 5})
+
+    def test_earliest_deadline_first_within_a_flow(self):
+        scheduler = FairScheduler()
+        for deadline in (5, 1, 3):
+            scheduler.push(deadline, 'BTC', deadline=deadline)
+        self.assertEqual(drain(scheduler), [1, 3, 5])
+
+    def test_idle_flow_banks_no_credit(self):
+        scheduler = FairScheduler()
+        for index in range(10):
+            scheduler.push('BTC', 'BTC', deadline=index)
+        self.assertEqual([scheduler.pop(0.0) for _ in range(5)], ['BTC'] * 5)
+        for index in range(10):
+            scheduler.push('ETH', 'ETH', deadline=index)
+        # ETH starts at the current virtual time, not 5 dispatches behind BTC
+        self.assertEqual([scheduler.pop(0.0) for _ in range(4)], ['ETH', 'BTC', 'ETH', 'BTC'])
+
+    def test_expired_items_are_shed_and_counted(self):
+        shed = []
+        scheduler = FairScheduler(on_shed=lambda item, reason: shed.append((item, reason)))
+        scheduler.push('stale', 'BTC', deadline=1.0, expires=1.0)
+        scheduler.push('fresh', 'BTC', deadline=9.0, expires=9.0)
+        scheduler.push('eth', 'ETH', deadline=1.5, expires=1.5)
+        self.assertEqual(drain(scheduler, now=2.0), ['fresh'])
+        self.assertEqual(sorted(shed), [('eth', EXPIRED), ('stale', EXPIRED)])
+        scheduler.shed('BTC', LATE)
+        stats = scheduler.stats()
+        self.assertEqual((stats['dispatched'], stats['shed'], stats['queued']), (1, 3, 0))
+        self.assertEqual(stats['flows']['BTC']['shed'], {EXPIRED: 1, LATE: 1})
+
+    def test_flow_weight_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            FairScheduler(weight=lambda flow: 0).push('x', 'BTC', deadline=0)
+
+
+class TestScheduledSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = session_config(self.tmp.name, WALLETS, ["127.0.0.1:8080@user:pass", "127.0.0.1:8081@user:pass"],
+                                     trades_per_wallet=3, pipeline_queue_size=1, submit_concurrency=1,
+                                     scheduler='fair')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_plan(self, delay, **config):
+        session = TradingSession(dict(self.config, **config))
+        submitted = []
+
+        def submit_trade(prepared, proxy):
+            submitted.append(prepared.asset)
+            time.sleep(delay)
+            return TradeResult.success(prepared.tx_id, time.time(), prepared.wallet_key, prepared.asset,
+                                       prepared.direction, prepared.size, prepared.signature)
+
+        plan = session.build_plan('parallel', seed=4)
+        with patch.object(session.transaction_manager, 'submit_trade', side_effect=submit_trade):
+            session.execute_staged_plan(plan)
+        with open(session.csv_file) as f:
+            rows = list(csv.DictReader(f))
+        return session, plan, submitted, rows
+
+    def test_every_leg_runs_without_a_window(self):
+        session, plan, submitted, rows = self.run_plan(0.0)
+        stats = session.scheduler.stats()
+        self.assertEqual((stats['dispatched'], stats['shed']), (len(plan), 0))
+        self.assertEqual(len(submitted), len(plan))
+        self.assertTrue(all(row['status'] == 'success' for row in rows))
+
+    def test_legs_past_their_window_are_shed_not_run_late(self):
+        session, plan, submitted, rows = self.run_plan(0.02, launch_window=0.1)
+        stats = session.scheduler.stats()
+        self.assertGreater(stats['shed'], 0)
+        self.assertEqual(stats['dispatched'] + sum(
+            flow['shed'].get(EXPIRED, 0) for flow in stats['flows'].values()), len(plan))
+        self.assertEqual(len(rows), len(plan))
+        skipped = [row for row in rows if row['status'] == 'skipped']
+        self.assertEqual(len(skipped), stats['shed'])
+        self.assertTrue(all(row['error'].startswith('Missed launch window') for row in skipped))
+        self.assertEqual(len(submitted) + len(skipped), len(plan))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from session_config import ConfigWatcher, SessionConfig
+from test_utils import make_session
+from trade_result import TradeResult
+
+WALLETS = ['0x' + f"{index:02x}" * 32 for index in range(1, 9)]
+
+
+class TestSessionConfig(unittest.TestCase):
+    def test_snapshot_is_validated_and_frozen(self):
+        settings = SessionConfig.from_config({'volume_percentage_range': [5, 9], 'trading_assets': ['BTC'],
+                                              'keys_file': 'other.txt'})
+        self.assertEqual(settings.volume_percentage_range, (5.0, 9.0))
+        self.assertEqual(settings.trading_assets, ('BTC',))
+        self.assertEqual(settings.submit_concurrency, 8)
+        with self.assertRaises(ValueError):
+            settings.thread_count = 3
+        for bad in ({'volume_percentage_range': (50, 10)}, {'submit_concurrency': 0},
+                    {'position_direction': 'sideways'}, {'trading_assets': []}, {'branch_wallet_range': (1, 3)}):
+            with self.assertRaises(ValueError, msg=bad):
+                SessionConfig.from_config(bad)
+
+
+class TestReconfigure(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = make_session(self.tmp.name, WALLETS, ["127.0.0.1:8080@user:pass"],
+                                    trades_per_wallet=4, pipeline_queue_size=1, submit_concurrency=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_changes_swap_in_a_new_snapshot(self):
+        before = self.session.settings
+        self.session.reconfigure({'volume_percentage_range': (7, 7), 'trading_assets': ['SOL']})
+        self.assertIsNot(self.session.settings, before)
+        self.assertEqual(self.session._get_trade_size(), 7)
+        assets = self.session.build_plan('parallel', seed=1).summary()['assets']
+        self.assertEqual(list(assets), ['SOL'])
+        self.assertEqual(assets['SOL']['long'] + assets['SOL']['short'], 7 * assets['SOL']['legs'])
+
+    def test_rejected_changes_leave_the_session_untouched(self):
+        before, config = self.session.settings, self.session.config
+        for changes in ({'submit_concurrency': -1}, {'proxy_file': 'elsewhere.txt'}):
+            with self.assertRaises(ValueError):
+                self.session.reconfigure(changes)
+        self.assertIs(self.session.settings, before)
+        self.assertIs(self.session.config, config)
+
+    def test_running_pipeline_is_resized_in_place(self):
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+        pipelines = []
+
+        def submit_trade(prepared, proxy):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return TradeResult.success(prepared.tx_id, time.time(), prepared.wallet_key, prepared.asset,
+                                       prepared.direction, prepared.size, prepared.signature)
+
+        def reconfigure():
+            while not self.session.pipeline or self.session.pipeline.stats()['record']['processed'] < 3:
+                time.sleep(0.001)
+            pipelines.append(self.session.pipeline)
+            self.session.reconfigure({'submit_concurrency': 4, 'pipeline_queue_size': 8})
+            pipelines.append(self.session.pipeline)
+
+        plan = self.session.build_plan('parallel', seed=3)
+        thread = threading.Thread(target=reconfigure)
+        with patch.object(self.session.transaction_manager, 'submit_trade', side_effect=submit_trade):
+            thread.start()
+            stats = self.session.execute_staged_plan(plan)
+        thread.join()
+        # Resized in place, not rebuilt
+        self.assertEqual(len(pipelines), 2)
+        self.assertIs(pipelines[0], pipelines[1])
+        self.assertEqual(stats['submit']['workers'], 4)
+        self.assertEqual(stats['record']['processed'], len(plan))
+        self.assertGreater(peak[0], 1)
+
+
+class TestConfigWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'control.json')
+        self.applied = []
+        self.session = type('Session', (), {'reconfigure': lambda _, changes: self.applied.append(changes)})()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.path + '.tmp', 'w') as f:
+            f.write(text)
+        os.replace(self.path + '.tmp', self.path)
+
+    def test_applies_each_change_once(self):
+        watcher = ConfigWatcher(self.session, self.path)
+        self.assertFalse(watcher.check())
+        self.write(json.dumps({'submit_rate': 5}))
+        self.assertTrue(watcher.check())
+        self.assertFalse(watcher.check())
+        self.write('{"submit_rate": ')
+        self.assertFalse(watcher.check())
+        self.assertEqual((self.applied, watcher.errors), ([{'submit_rate': 5}], 1))
+
+    @unittest.skipUnless(hasattr(signal, 'SIGHUP'), "needs SIGHUP")
+    def test_sighup_rereads_the_file(self):
+        self.write(json.dumps({'thread_count': 2}))
+        watcher = ConfigWatcher(self.session, self.path, interval=60).start()
+        try:
+            os.kill(os.getpid(), signal.SIGHUP)
+            deadline = time.monotonic() + 5
+            while len(self.applied) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+        self.assertEqual(self.applied, [{'thread_count': 2}] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
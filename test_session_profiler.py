@@ -0,0 +1,144 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from crypto_trading_bot import TradingSession
+from session_profiler import SessionProfiler, folded_from_stats
+
+
+def busy(n=20000):
+    return sum(i * i for i in range(n))
+
+
+def busy_for(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        busy()
+
+
+class TestSessionProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.base = os.path.join(self.tmp, 'trade_results_test')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_profiled(self, mode):
+        profiler = SessionProfiler(self.base, mode, interval=0.001, top=5)
+        profiler.start()
+        busy()
+        profiler.mark('warmup')
+        # Thread CPU is polled every 0.1s, so keep the worker alive for a few polls
+        worker = threading.Thread(target=busy_for, args=(0.3,), name='trade-worker')
+        worker.start()
+        worker.join()
+        kept = [bytearray(64) for _ in range(2000)]
+        paths = profiler.stop()
+        self.assertEqual(len(kept), 2000)
+        return profiler, paths
+
+    def test_sampling_writes_reports(self):
+        profiler, paths = self.run_profiled('sampling')
+        self.assertEqual(sorted(paths), ['alloc', 'folded', 'threads'])
+        with open(paths['folded']) as f:
+            stacks = f.read().splitlines()
+        self.assertTrue(stacks)
+        self.assertTrue(any(line.startswith('trade-worker;') and 'busy' in line for line in stacks))
+        with open(paths['alloc']) as f:
+            report = f.read()
+        self.assertIn('== warmup', report)
+        self.assertIn('test_session_profiler.py', report)
+        self.assertIn('trade-worker', {name for name, _ in profiler.thread_cpu.values()})
+
+    def test_cprofile_covers_new_threads(self):
+        _, paths = self.run_profiled('cprofile')
+        self.assertTrue(os.path.exists(paths['prof']))
+        with open(paths['folded']) as f:
+            folded = f.read()
+        self.assertIn('busy (test_session_profiler.py', folded)
+
+    def test_cprofile_stop_unhooks_threads_that_outlive_it(self):
+        profiler = SessionProfiler(self.base, 'cprofile', trace_memory=False)
+        profiler.start()
+        stopped, checked = threading.Event(), threading.Event()
+        hooks = []
+
+        def worker():
+            busy()
+            hooks.append(sys.getprofile() is not None)
+            stopped.wait(5)
+            hooks.append(sys.getprofile() is not None)
+            checked.set()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while not hooks:
+            time.sleep(0.001)
+        profiler.stop()
+        stopped.set()
+        checked.wait(5)
+        thread.join()
+        self.assertEqual(hooks, [sys.version_info < (3, 12), False])
+
+    def test_nested_start_profiles_once(self):
+        profiler = SessionProfiler(self.base, 'sampling', trace_memory=False)
+        profiler.start()
+        profiler.start()
+        self.assertEqual(profiler.stop(), {})
+        self.assertIn('folded', profiler.stop())
+        self.assertEqual(profiler.stop(), {})
+
+    def test_folded_from_stats_splits_shared_callee(self):
+        # a -> c (1s via a), b -> c (3s via b); c has 4s own time
+        a, b, c = ('m.py', 1, 'a'), ('m.py', 2, 'b'), ('m.py', 3, 'c')
+        stats = {
+            a: (1, 1, 0.0, 1.0, {}),
+            b: (1, 1, 0.0, 3.0, {}),
+            c: (2, 2, 4.0, 4.0, {a: (1, 1, 1.0, 1.0), b: (1, 1, 3.0, 3.0)}),
+        }
+        folded = folded_from_stats(stats)
+        self.assertEqual(folded['a (m.py:1);c (m.py:3)'], 1000000)
+        self.assertEqual(folded['b (m.py:2);c (m.py:3)'], 3000000)
+
+
+class TestSessionProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.keys_file = os.path.join(self.tmp, 'keys.txt')
+        self.proxy_file = os.path.join(self.tmp, 'proxies.txt')
+        with open(self.keys_file, 'w') as f:
+            f.write("0x" + "11" * 32 + "\n" + "0x" + "22" * 32 + "\n")
+        with open(self.proxy_file, 'w') as f:
+            f.write("127.0.0.1:8080@user:pass\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def session(self, **config):
+        session = TradingSession(dict(config, keys_file=self.keys_file, proxy_file=self.proxy_file,
+                                      enable_logs=False, launch_delay=(0, 0)))
+        self.addCleanup(os.remove, session.csv_file)
+        return session
+
+    def test_profiling_off_by_default(self):
+        self.assertIsNone(self.session().profiler)
+
+    def test_run_session_writes_reports_next_to_csv(self):
+        session = self.session(profile={'mode': 'sampling', 'interval': 0.001})
+        with patch.object(session.transaction_manager, 'execute_trade', return_value={'status': 'success'}):
+            session.run_session('parallel')
+        base = os.path.splitext(session.csv_file)[0]
+        for suffix in ('.folded', '.alloc.txt', '.threads.txt'):
+            self.assertTrue(os.path.exists(base + suffix))
+            self.addCleanup(os.remove, base + suffix)
+        self.assertEqual([phase for phase, _, _ in session.profiler.phases], ['start', 'parallel', 'stop'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import csv
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from crypto_trading_bot import TradingSession
+from test_utils import make_session
+from trade_result import TradeResult
+
+WALLETS = ['0x' + f"{index:02x}" * 32 for index in range(1, 11)]
+STAGES = ['plan', 'proxy', 'sign', 'submit', 'record']
+
+
+class TestStagedPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = make_session(self.tmp.name, WALLETS, ["127.0.0.1:8080@user:pass"],
+                                    trades_per_wallet=4, volume_percentage_range=(10, 50),
+                                    pipeline_queue_size=1, submit_concurrency=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _submit(self, delay=0.0, observed=None):
+        def submit_trade(prepared, proxy):
+            if observed is not None:
+                observed.append(self.session.pipeline.stats()['plan']['processed'] - len(observed))
+            time.sleep(delay)
+            return TradeResult.success(prepared.tx_id, time.time(), prepared.wallet_key, prepared.asset,
+                                       prepared.direction, prepared.size, prepared.signature)
+        return submit_trade
+
+    def test_every_leg_passes_every_stage(self):
+        plan = self.session.build_plan('parallel', seed=3)
+        with patch.object(self.session.transaction_manager, 'submit_trade', side_effect=self._submit()):
+            stats = self.session.execute_staged_plan(plan)
+        self.assertEqual(list(stats), STAGES)
+        for stage in STAGES:
+            self.assertEqual(stats[stage]['processed'], len(plan))
+            self.assertEqual(stats[stage]['queue_depth'], 0)
+        with open(self.session.csv_file) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), len(plan))
+        self.assertTrue(all(row['status'] == 'success' for row in rows))
+
+    def test_slow_submit_throttles_upstream_stages(self):
+        plan = self.session.build_plan('parallel', seed=5)
+        ahead = []
+        with patch.object(self.session.transaction_manager, 'submit_trade',
+                          side_effect=self._submit(0.01, ahead)):
+            stats = self.session.execute_staged_plan(plan)
+        # Legs planned but not yet submitted never exceed the queues and workers in between
+        self.assertLessEqual(max(ahead), 8)
+        self.assertGreater(stats['submit']['utilisation'], stats['plan']['utilisation'])
+
+    def test_rejected_leg_skips_submit_but_is_recorded(self):
+        plan = self.session.build_plan('branch', seed=2)
+        plan.size[0] = 20000
+        with patch.object(self.session.transaction_manager, 'submit_trade',
+                          side_effect=self._submit()) as submit_trade:
+            self.session.execute_staged_plan(plan)
+        self.assertEqual(submit_trade.call_count, len(plan) - 1)
+        with open(self.session.csv_file) as f:
+            statuses = [row['status'] for row in csv.DictReader(f)]
+        self.assertEqual(statuses.count('failed'), 1)
+
+
+    def test_leg_lost_in_a_failed_stage_is_recorded_and_released(self):
+        session = TradingSession(dict(self.session.config, balance_check=True, wallet_balance=1000,
+                                      results_dir=os.path.join(self.tmp.name, 'results')))
+        plan = session.build_plan('parallel', seed=3)
+        get_proxy = session.proxy_manager.get_proxy
+        calls = []
+
+        def flaky_get_proxy(account_id):
+            calls.append(account_id)
+            if len(calls) == 2:
+                raise ConnectionError("refresh_link unreachable")
+            return get_proxy(account_id)
+
+        with patch.object(session.proxy_manager, 'get_proxy', side_effect=flaky_get_proxy), \
+                patch.object(session.transaction_manager, 'submit_trade', side_effect=self._submit()):
+            stats = session.execute_staged_plan(plan)
+        self.assertEqual((stats['proxy']['failed'], stats['proxy']['dropped']), (1, 0))
+        with open(session.csv_file) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), len(plan))
+        failed = [row for row in rows if row['status'] == 'failed']
+        self.assertEqual(len(failed), 1)
+        self.assertIn('proxy stage failed', failed[0]['error'])
+        # The failed leg's reservation is back: each wallet is down only by its successful legs
+        for index, wallet in enumerate(WALLETS):
+            spent = sum(float(row['size']) for row in rows if row['wallet'] == wallet and row['status'] == 'success')
+            self.assertAlmostEqual(session.balance_cache.available(wallet), 1000 - spent)
+
+
+if __name__ == '__main__':
+    unittest.main()
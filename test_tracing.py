@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import tracing
+from tracing import NOOP_SPAN, OtlpJsonFileExporter, Tracer
+from trading_ui_automation import TradingPlatformUI, connect_to_main_trading_bot
+from test_data import TEST_WALLETS, TEST_PROXIES, TEST_CONFIGS
+from test_utils import setup_test_files, cleanup_test_files
+
+
+def read_spans(path):
+    spans = []
+    with open(path) as f:
+        for line in f:
+            for resource in json.loads(line)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    spans.extend(scope['spans'])
+    return spans
+
+
+class TracingTestCase(unittest.TestCase):
+    sample_rate = 1.0
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'traces.jsonl')
+        self.tracer = Tracer(OtlpJsonFileExporter(self.path, batch_size=1000), self.sample_rate)
+        self.previous = tracing.set_tracer(self.tracer)
+
+    def tearDown(self):
+        tracing.set_tracer(self.previous)
+        self.tmp.cleanup()
+
+    def spans(self):
+        self.tracer.flush()
+        return {span['name']: span for span in read_spans(self.path)} if os.path.exists(self.path) else {}
+
+
+class TestTracer(TracingTestCase):
+    def test_nested_spans_share_trace_and_link_parents(self):
+        with tracing.span('wallet', wallet=3):
+            with tracing.span('trade'):
+                with tracing.span('trade.sign'):
+                    pass
+        spans = self.spans()
+        self.assertEqual(len({span['traceId'] for span in spans.values()}), 1)
+        self.assertNotIn('parentSpanId', spans['wallet'])
+        self.assertEqual(spans['trade']['parentSpanId'], spans['wallet']['spanId'])
+        self.assertEqual(spans['trade.sign']['parentSpanId'], spans['trade']['spanId'])
+        self.assertEqual(spans['wallet']['attributes'], [{'key': 'wallet', 'value': {'intValue': '3'}}])
+        self.assertLessEqual(int(spans['wallet']['startTimeUnixNano']), int(spans['trade']['startTimeUnixNano']))
+
+    def test_exception_marks_span_as_error(self):
+        with self.assertRaises(ValueError):
+            with tracing.span('trade.submit'):
+                raise ValueError("rejected")
+        status = self.spans()['trade.submit']['status']
+        self.assertEqual(status, {'code': tracing.STATUS_ERROR, 'message': 'ValueError: rejected'})
+
+    def test_span_activated_in_another_thread_stays_the_parent(self):
+        trade = tracing.span('trade')
+
+        def stage():
+            with tracing.activate(trade):
+                tracing.traced('trade.record')(lambda: None)()
+
+        thread = threading.Thread(target=stage)
+        thread.start()
+        thread.join()
+        trade.end()
+        spans = self.spans()
+        self.assertEqual(spans['trade.record']['parentSpanId'], spans['trade']['spanId'])
+
+    def test_ui_steps_are_spans(self):
+        ui = TradingPlatformUI(headless=True)
+        ui.driver = MagicMock()
+        ui.wait_and_click = MagicMock(return_value=True)
+        ui.driver.find_elements.return_value = []
+        with tracing.span('ui.trading_sequence'):
+            ui.connect_wallet("0x1234")
+        spans = self.spans()
+        self.assertEqual(spans['ui.connect_wallet']['parentSpanId'], spans['ui.trading_sequence']['spanId'])
+
+
+class TestSampling(TracingTestCase):
+    sample_rate = 0.0
+
+    def test_unsampled_trace_exports_nothing(self):
+        with tracing.span('trade') as root:
+            self.assertIs(tracing.span('trade.sign'), NOOP_SPAN)
+        self.assertFalse(root.sampled)
+        self.assertEqual(self.spans(), {})
+
+    def test_ratio_is_applied_per_trace(self):
+        tracing.set_tracer(Tracer(self.tracer.exporter, 0.25))
+        for _ in range(2000):
+            with tracing.span('trade'):
+                with tracing.span('trade.submit'):
+                    pass
+        self.tracer.flush()
+        spans = read_spans(self.path)
+        roots = [span for span in spans if span['name'] == 'trade']
+        self.assertEqual(len(spans), 2 * len(roots))
+        self.assertTrue(350 < len(roots) < 650)
+
+    def test_disabled_tracer_hands_out_noop_spans(self):
+        self.assertIs(Tracer().start_span('trade'), NOOP_SPAN)
+
+
+class TestCombinedSessionTraces(TracingTestCase):
+    def setUp(self):
+        setup_test_files(TEST_WALLETS, TEST_PROXIES)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'traces.jsonl')
+        config = dict(TEST_CONFIGS["parallel_trading"], tracing={'path': self.path},
+                      results_dir=os.path.join(self.tmp.name, 'results'))
+        self.previous = tracing.get_tracer()
+        self.session = connect_to_main_trading_bot()(config)
+        self.tracer = self.session.tracer
+        self.session.transaction_manager = MagicMock()
+        self.session.transaction_manager.execute_trade.return_value = {'status': 'success'}
+
+    def tearDown(self):
+        super().tearDown()
+        cleanup_test_files()
+
+    @patch('trading_ui_automation.UITradingSession.execute_trading_sequence', return_value=True)
+    def test_backend_trade_is_a_child_of_the_wallet_span(self, mock_sequence):
+        self.session.execute_pipelined_trading()
+        self.tracer.flush()
+        spans = read_spans(self.path)
+        wallets = {span['spanId'] for span in spans if span['name'] == 'wallet'}
+        trades = [span for span in spans if span['name'] == 'trade']
+        self.assertEqual(len(wallets), len(TEST_WALLETS))
+        self.assertEqual(len(trades), len(TEST_WALLETS))
+        self.assertTrue(all(span['parentSpanId'] in wallets for span in trades))
+
+    @patch('trading_ui_automation.UITradingSession.execute_trading_sequence', return_value=True)
+    def test_session_tracer_is_installed_only_while_it_runs(self, mock_sequence):
+        self.assertIs(tracing.get_tracer(), self.previous)
+        seen = []
+        self.session.transaction_manager.execute_trade.side_effect = \
+            lambda *args: seen.append(tracing.get_tracer()) or {'status': 'success'}
+        with patch('tracing.atexit.register') as register:
+            self.session.execute_pipelined_trading()
+        self.assertIs(tracing.get_tracer(), self.previous)
+        self.assertEqual(seen, [self.tracer] * len(TEST_WALLETS))
+        register.assert_not_called()
+        # Flushed on the way out
+        self.assertEqual(len([span for span in read_spans(self.path) if span['name'] == 'trade']),
+                         len(TEST_WALLETS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+from trade_analytics import analyze, format_report, main
+from trade_history import TRADE_FIELDS
+
+
+def write_results(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=TRADE_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def row(wallet, asset, direction, size, status='success', branch='', error='', hour='16'):
+    return {'timestamp': f'2025-02-15T{hour}:15:02', 'wallet': wallet, 'asset': asset,
+            'direction': direction, 'size': size, 'status': status, 'transaction_hash': 'tx',
+            'error': error, 'branch': branch}
+
+
+class TestTradeAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.results_dir = tempfile.mkdtemp()
+        self.manifest = os.path.join(self.results_dir, '.analytics_manifest.json')
+        write_results(os.path.join(self.results_dir, 'trade_results_a.csv'), [
+            row('w1', 'BTC', 'long', 30, branch=0),
+            row('w2', 'BTC', 'short', 15, branch=0),
+            row('w3', 'BTC', 'short', 15, branch=0),
+            row('w1', 'ETH', 'long', 20000, status='failed', error='Insufficient balance', hour='17'),
+        ])
+        write_results(os.path.join(self.results_dir, 'trade_results_b.csv'), [
+            row('w2', 'ETH', 'long', 10),
+            row('w2', 'SOL', 'short', 5),
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.results_dir)
+
+    def test_group_by_aggregates(self):
+        """Success rate, branch balance, wallet volume and failures are aggregated across files"""
+        report = analyze(self.results_dir, self.manifest, chunk_size=2)
+        self.assertEqual(report['rows'], 6)
+        self.assertEqual(report['assets']['BTC'], [3, 3])
+        self.assertEqual(report['assets']['ETH'], [2, 1])
+        self.assertEqual(report['branches']['trade_results_a#0'], [1, 2, 30.0, 30.0])
+        self.assertEqual(report['wallets']['w2'], [3, 30.0])
+        self.assertEqual(report['failures'], {'2025-02-15T17': {'Insufficient balance': 1}})
+        self.assertIn('Success rate per asset', format_report(report))
+
+    def test_rerun_parses_only_changed_files(self):
+        """The manifest lets a rerun skip unchanged files"""
+        self.assertEqual(analyze(self.results_dir, self.manifest)['parsed_files'], 2)
+        self.assertEqual(analyze(self.results_dir, self.manifest)['parsed_files'], 0)
+
+        with open(os.path.join(self.results_dir, 'trade_results_b.csv'), 'a', newline='') as f:
+            csv.DictWriter(f, fieldnames=TRADE_FIELDS).writerow(row('w4', 'SOL', 'long', 1))
+        report = analyze(self.results_dir, self.manifest)
+        self.assertEqual(report['parsed_files'], 1)
+        self.assertEqual(report['rows'], 7)
+
+    def test_parallel_matches_serial(self):
+        """Parsing files in worker processes gives the same report"""
+        serial = analyze(self.results_dir, None)
+        parallel = analyze(self.results_dir, None, workers=2)
+        self.assertEqual(serial, parallel)
+
+    def test_old_files_without_branch_column(self):
+        """Result files written before the branch column existed still parse"""
+        with open(os.path.join(self.results_dir, 'trade_results_old.csv'), 'w', newline='') as f:
+            f.write("timestamp,wallet,asset,direction,size,status,transaction_hash,error\n")
+            f.write("2025-02-15T11:58:03,w9,SOL,long,12.5,success,tx_1,\n")
+        report = analyze(self.results_dir, None)
+        self.assertEqual(report['wallets']['w9'], [1, 12.5])
+
+    def test_cli_runs(self):
+        main(['--results-dir', self.results_dir, '--no-cache', '--json'])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import AsyncMock
+
+from websockets.sync.client import connect
+
+from trade_feed import FeedClient, TradeFeed
+from wallet_addresses import wallet_address
+from test_data import TEST_WALLETS
+
+
+def trade(wallet, asset, n=0):
+    return {'timestamp': '2025-02-15T16:00:00', 'wallet': wallet, 'asset': asset, 'direction': 'long',
+            'size': n, 'status': 'success', 'transaction_hash': f'tx_{n}', 'error': ''}
+
+
+class TestTradeFeed(unittest.TestCase):
+    def setUp(self):
+        self.feed = TradeFeed(port=0, flush_interval=0.01, max_queue=4, max_dropped=50).start_in_thread()
+        self.url = f"ws://127.0.0.1:{self.feed.port}"
+
+    def tearDown(self):
+        self.feed.stop()
+
+    def _subscribe(self, websocket, **filters):
+        websocket.send(json.dumps(dict(filters, action='subscribe')))
+        self.assertEqual(json.loads(websocket.recv(timeout=5))['type'], 'subscribed')
+
+    def test_asset_subscription(self):
+        """A client subscribed to an asset only receives that asset's trades"""
+        with connect(self.url) as websocket:
+            self._subscribe(websocket, assets=['ETH'])
+            self.feed.publish(trade('0xaaa', 'BTC', 1))
+            self.feed.publish(trade('0xbbb', 'ETH', 2))
+            message = json.loads(websocket.recv(timeout=5))
+            self.assertEqual([t['transaction_hash'] for t in message['trades']], ['tx_2'])
+
+    def test_wallet_subscription_uses_addresses(self):
+        """Private keys are sent as addresses and can be filtered by address"""
+        private_key = TEST_WALLETS[0]["private_key"]
+        address = wallet_address(private_key)
+        with connect(self.url) as websocket:
+            self._subscribe(websocket, wallets=[address])
+            self.feed.publish(trade(TEST_WALLETS[1]["private_key"], 'BTC', 1))
+            self.feed.publish(trade(private_key, 'BTC', 2))
+            message = json.loads(websocket.recv(timeout=5))
+            self.assertEqual(message['trades'][0]['wallet'], address)
+            self.assertNotIn(private_key, json.dumps(message))
+
+    def test_bursts_are_coalesced(self):
+        """Many trades published at once arrive as one batch"""
+        with connect(self.url) as websocket:
+            self._subscribe(websocket)
+            for n in range(100):
+                self.feed.publish(trade('0xaaa', 'SOL', n))
+            message = json.loads(websocket.recv(timeout=5))
+            self.assertEqual(len(message['trades']), 100)
+
+    def test_slow_client_is_sampled_then_dropped(self):
+        """A client that never drains its queue loses old batches, then the connection"""
+        async def run():
+            feed = TradeFeed(max_queue=2, max_dropped=3)
+            client = FeedClient(AsyncMock(), feed.max_queue)
+            client.subscribed = True
+            feed.clients.add(client)
+            for n in range(4):
+                feed.publish(trade('0xaaa', 'BTC', n))
+                feed._flush()
+            self.assertEqual(client.dropped, 2)
+            self.assertEqual([batch[0]['size'] for batch in client.queue._queue], [2, 3])
+
+            feed.publish(trade('0xaaa', 'BTC', 4))
+            feed._flush()
+            await asyncio.sleep(0)
+            self.assertNotIn(client, feed.clients)
+            self.assertEqual(feed.disconnected_slow, 1)
+            client.connection.close.assert_awaited_once()
+
+        asyncio.run(run())
+
+    def test_client_that_keeps_catching_up_stays_connected(self):
+        """Only drops since the last completed send count towards the disconnect"""
+        async def run():
+            feed = TradeFeed(max_queue=1, max_dropped=3)
+            client = FeedClient(AsyncMock(), feed.max_queue)
+            client.subscribed = True
+            feed.clients.add(client)
+            sender = asyncio.ensure_future(feed._send_loop(client))
+            for burst in range(3):
+                for n in range(3):
+                    feed.publish(trade('0xaaa', 'BTC', n))
+                    feed._flush()
+                for _ in range(3):
+                    await asyncio.sleep(0)
+            sender.cancel()
+
+            self.assertIn(client, feed.clients)
+            self.assertEqual((client.dropped, client.dropped_since_send, feed.disconnected_slow), (6, 0, 0))
+            sent = [json.loads(call.args[0]) for call in client.connection.send.await_args_list]
+            self.assertEqual([message['dropped'] for message in sent], [2, 2, 2])
+
+        asyncio.run(run())
+
+    def test_pending_rows_are_capped_before_the_feed_serves(self):
+        feed = TradeFeed(max_pending=5)
+        for n in range(8):
+            feed.publish(trade('0xaaa', 'BTC', n))
+        self.assertEqual([row['size'] for row in feed._pending], [3, 4, 5, 6, 7])
+        self.assertEqual((feed.published, feed.pending_dropped), (8, 3))
+
+    def test_publish_is_cheap(self):
+        """Publishing on the trade path costs microseconds per trade"""
+        with connect(self.url) as websocket:
+            self._subscribe(websocket)
+            started = time.perf_counter()
+            for n in range(10000):
+                self.feed.publish(trade('0xaaa', 'BTC', n))
+            self.assertLess(time.perf_counter() - started, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
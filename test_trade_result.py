@@ -0,0 +1,73 @@
+import json
+import time
+import tracemalloc
+import unittest
+
+from crypto_trading_bot import TransactionManager
+from trade_history import TRADE_FIELDS
+from trade_result import TradeDirection, TradeResult, TradeStatus
+
+WALLET = "0x" + "ab" * 32
+
+
+class TestTradeResult(unittest.TestCase):
+    def test_success_reads_like_legacy_dict(self):
+        result = TradeResult.success('tx_1', time.time(), WALLET, 'BTC', 'long', 25.0, 'sig')
+        self.assertIs(result.status, TradeStatus.SUCCESS)
+        self.assertIs(result.direction, TradeDirection.LONG)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['transaction_hash'], 'tx_1')
+        self.assertIn('details', result)
+        self.assertNotIn('error', result)
+        self.assertEqual(result['details'], {
+            'asset': 'BTC', 'direction': 'long', 'size': 25.0, 'wallet': WALLET[:10] + '...'
+        })
+        self.assertIsNone(result.get('error'))
+        self.assertEqual(set(result.to_dict()),
+                         {'status', 'transaction_hash', 'signature', 'timestamp', 'details'})
+        # JSON encodes the enums as their values
+        self.assertEqual(json.loads(json.dumps(result.to_dict()))['status'], 'success')
+
+    def test_failed_shape(self):
+        result = TradeResult.failed('Insufficient balance', time.time(), 'tx_2')
+        self.assertEqual(result.to_dict()['tx_id'], 'tx_2')
+        self.assertNotIn('details', result)
+        with self.assertRaises(KeyError):
+            result['details']
+        self.assertNotIn('tx_id', TradeResult.failed('boom', time.time()))
+
+    def test_csv_row(self):
+        result = TradeResult.success('tx_1', 1739636102.0, WALLET, 'ETH', 'short', 3.5, 'sig')
+        row = result.to_csv_row(WALLET, branch=2)
+        self.assertTrue(set(row) <= set(TRADE_FIELDS))
+        self.assertEqual((row['status'], row['direction'], row['branch']), ('success', 'short', 2))
+        self.assertEqual(type(row['status']), str)
+        failed = TradeResult.failed('Insufficient balance', 1739636102.0, 'tx_2').to_csv_row('')
+        self.assertEqual((failed['wallet'], failed['transaction_hash'], failed['error']),
+                         ('unknown', '', 'Insufficient balance'))
+
+    def test_execute_trade_returns_trade_result(self):
+        result = TransactionManager().execute_trade(WALLET, 'BTC', 'long', 20000, {})
+        self.assertIsInstance(result, TradeResult)
+        self.assertEqual(result['status'], 'failed')
+        self.assertTrue(result['tx_id'].startswith('tx_'))
+
+    def test_smaller_than_nested_dicts(self):
+        def build(factory):
+            tracemalloc.start()
+            kept = [factory(index) for index in range(2000)]
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return kept, size
+
+        _, slots = build(lambda i: TradeResult.success(f'tx_{i}', time.time(), WALLET, 'BTC', 'long', 1.0, 'sig'))
+        _, dicts = build(lambda i: {
+            'status': 'success', 'transaction_hash': f'tx_{i}', 'signature': 'sig',
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'details': {'asset': 'BTC', 'direction': 'long', 'size': 1.0, 'wallet': WALLET[:10] + '...'}
+        })
+        self.assertLess(slots, dicts / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from crypto_trading_bot import TransactionManager
+from tx_ids import (EPOCH_MS, MAX_SLOTS, SEQUENCE_MASK, SHARED_SLOT, TxIdGenerator, claim_node_id,
+                    node_id_from_config, parse_tx_id)
+
+
+class FakeClock:
+    def __init__(self, now=EPOCH_MS + 1000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTxIdGenerator(unittest.TestCase):
+    def test_fields_round_trip(self):
+        clock = FakeClock(EPOCH_MS + 123456)
+        generator = TxIdGenerator(node_id=42, clock=clock)
+        fields = parse_tx_id(generator.next_tx_id())
+        self.assertEqual(fields['timestamp_ms'], EPOCH_MS + 123456)
+        self.assertEqual(fields['node_id'], 42)
+        self.assertEqual(fields['sequence'], 0)
+        self.assertEqual(parse_tx_id(generator.next_tx_id())['sequence'], 1)
+
+    def test_unique_across_threads(self):
+        generator = TxIdGenerator(node_id=1)
+        per_thread = []
+
+        def generate():
+            ids = [generator.next_id() for _ in range(5000)]
+            per_thread.append(ids)
+
+        threads = [threading.Thread(target=generate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        all_ids = [value for ids in per_thread for value in ids]
+        self.assertEqual(len(set(all_ids)), 8 * 5000)
+        for ids in per_thread:
+            self.assertEqual(ids, sorted(ids))
+
+    def test_sequence_overflow_borrows_next_millisecond(self):
+        clock = FakeClock()
+        generator = TxIdGenerator(node_id=3, clock=clock)
+        ids = [generator.next_id() for _ in range(SEQUENCE_MASK + 2)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(parse_tx_id(hex(ids[-1]))['timestamp_ms'], clock.now + 1)
+
+    def test_clock_going_backwards_stays_monotonic(self):
+        clock = FakeClock()
+        generator = TxIdGenerator(node_id=3, clock=clock)
+        first = generator.next_id()
+        clock.now -= 5000
+        self.assertGreater(generator.next_id(), first)
+
+    def test_string_ids_sort_numerically(self):
+        clock = FakeClock()
+        generator = TxIdGenerator(node_id=0, clock=clock)
+        ids = []
+        for step in (1, 10, 1000, 100000):
+            clock.now += step
+            ids.append(generator.next_tx_id())
+        self.assertEqual(ids, sorted(ids))
+
+    def test_released_slot_continues_after_previous_owner(self):
+        clock = FakeClock()
+        generator = TxIdGenerator(node_id=5, clock=clock)
+        seen = []
+        for _ in range(MAX_SLOTS + 4):
+            thread = threading.Thread(target=lambda: seen.append(generator.next_id()))
+            thread.start()
+            thread.join()
+        self.assertEqual(len(set(seen)), len(seen))
+
+    def test_threads_beyond_the_slots_share_one(self):
+        generator = TxIdGenerator(node_id=6)
+        thread_count = MAX_SLOTS + 16
+        barrier = threading.Barrier(thread_count)
+        per_thread = []
+
+        def generate():
+            # Every thread holds its slot until all of them have one
+            generator.next_id()
+            barrier.wait()
+            per_thread.append([generator.next_id() for _ in range(500)])
+
+        threads = [threading.Thread(target=generate) for _ in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        all_ids = [value for ids in per_thread for value in ids]
+        self.assertEqual(len(set(all_ids)), thread_count * 500)
+        slots = {parse_tx_id(hex(value))['slot'] for value in all_ids}
+        self.assertEqual(slots, set(range(MAX_SLOTS)))
+        for ids in per_thread:
+            self.assertEqual(ids, sorted(ids))
+
+    def test_derived_node_ids_are_claimed_once_per_host(self):
+        with tempfile.TemporaryDirectory() as lock_dir:
+            generators = [TxIdGenerator(node_lock_dir=lock_dir) for _ in range(5)]
+            nodes = {generator.node_id for generator in generators}
+            self.assertEqual(len(nodes), 5)
+            for generator in generators:
+                self.assertEqual(parse_tx_id(generator.next_tx_id())['node_id'], generator.node_id)
+            # Freed when the generator goes away
+            released = generators.pop().node_id
+            del generator
+            fds = [claim_node_id(lock_dir) for _ in range(252)]
+            self.assertIn(released, {node_id for node_id, _ in fds})
+            with self.assertRaises(RuntimeError):
+                claim_node_id(lock_dir)
+            for _, fd in fds:
+                os.close(fd)
+
+    def test_invalid_node_id(self):
+        with self.assertRaises(ValueError):
+            TxIdGenerator(node_id=256)
+
+    def test_node_id_from_config(self):
+        self.assertEqual(node_id_from_config({'tx_node_id': 7}), 7)
+        with patch.dict('os.environ', {'TX_NODE_ID': '9'}):
+            self.assertEqual(node_id_from_config({}), 9)
+        with patch.dict('os.environ', {}, clear=True):
+            self.assertIsNone(node_id_from_config({}))
+
+    def test_execute_trade_uses_generator(self):
+        manager = TransactionManager(TxIdGenerator(node_id=17))
+        result = manager.execute_trade("0x" + "11" * 32, "BTC", "long", 20000, {})
+        self.assertEqual(parse_tx_id(result['tx_id'])['node_id'], 17)
+
+
+if __name__ == '__main__':
+    unittest.main()
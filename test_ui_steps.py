@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import MagicMock
+
+from selenium.webdriver.common.by import By
+
+from trading_ui_automation import TradingPlatformUI
+from ui_steps import compile_locators, selenium_locator
+
+
+class TestCompiledLocators(unittest.TestCase):
+    def test_selectors_are_flattened(self):
+        """Nested selectors get dotted keys and a detected strategy"""
+        locators = compile_locators(TradingPlatformUI.SELECTORS)
+        self.assertEqual(locators['position_type.long'], ('css', '#long-position-btn'))
+        self.assertEqual(locators['connect_wallet'][0], 'xpath')
+        self.assertEqual(locators['volume_input'], ('css', 'input[name="trade-volume"]'))
+
+    def test_selenium_locator(self):
+        """XPath selectors are no longer passed to Selenium as CSS"""
+        self.assertEqual(selenium_locator('//button')[0], By.XPATH)
+        self.assertEqual(selenium_locator('#confirm-trade-btn')[0], By.CSS_SELECTOR)
+
+
+class TestCompiledTradeStep(unittest.TestCase):
+    def setUp(self):
+        self.ui = TradingPlatformUI(headless=True)
+        self.ui.driver = MagicMock()
+        self.ui.wait = MagicMock()
+
+    def test_trade_is_one_round_trip(self):
+        """Direction, leverage, volume and confirm run in a single script call"""
+        self.ui.driver.execute_async_script.return_value = {
+            'ok': True, 'completed': ['position_type.long', 'leverage_slider', 'volume_input', 'confirm_trade'],
+            'skipped': ['approve_usdc'], 'stopped_at': None
+        }
+        self.assertTrue(self.ui.execute_trade("long", 1000, leverage=3))
+        self.assertEqual(self.ui.driver.execute_async_script.call_count, 1)
+        self.ui.driver.find_element.assert_not_called()
+
+        spec = self.ui.driver.execute_async_script.call_args.args[1]
+        keys = [action['key'] for action in spec['actions']]
+        self.assertEqual(keys[0], 'position_type.long')
+        self.assertEqual(keys[-1], 'confirm_trade')
+        self.assertIn({'key': 'leverage_slider', 'op': 'set', 'value': 3}, spec['actions'])
+
+    def test_approval_waits_then_confirms(self):
+        """When approval is needed the confirm runs after the approval wait"""
+        self.ui.driver.execute_async_script.side_effect = [
+            {'ok': True, 'completed': ['approve_usdc'], 'stopped_at': 'approve_usdc'},
+            {'ok': True, 'completed': ['confirm_trade'], 'stopped_at': None}
+        ]
+        self.assertTrue(self.ui.execute_trade("short", 250))
+        self.assertEqual(self.ui.driver.execute_async_script.call_count, 2)
+        self.ui.wait.until.assert_called_once()
+
+    def test_failed_step_reports_false(self):
+        """A missing required element fails the trade"""
+        self.ui.driver.execute_async_script.return_value = {
+            'ok': False, 'failed': 'confirm_trade', 'error': 'timeout', 'completed': []
+        }
+        self.assertFalse(self.ui.execute_trade("long", 1000))
+
+    def test_select_asset_by_option_text(self):
+        """Asset selection is a single select_text action"""
+        self.ui.driver.execute_async_script.return_value = {'ok': True, 'completed': ['asset_dropdown']}
+        self.assertTrue(self.ui.select_asset("ETH"))
+        spec = self.ui.driver.execute_async_script.call_args.args[1]
+        self.assertEqual(spec['actions'], [{'key': 'asset_dropdown', 'op': 'select_text', 'value': 'ETH'}])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import time
+
+from trading_ui_automation import TradingPlatformUI, UITradingSession
+
+
+class TestUIWaits(unittest.TestCase):
+    def setUp(self):
+        self.ui = TradingPlatformUI(headless=True)
+        self.ui.driver = MagicMock()
+        self.ui.wait = MagicMock()
+        self.ui.wait_and_click = MagicMock(return_value=True)
+        self.ui.driver.execute_async_script.return_value = {'ok': True, 'completed': [], 'stopped_at': None}
+
+    def test_optional_probe_does_not_block(self):
+        """Missing approve button is detected without waiting for a timeout"""
+        self.ui.driver.find_elements.return_value = []
+        started = time.perf_counter()
+        self.assertFalse(self.ui.click_if_present(TradingPlatformUI.SELECTORS['approve_usdc']))
+        self.assertLess(time.perf_counter() - started, 0.1)
+
+    def test_optional_probe_clicks_visible_element(self):
+        """Present approve button is clicked"""
+        element = MagicMock()
+        self.ui.driver.find_elements.return_value = [element]
+        self.assertTrue(self.ui.click_if_present(TradingPlatformUI.SELECTORS['approve_usdc']))
+        element.click.assert_called_once()
+
+    @patch.object(time, 'sleep')
+    def test_steps_use_condition_waits(self, mock_sleep):
+        """UI steps wait on page conditions and never sleep"""
+        self.ui.driver.find_elements.return_value = []
+        self.assertTrue(self.ui.connect_wallet("0x1234"))
+        self.assertTrue(self.ui.make_deposit())
+        self.assertTrue(self.ui.execute_trade("long", 1000))
+        mock_sleep.assert_not_called()
+
+    def test_connect_wallet_hands_the_address_to_the_page(self):
+        """The page's connect handler reads the wallet from window.walletAddress"""
+        self.assertTrue(self.ui.connect_wallet("0x1234"))
+        self.ui.driver.execute_script.assert_any_call("window.walletAddress = arguments[0];", "0x1234")
+
+    def test_step_timings_reported(self):
+        """Each timed step shows up in the timing report"""
+        self.ui.driver.find_elements.return_value = []
+        self.ui.connect_wallet("0x1234")
+        self.ui.execute_trade("short", 500)
+        timings = self.ui.report_step_timings()
+        self.assertIn('connect_wallet', timings)
+        self.assertIn('execute_trade', timings)
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
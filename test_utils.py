@@ -1,7 +1,9 @@
 """Utility functions for testing"""
 
 import os
-from typing import List, Dict
+from typing import Any, List, Dict
+
+from crypto_trading_bot import TradingSession
 
 def setup_test_files(wallets: List[Dict], proxies: List[str]):
     """Create test wallet and proxy files"""
@@ -15,6 +17,23 @@ def setup_test_files(wallets: List[Dict], proxies: List[str]):
         for proxy in proxies:
             f.write(f"{proxy}\n")
 
+def session_config(directory: str, wallets: List[str], proxies: List[str], **config) -> Dict[str, Any]:
+    """Write keys.txt and proxies.txt into directory and return a quiet, undelayed session config for them"""
+    keys_file = os.path.join(directory, 'keys.txt')
+    proxy_file = os.path.join(directory, 'proxies.txt')
+    with open(keys_file, 'w') as f:
+        f.write("\n".join(wallets) + "\n")
+    with open(proxy_file, 'w') as f:
+        f.write("\n".join(proxies) + "\n")
+    return dict({
+        'keys_file': keys_file, 'proxy_file': proxy_file, 'enable_logs': False,
+        'results_dir': os.path.join(directory, 'results'), 'launch_delay': (0, 0)
+    }, **config)
+
+def make_session(directory: str, wallets: List[str], proxies: List[str], **config) -> TradingSession:
+    """TradingSession on wallet and proxy files written to directory, see session_config"""
+    return TradingSession(session_config(directory, wallets, proxies, **config))
+
 def cleanup_test_files():
     """Remove test files"""
     files_to_remove = ["test_wallet_keys.txt", "test_proxies.txt"]
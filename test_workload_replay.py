@@ -0,0 +1,106 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from crypto_trading_bot import TradingSession
+from test_utils import make_session
+from trade_history import TRADE_FIELDS
+from workload_replay import (StubBackend, WorkloadRecorder, load_csv_workload, load_journal,
+                             load_workload, replay, wallet_label, workload_stats)
+
+WALLETS = ['0x' + f"{index:02x}" * 32 for index in range(1, 4)]
+ROWS = [
+    ('2025-02-15T12:00:00', WALLETS[0], 'BTC', 'long', '20.5', 'success', ''),
+    ('2025-02-15T12:00:01', WALLETS[1], 'ETH', 'short', '10', 'success', '0'),
+    ('2025-02-15T12:00:01.500000', WALLETS[0], '', '', '', 'failed', ''),
+    ('2025-02-15T12:30:00', WALLETS[2], 'SOL', 'long', '15', 'success', '1'),
+]
+
+
+class WorkloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp.name, 'trade_results_20250215_120000.csv')
+        with open(self.csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=TRADE_FIELDS)
+            writer.writeheader()
+            for timestamp, wallet, asset, direction, size, status, branch in ROWS:
+                writer.writerow({'timestamp': timestamp, 'wallet': wallet, 'asset': asset,
+                                 'direction': direction, 'size': size, 'status': status, 'branch': branch})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def session(self) -> TradingSession:
+        session = make_session(self.tmp.name, WALLETS[:2], ["127.0.0.1:8080@user:pass"],
+                               results_dir=os.path.join(self.tmp.name, 'replay'))
+        session.transaction_manager = StubBackend()
+        return session
+
+
+class TestLoadWorkload(WorkloadTestCase):
+    def test_csv_rows_become_arrivals_with_capped_gaps(self):
+        arrivals = load_csv_workload([self.csv_path], max_gap=5)
+        self.assertEqual([arrival.offset for arrival in arrivals], [0.0, 1.0, 6.0])
+        self.assertEqual([arrival.asset for arrival in arrivals], ['BTC', 'ETH', 'SOL'])
+        self.assertEqual(arrivals[1].branch, 0)
+        self.assertIsNone(arrivals[0].branch)
+        self.assertEqual(arrivals[0].wallet, wallet_label(WALLETS[0]))
+        self.assertNotIn(WALLETS[0][2:], arrivals[0].wallet)
+
+    def test_directory_source_and_stats(self):
+        arrivals = load_workload([self.tmp.name], max_gap=None)
+        stats = workload_stats(arrivals)
+        self.assertEqual(stats['trades'], 3)
+        self.assertEqual(stats['duration'], 1800.0)
+        self.assertEqual(stats['assets'], {'BTC': 1, 'ETH': 1, 'SOL': 1})
+        self.assertEqual(stats['directions'], {'long': 2, 'short': 1})
+        self.assertNotIn('latency_p50', stats)
+
+
+class TestRecordAndReplay(WorkloadTestCase):
+    def test_recorded_journal_replays_with_latency(self):
+        session = self.session()
+        journal = os.path.join(self.tmp.name, 'workload.jsonl')
+        recorder = WorkloadRecorder(journal).attach(session)
+        session._process_wallet_with_size(WALLETS[0], 'long', 12.0, 'BTC', wallet_index=0)
+        session._process_wallet_with_size(WALLETS[1], 'short', 8.0, 'ETH', branch=1, wallet_index=1)
+        recorder.close()
+
+        arrivals = load_journal(journal)
+        self.assertEqual([(a.asset, a.direction, a.size) for a in arrivals],
+                         [('BTC', 'long', 12.0), ('ETH', 'short', 8.0)])
+        self.assertTrue(all(arrival.latency is not None for arrival in arrivals))
+        self.assertIn('latency_p99', workload_stats(arrivals))
+
+    def test_replay_at_max_speed_reports_drift(self):
+        arrivals = load_csv_workload([self.csv_path])
+        report = replay(self.session(), arrivals, speed=float('inf'), concurrency=2)
+        self.assertEqual(report['replay']['trades'], 3)
+        self.assertEqual(report['replay']['errors'], 0)
+        self.assertEqual(report['replay']['statuses'], {'success': 3})
+        self.assertEqual(report['replay']['speed'], 'max')
+        self.assertNotIn('throughput', report['drift'])
+
+    def test_replay_latency_is_the_backend_request_time(self):
+        session = self.session()
+        session.transaction_manager = StubBackend(latency=0.05)
+        arrivals = load_csv_workload([self.csv_path])
+        report = replay(session, arrivals, speed=float('inf'), concurrency=2)['replay']
+        self.assertGreaterEqual(report['latency_p50'], 0.05)
+        self.assertGreaterEqual(report['call_latency_p50'], report['latency_p50'])
+        self.assertEqual(session.transaction_manager.submit_listeners, [])
+
+    def test_timed_replay_keeps_the_schedule(self):
+        arrivals = load_csv_workload([self.csv_path], max_gap=1)
+        report = replay(self.session(), arrivals, speed=10, concurrency=2)
+        # Two one-second gaps compressed tenfold
+        self.assertGreaterEqual(report['replay']['duration'], 0.2)
+        self.assertLess(report['replay']['lag_max'], 0.5)
+        self.assertIn('duration', report['drift'])
+        self.assertIn('throughput', report['drift'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,301 @@
+import atexit
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+# OTLP span kind and status codes
+SPAN_KIND_INTERNAL = 1
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+# Ids come from a private generator so tracing never shifts seeded random sequences
+_ids = random.Random(os.urandom(16))
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class _NoopSpan:
+    """Stands in for every span of an unsampled trace or a disabled tracer"""
+
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed operation; use as a context manager or call end()
+
+    Entering the span makes it the current span of this thread (or task),
+    so spans started inside it become its children. An unsampled root is a
+    Span with sampled False: it only carries the decision down to its
+    children, which are all NOOP_SPAN.
+    """
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'sampled',
+                 'start_ns', 'end_ns', 'attributes', 'error', '_token')
+
+    def __init__(self, tracer: 'Tracer', name: str, trace_id: int, parent_id: Optional[int],
+                 sampled: bool, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _ids.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            self.tracer.exporter.export(self)
+
+    def __enter__(self) -> 'Span':
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_error(exc)
+        _current.reset(self._token)
+        self.end()
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': f"{self.trace_id:032x}",
+            'spanId': f"{self.span_id:016x}",
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK}
+        }
+        if self.parent_id is not None:
+            span['parentSpanId'] = f"{self.parent_id:016x}"
+        return span
+
+
+class OtlpJsonFileExporter:
+    """Appends finished spans to a file in the OTLP/JSON trace format
+
+    Each line is one ExportTraceServiceRequest holding up to batch_size
+    spans, the layout the OpenTelemetry Collector's file exporter writes,
+    so the file can be fed to an otlpjsonfile receiver or loaded by Jaeger
+    and similar tools.
+    """
+
+    def __init__(self, path: str, service_name: str = 'variational-tp', batch_size: int = 256):
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.exported = 0
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) >= self.batch_size:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if not self._buffer:
+            return
+        request = {'resourceSpans': [{
+            'resource': {'attributes': [_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [span.to_otlp() for span in self._buffer]
+            }]
+        }]}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(request, separators=(',', ':')) + "\n")
+        self.exported += len(self._buffer)
+        self._buffer = []
+
+
+class Tracer:
+    """Creates spans with parent/child links and head sampling
+
+    The sampling decision is made once per trace from its id (the same
+    ratio rule as OpenTelemetry's TraceIdRatioBased sampler) and inherited
+    by every child, so an unsampled trade costs a context variable lookup
+    per span. Without an exporter every span is NOOP_SPAN.
+    """
+
+    def __init__(self, exporter: Optional[OtlpJsonFileExporter] = None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._threshold = int(max(0.0, min(1.0, sample_rate)) * (1 << 64))
+
+    @classmethod
+    def from_config(cls, config: Dict, csv_path: str) -> Optional['Tracer']:
+        """config['tracing'] is a sample rate, a file path or a dict (path, sample_rate, batch_size)
+
+        The default file is the trade_results CSV path with .traces.jsonl.
+        """
+        settings = config.get('tracing')
+        if not settings:
+            return None
+        if isinstance(settings, bool):
+            settings = {}
+        elif isinstance(settings, (int, float)):
+            settings = {'sample_rate': settings}
+        elif isinstance(settings, str):
+            settings = {'path': settings}
+        path = settings.get('path') or os.path.splitext(csv_path)[0] + '.traces.jsonl'
+        exporter = OtlpJsonFileExporter(path, settings.get('service_name', 'variational-tp'),
+                                        settings.get('batch_size', 256))
+        return cls(exporter, settings.get('sample_rate', 1.0))
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, parent: Union[Span, _NoopSpan, None] = None,
+                   **attributes: Any) -> Union[Span, _NoopSpan]:
+        """New span under parent (default: the current span); the caller ends it"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current.get()
+        if parent is not None:
+            if not parent.sampled:
+                return NOOP_SPAN
+            return Span(self, name, parent.trace_id, parent.span_id, True, attributes)
+        trace_id = _ids.getrandbits(128) or 1
+        sampled = (trace_id & ((1 << 64) - 1)) < self._threshold
+        return Span(self, name, trace_id, None, sampled, attributes if sampled else {})
+
+    def flush(self):
+        """Write out buffered spans"""
+        if self.exporter:
+            self.exporter.flush()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Tracer:
+    """Install tracer as the process-wide tracer (None disables tracing); returns the old one
+
+    The old tracer is flushed; whichever tracer is installed at exit is
+    flushed then.
+    """
+    global _tracer
+    previous = _tracer
+    _tracer = tracer or Tracer()
+    if previous is not _tracer:
+        previous.flush()
+    return previous
+
+
+@contextmanager
+def use_tracer(tracer: Optional[Tracer]) -> Iterator[Tracer]:
+    """Make tracer the process-wide tracer inside the block, then flush it and put back the previous one
+
+    With tracer None the process-wide tracer is left as it is.
+    """
+    if tracer is None:
+        yield _tracer
+        return
+    previous = set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        set_tracer(previous)
+        tracer.flush()
+
+
+def current_span() -> Union[Span, _NoopSpan, None]:
+    return _current.get()
+
+
+def span(name: str, parent: Union[Span, _NoopSpan, None] = None, **attributes: Any) -> Union[Span, _NoopSpan]:
+    """Span from the process-wide tracer, e.g. ``with tracing.span('trade.proxy'):``"""
+    return _tracer.start_span(name, parent, **attributes)
+
+
+@contextmanager
+def activate(active: Union[Span, _NoopSpan, None]) -> Iterator[None]:
+    """Make a span started elsewhere (e.g. in another pipeline stage) current, without ending it"""
+    if active is None:
+        yield
+        return
+    token = _current.set(active)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def traced(name: str) -> Callable:
+    """Run the decorated function inside a span called name"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _tracer.start_span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def flush():
+    """Write out spans still buffered by the process-wide tracer"""
+    _tracer.flush()
+
+
+atexit.register(flush)
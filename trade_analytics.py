@@ -0,0 +1,236 @@
+import argparse
+import csv
+import json
+import logging
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_MANIFEST = os.path.join('trade_results', '.analytics_manifest.json')
+MANIFEST_VERSION = 1
+
+
+def iter_chunks(path: str, chunk_size: int = 10000) -> Iterator[Dict[str, List[str]]]:
+    """Stream a results CSV as column-oriented chunks of at most chunk_size rows"""
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        columns: Dict[str, List[str]] = {name: [] for name in header}
+        lists = [columns[name] for name in header]
+        width = len(header)
+        rows = 0
+        for values in reader:
+            if not values:
+                continue
+            if len(values) < width:
+                values = values + [''] * (width - len(values))
+            for column, value in zip(lists, values):
+                column.append(value)
+            rows += 1
+            if rows == chunk_size:
+                yield columns
+                columns = {name: [] for name in header}
+                lists = [columns[name] for name in header]
+                rows = 0
+        if rows:
+            yield columns
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def summarize_file(path: str, chunk_size: int = 10000) -> Dict[str, Any]:
+    """Per-file aggregates that can be merged across files
+
+    Each chunk is aggregated column-wise: the grouping column is zipped with
+    the value columns and counted in one pass, rather than row dicts being
+    built and dispatched one at a time.
+    """
+    run = os.path.splitext(os.path.basename(path))[0]
+    trades: Counter = Counter()
+    successes: Counter = Counter()
+    wallet_trades: Counter = Counter()
+    wallet_volume: Dict[str, float] = defaultdict(float)
+    branch_legs: Dict[str, List[float]] = defaultdict(lambda: [0, 0, 0.0, 0.0])
+    failures: Dict[str, Counter] = defaultdict(Counter)
+    rows = 0
+
+    for chunk in iter_chunks(path, chunk_size):
+        assets = chunk.get('asset', [])
+        statuses = chunk.get('status', [])
+        wallets = chunk.get('wallet', [])
+        directions = chunk.get('direction', [])
+        sizes = [_to_float(size) for size in chunk.get('size', [])]
+        count = len(statuses)
+        rows += count
+
+        trades.update(assets)
+        successes.update(asset for asset, status in zip(assets, statuses) if status == 'success')
+        wallet_trades.update(wallets)
+        for wallet, size in zip(wallets, sizes):
+            wallet_volume[wallet] += size
+
+        branches = chunk.get('branch') or [''] * count
+        for branch, direction, size in zip(branches, directions, sizes):
+            if branch == '':
+                continue
+            legs = branch_legs[f"{run}#{branch}"]
+            if direction == 'long':
+                legs[0] += 1
+                legs[2] += size
+            elif direction == 'short':
+                legs[1] += 1
+                legs[3] += size
+
+        timestamps = chunk.get('timestamp', [])
+        errors = chunk.get('error', [''] * count)
+        for timestamp, status, error in zip(timestamps, statuses, errors):
+            if status != 'success':
+                failures[timestamp[:13]][error or 'unknown'] += 1
+
+    return {
+        'rows': rows,
+        'assets': {asset: [trades[asset], successes[asset]] for asset in trades},
+        'branches': dict(branch_legs),
+        'wallets': {wallet: [wallet_trades[wallet], wallet_volume[wallet]] for wallet in wallet_trades},
+        'failures': {hour: dict(reasons) for hour, reasons in failures.items()}
+    }
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-file summaries into one"""
+    merged: Dict[str, Any] = {'rows': 0, 'assets': {}, 'branches': {}, 'wallets': {}, 'failures': {}}
+    for summary in summaries:
+        merged['rows'] += summary['rows']
+        for group in ('assets', 'branches', 'wallets'):
+            for key, values in summary[group].items():
+                current = merged[group].setdefault(key, [0] * len(values))
+                for index, value in enumerate(values):
+                    current[index] += value
+        for hour, reasons in summary['failures'].items():
+            bucket = merged['failures'].setdefault(hour, {})
+            for reason, count in reasons.items():
+                bucket[reason] = bucket.get(reason, 0) + count
+    return merged
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except ValueError:
+        logging.warning(f"Ignoring unreadable analytics manifest {path}")
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, Any], path: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def analyze(results_dir: str = 'trade_results', manifest_path: Optional[str] = DEFAULT_MANIFEST,
+            workers: int = 1, chunk_size: int = 10000) -> Dict[str, Any]:
+    """Summarize every results CSV, reparsing only files that are new or changed"""
+    manifest = load_manifest(manifest_path) if manifest_path else {'version': MANIFEST_VERSION, 'files': {}}
+    cached = manifest['files']
+    current = {}
+    stale = []
+    with os.scandir(results_dir) as scan:
+        entries = sorted(scan, key=lambda e: e.name)
+    for entry in entries:
+        if not (entry.name.endswith('.csv') and entry.is_file()):
+            continue
+        stat = entry.stat()
+        signature = [stat.st_size, stat.st_mtime_ns]
+        known = cached.get(entry.path)
+        if known and known['signature'] == signature:
+            current[entry.path] = known
+        else:
+            stale.append((entry.path, signature))
+
+    paths = [path for path, _ in stale]
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            summaries = list(executor.map(summarize_file, paths, [chunk_size] * len(paths)))
+    else:
+        summaries = [summarize_file(path, chunk_size) for path in paths]
+    for (path, signature), summary in zip(stale, summaries):
+        current[path] = {'signature': signature, 'summary': summary}
+
+    if manifest_path:
+        save_manifest({'version': MANIFEST_VERSION, 'files': current}, manifest_path)
+
+    report = merge_summaries([entry['summary'] for entry in current.values()])
+    report['files'] = len(current)
+    report['parsed_files'] = len(stale)
+    return report
+
+
+def _mask(wallet: str) -> str:
+    return wallet[:10] + '...' if len(wallet) > 13 else wallet
+
+
+def format_report(report: Dict[str, Any], top: int = 10) -> str:
+    lines = [f"Files: {report['files']} ({report['parsed_files']} parsed), trades: {report['rows']}", ""]
+
+    lines.append("Success rate per asset")
+    for asset, (total, success) in sorted(report['assets'].items()):
+        lines.append(f"  {asset or '-':<8} {success:>7}/{total:<7} {100.0 * success / total:6.1f}%")
+
+    lines.append("")
+    lines.append("Long/short balance per branch (legs long/short, net volume)")
+    for branch, (longs, shorts, long_size, short_size) in sorted(report['branches'].items()):
+        lines.append(f"  {branch:<36} {longs:>3}/{shorts:<3} net {long_size - short_size:+12.2f}")
+
+    lines.append("")
+    lines.append(f"Top {top} wallets by volume")
+    wallets = sorted(report['wallets'].items(), key=lambda item: item[1][1], reverse=True)[:top]
+    for wallet, (count, volume) in wallets:
+        lines.append(f"  {_mask(wallet):<14} {count:>6} trades {volume:14.2f}")
+
+    lines.append("")
+    lines.append("Failures per hour")
+    for hour, reasons in sorted(report['failures'].items()):
+        detail = ', '.join(f"{reason}: {count}" for reason, count in sorted(reasons.items()))
+        lines.append(f"  {hour}  {detail}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Aggregate trade_results/*.csv history")
+    parser.add_argument('--results-dir', default='trade_results')
+    parser.add_argument('--manifest', default=None,
+                        help="Summary cache path (default: <results-dir>/.analytics_manifest.json)")
+    parser.add_argument('--no-cache', action='store_true', help="Parse every file and skip the manifest")
+    parser.add_argument('--workers', type=int, default=1, help="Parse files in this many processes")
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help="Print the raw report as JSON")
+    args = parser.parse_args(argv)
+
+    manifest = None if args.no_cache else (
+        args.manifest or os.path.join(args.results_dir, '.analytics_manifest.json')
+    )
+    report = analyze(args.results_dir, manifest, args.workers, args.chunk_size)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+import asyncio
+import collections
+import json
+import logging
+import threading
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from wallet_addresses import wallet_address
+
+
+class FeedClient:
+    """One WebSocket subscriber with its own bounded outbound queue"""
+
+    def __init__(self, connection, max_queue: int):
+        self.connection = connection
+        self.wallets: Set[str] = set()
+        self.assets: Set[str] = set()
+        self.subscribed = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        # Batches dropped since a send last went through; what gets a client disconnected
+        self.dropped_since_send = 0
+
+    def wants(self, trade: Dict[str, Any]) -> bool:
+        """Empty wallet or asset filters match everything in that dimension"""
+        if not self.subscribed:
+            return False
+        if self.wallets and trade.get('wallet', '').lower() not in self.wallets:
+            return False
+        if self.assets and trade.get('asset') not in self.assets:
+            return False
+        return True
+
+
+class TradeFeed:
+    """Pushes trade results to WebSocket subscribers as TradingSession records them
+
+    publish() is called on the trade path and only appends to a deque; the
+    feed's own event loop wakes at most once per flush_interval, converts the
+    pending rows and fans them out as one batch per client. A client whose
+    queue is full has its oldest batch dropped (it sees a sample of the
+    stream plus a dropped count) and is disconnected once max_dropped
+    batches in a row were dropped without one of its sends completing, so
+    slow viewers never slow down trading. At most max_pending rows wait
+    for a flush (e.g. while the feed is not serving yet); older ones are
+    dropped and counted in pending_dropped.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, max_queue: int = 64,
+                 flush_interval: float = 0.05, max_dropped: int = 1000, max_pending: int = 10000):
+        self.host = host
+        self.port = port
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.max_dropped = max_dropped
+        self.clients: Set[FeedClient] = set()
+        self.published = 0
+        self.disconnected_slow = 0
+        self.pending_dropped = 0
+        self._pending: Deque[Dict[str, Any]] = collections.deque(maxlen=max_pending)
+        self._wake_scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._stopping: Optional[asyncio.Event] = None
+
+    def attach(self, session):
+        """Publish every trade result the session records"""
+        session.add_trade_listener(self.publish)
+
+    def publish(self, row: Dict[str, Any], csv_path: Optional[str] = None):
+        """Queue a trade result for fan-out; safe to call from any thread"""
+        if len(self._pending) == self._pending.maxlen:
+            self.pending_dropped += 1
+        self._pending.append(row)
+        self.published += 1
+        # Coalesce: one wake-up per flush, however many trades arrive
+        if not self._wake_scheduled and self._loop is not None:
+            self._wake_scheduled = True
+            self._loop.call_soon_threadsafe(self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._loop.call_later(self.flush_interval, self._flush)
+
+    def _public_trade(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Trade as sent to browsers: private keys are replaced by addresses"""
+        trade = {key: value for key, value in row.items() if key != 'wallet'}
+        wallet = row.get('wallet', '')
+        try:
+            trade['wallet'] = wallet_address(wallet)
+        except Exception:
+            # Not a private key (e.g. already an address)
+            trade['wallet'] = wallet
+        return trade
+
+    def _flush(self):
+        self._wake_scheduled = False
+        batch: List[Dict[str, Any]] = []
+        while self._pending:
+            batch.append(self._public_trade(self._pending.popleft()))
+        if not batch:
+            return
+
+        for client in list(self.clients):
+            trades = [trade for trade in batch if client.wants(trade)]
+            if not trades:
+                continue
+            if client.queue.full():
+                client.queue.get_nowait()
+                client.dropped += 1
+                client.dropped_since_send += 1
+                if client.dropped_since_send >= self.max_dropped:
+                    self.disconnected_slow += 1
+                    self.clients.discard(client)
+                    asyncio.ensure_future(client.connection.close(1013, 'client too slow'))
+                    continue
+            client.queue.put_nowait(trades)
+
+    async def _send_loop(self, client: FeedClient):
+        while True:
+            trades = await client.queue.get()
+            message = {'type': 'trades', 'trades': trades}
+            reported = client.dropped_since_send
+            if reported:
+                message['dropped'] = reported
+            await client.connection.send(json.dumps(message))
+            # Drops during the send count towards the next one
+            client.dropped_since_send -= reported
+
+    async def _handle(self, connection):
+        client = FeedClient(connection, self.max_queue)
+        self.clients.add(client)
+        sender = asyncio.ensure_future(self._send_loop(client))
+        try:
+            async for message in connection:
+                self._apply_subscription(client, message)
+                await connection.send(json.dumps({
+                    'type': 'subscribed',
+                    'wallets': sorted(client.wallets),
+                    'assets': sorted(client.assets)
+                }))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+
+    def _apply_subscription(self, client: FeedClient, message: str):
+        """{"action": "subscribe"|"unsubscribe", "wallets": [...], "assets": [...]}"""
+        try:
+            request = json.loads(message)
+        except ValueError:
+            return
+        wallets = {wallet.lower() for wallet in request.get('wallets', [])}
+        assets = set(request.get('assets', []))
+        if request.get('action') == 'unsubscribe':
+            client.wallets -= wallets
+            client.assets -= assets
+            if not wallets and not assets:
+                client.subscribed = False
+        else:
+            client.wallets |= wallets
+            client.assets |= assets
+            client.subscribed = True
+
+    async def serve(self):
+        """Run the feed until stop() is called"""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        async with serve(self._handle, self.host, self.port) as server:
+            self._server = server
+            self.port = server.sockets[0].getsockname()[1]
+            logging.info(f"Trade feed listening on ws://{self.host}:{self.port}")
+            self._started.set()
+            await self._stopping.wait()
+
+    def start_in_thread(self) -> 'TradeFeed':
+        """Run the feed on its own event loop thread next to a synchronous session"""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True)
+        self._thread.start()
+        self._started.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop and self._stopping:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread:
+            self._thread.join(10)
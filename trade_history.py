@@ -0,0 +1,110 @@
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+TRADE_FIELDS = ['timestamp', 'wallet', 'asset', 'direction', 'size',
+                'status', 'transaction_hash', 'error', 'branch']
+
+
+class TradeHistoryIndex:
+    """Per-wallet index over trade_results/*.csv that only ever reads new bytes
+
+    Each file is tailed from the byte offset reached on the previous refresh,
+    so with hundreds of result files a refresh costs one directory scan plus
+    whatever rows were appended since. Rows are kept per wallet in append
+    order, which makes list positions stable cursors for pagination.
+    """
+
+    def __init__(self, results_dir: str = 'trade_results', min_refresh_interval: float = 1.0):
+        self.results_dir = results_dir
+        self.min_refresh_interval = min_refresh_interval
+        self._rows: Dict[str, List[Dict[str, Any]]] = {}
+        self._offsets: Dict[str, int] = {}
+        self._fieldnames: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self.row_count = 0
+
+    def refresh(self, force: bool = False) -> int:
+        """Pick up rows appended to any result file; returns the number of new rows"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.min_refresh_interval:
+            return 0
+        self._last_refresh = now
+        if not os.path.isdir(self.results_dir):
+            return 0
+
+        added = 0
+        with os.scandir(self.results_dir) as entries:
+            files = sorted(
+                (entry.name, entry.path, entry.stat().st_size) for entry in entries
+                if entry.name.endswith('.csv') and entry.is_file()
+            )
+        for _, path, size in files:
+            if size > self._offsets.get(path, 0):
+                added += self.refresh_file(path)
+        return added
+
+    def refresh_file(self, path: str) -> int:
+        """Read rows appended to one file since the last call"""
+        with self._lock:
+            offset = self._offsets.get(path, 0)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except OSError as e:
+                logging.warning(f"Cannot read trade results {path}: {str(e)}")
+                return 0
+
+            # Only consume complete lines; a row being written is picked up next time
+            end = chunk.rfind(b'\n')
+            if end < 0:
+                return 0
+            chunk = chunk[:end + 1]
+            self._offsets[path] = offset + len(chunk)
+
+            lines = io.StringIO(chunk.decode('utf-8'), newline='')
+            reader = csv.reader(lines)
+            fieldnames = self._fieldnames.get(path)
+            if fieldnames is None:
+                fieldnames = next(reader, None) or TRADE_FIELDS
+                self._fieldnames[path] = fieldnames
+
+            added = 0
+            name = os.path.basename(path)
+            for line_number, values in enumerate(reader):
+                if not values:
+                    continue
+                row = dict(zip(fieldnames, values))
+                row['id'] = row.get('transaction_hash') or f"{name}:{offset}:{line_number}"
+                self._rows.setdefault(row.get('wallet', ''), []).append(row)
+                added += 1
+            self.row_count += added
+            return added
+
+    def wallets(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def page(self, wallet: str, limit: int = 50,
+             cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest-first page of a wallet's trades and the cursor for the next page
+
+        The cursor is the list position the next page ends at; rows are only
+        ever appended, so it stays valid while new trades arrive. Raises
+        ValueError for a cursor that is not one this method returned.
+        """
+        if cursor is not None and not (cursor.isdigit() and cursor.isascii()):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        limit = max(1, limit)
+        with self._lock:
+            rows = self._rows.get(wallet, [])
+            end = len(rows) if cursor is None else min(int(cursor), len(rows))
+            start = max(0, end - limit)
+            page = rows[start:end][::-1]
+        return page, (str(start) if start > 0 else None)
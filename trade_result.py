@@ -0,0 +1,143 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional
+
+
+class TradeStatus(str, Enum):
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    # Dropped before submission, e.g. by the pre-trade balance check
+    SKIPPED = 'skipped'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class TradeDirection(str, Enum):
+    LONG = 'long'
+    SHORT = 'short'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class TradeResult:
+    """Outcome of one execute_trade call
+
+    A fixed set of slots holding the epoch timestamp, enums and a reference
+    to the caller's wallet key, instead of the nested dict with an ISO string
+    and a copied wallet prefix. Read access by key (result['status'],
+    result.get('transaction_hash'), 'details' in result) mirrors the legacy
+    dict shape; to_dict() and to_csv_row() build that shape at the edges.
+    """
+
+    __slots__ = ('status', 'tx_id', 'timestamp', 'wallet_key', 'asset',
+                 'direction', 'size', 'signature', 'error')
+
+    def __init__(self, status: TradeStatus, timestamp: float, tx_id: Optional[str] = None,
+                 wallet_key: Optional[str] = None, asset: Optional[str] = None,
+                 direction: Optional[TradeDirection] = None, size: Optional[float] = None,
+                 signature: Optional[str] = None, error: Optional[str] = None):
+        self.status = status
+        self.timestamp = timestamp
+        self.tx_id = tx_id
+        self.wallet_key = wallet_key
+        self.asset = asset
+        self.direction = direction
+        self.size = size
+        self.signature = signature
+        self.error = error
+
+    @classmethod
+    def success(cls, tx_id: str, timestamp: float, wallet_key: str, asset: str,
+                direction: str, size: float, signature: str) -> 'TradeResult':
+        return cls(TradeStatus.SUCCESS, timestamp, tx_id, wallet_key, asset,
+                   TradeDirection(direction), size, signature)
+
+    @classmethod
+    def failed(cls, error: str, timestamp: float, tx_id: Optional[str] = None) -> 'TradeResult':
+        return cls(TradeStatus.FAILED, timestamp, tx_id, error=error)
+
+    @classmethod
+    def skipped(cls, reason: str, timestamp: float, wallet_key: str, asset: str,
+                direction: str, size: float) -> 'TradeResult':
+        return cls(TradeStatus.SKIPPED, timestamp, None, wallet_key, asset,
+                   TradeDirection(direction), size, error=reason)
+
+    @property
+    def iso_timestamp(self) -> str:
+        return datetime.fromtimestamp(self.timestamp).isoformat()
+
+    def details(self) -> Dict[str, Any]:
+        return {
+            'asset': self.asset,
+            'direction': self.direction.value,
+            'size': self.size,
+            'wallet': self.wallet_key[:10] + '...'
+        }
+
+    def keys(self) -> Iterator[str]:
+        if self.status is TradeStatus.SUCCESS:
+            return iter(('status', 'transaction_hash', 'signature', 'timestamp', 'details'))
+        if self.tx_id is None:
+            return iter(('status', 'error', 'timestamp'))
+        return iter(('status', 'error', 'timestamp', 'tx_id'))
+
+    def __contains__(self, key: str) -> bool:
+        return key in tuple(self.keys())
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self:
+            raise KeyError(key)
+        if key == 'status':
+            return self.status.value
+        if key == 'timestamp':
+            return self.iso_timestamp
+        if key in ('transaction_hash', 'tx_id'):
+            return self.tx_id
+        if key == 'details':
+            return self.details()
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The dict execute_trade used to return"""
+        return {key: self[key] for key in self.keys()}
+
+    def to_csv_row(self, wallet: str, branch: Optional[int] = None) -> Dict[str, Any]:
+        """Row for the trade_results CSV (see trade_history.TRADE_FIELDS)"""
+        row = {
+            'timestamp': self.iso_timestamp,
+            'wallet': wallet if wallet else 'unknown',
+            'status': self.status.value,
+            'transaction_hash': self.tx_id if self.status is TradeStatus.SUCCESS else '',
+            'error': self.error or '',
+            'branch': '' if branch is None else branch
+        }
+        if self.asset is not None:
+            row['asset'] = self.asset
+            row['direction'] = self.direction.value
+            row['size'] = self.size
+        return row
+
+    def __repr__(self) -> str:
+        return f"TradeResult({self.to_dict()!r})"
+
+
+class PreparedTrade:
+    """A validated, signed trade waiting to be submitted"""
+
+    __slots__ = ('tx_id', 'wallet_key', 'asset', 'direction', 'size', 'signature', 'nonce')
+
+    def __init__(self, tx_id: str, wallet_key: str, asset: str, direction: str, size: float, signature: str,
+                 nonce: Optional[int] = None):
+        self.tx_id = tx_id
+        self.wallet_key = wallet_key
+        self.asset = asset
+        self.direction = direction
+        self.size = size
+        self.signature = signature
+        # Chain nonce taken from a NonceManager, released if the trade is not accepted
+        self.nonce = nonce
@@ -6,9 +6,85 @@ from selenium.common.exceptions import TimeoutException, ElementClickIntercepted
 from selenium.webdriver.chrome.options import Options
 import time
 import logging
-from typing import Dict, Optional
+import functools
+import os
+import random
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
+from http_replay import (FlowReplayer, build_template, collect_network_entries,
+                         enable_network_recording, load_template, save_template)
+from pipeline import PipelineStage, StagePipeline
+from position_manager import PositionLifecycleManager
+import tracing
+from ui_steps import CompiledSteps, selenium_locator
+from wallet_addresses import wallet_address
+
+# Injected into every document: counts in-flight fetch/XHR requests and records
+# the time of the last click and DOM mutation so waits can key off page activity
+# instead of fixed sleeps.
+ACTIVITY_MONITOR_JS = """
+(function () {
+    if (window.__uiActivity) { return; }
+    var state = window.__uiActivity = {pending: 0, lastNetwork: 0, lastMutation: 0, lastClick: 0};
+    var now = function () { return performance.now(); };
+    var done = function () { state.pending = Math.max(0, state.pending - 1); state.lastNetwork = now(); };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            state.pending += 1; state.lastNetwork = now();
+            return originalFetch.apply(this, arguments).then(
+                function (r) { done(); return r; },
+                function (e) { done(); throw e; });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.pending += 1; state.lastNetwork = now();
+        this.addEventListener('loadend', done);
+        return originalSend.apply(this, arguments);
+    };
+    var observe = function () {
+        new MutationObserver(function () { state.lastMutation = now(); })
+            .observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+    };
+    if (document.documentElement) { observe(); } else { document.addEventListener('DOMContentLoaded', observe); }
+    document.addEventListener('click', function () { state.lastClick = now(); }, true);
+})();
+"""
+
+NETWORK_IDLE_JS = """
+var s = window.__uiActivity;
+if (document.readyState !== 'complete') { return false; }
+if (!s) { return true; }
+return s.pending === 0 && performance.now() - s.lastNetwork >= arguments[0];
+"""
+
+# Settled only once the DOM has changed since the last click and then gone quiet,
+# so a wait right after a click cannot pass before the page reacts to it
+DOM_SETTLED_JS = """
+var s = window.__uiActivity;
+if (!s) { return document.readyState === 'complete'; }
+return s.lastMutation > s.lastClick && performance.now() - s.lastMutation >= arguments[0];
+"""
+
+
+def timed_step(step_name: str):
+    """Record the wall time of a UI step in ``self.step_timings`` and as a ui.<step> span"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with tracing.span(f"ui.{step_name}"):
+                    return method(self, *args, **kwargs)
+            finally:
+                self.step_timings.append((step_name, time.perf_counter() - started))
+        return wrapper
+    return decorator
+
+
 class TradingPlatformUI:
     """Handles UI automation for the trading platform"""
     
@@ -32,9 +108,21 @@ class TradingPlatformUI:
         'trading_history': '.trading-history-table'
     }
 
-    def __init__(self, headless: bool = True, proxy: Optional[Dict] = None):
+    # Waits poll far more often than Selenium's 0.5 s default so a step ends
+    # as soon as the page is ready rather than on the next half-second tick.
+    POLL_FREQUENCY = 0.05
+    NETWORK_IDLE_MS = 300
+    DOM_QUIET_MS = 200
+
+    PLATFORM_URL = "https://trading-platform-url.com"  # Replace with actual URL
+
+    def __init__(self, headless: bool = True, proxy: Optional[Dict] = None,
+                 record_network: bool = False, platform_url: Optional[str] = None):
         """Initialize the UI automation with browser settings"""
         self.chrome_options = Options()
+        self.platform_url = platform_url or self.PLATFORM_URL
+        if record_network:
+            enable_network_recording(self.chrome_options)
         if headless:
             self.chrome_options.add_argument('--headless')
         
@@ -45,6 +133,8 @@ class TradingPlatformUI:
         
         self.chrome_options.add_argument('--no-sandbox')
         self.chrome_options.add_argument('--disable-dev-shm-usage')
+        self.step_timings: List[Tuple[str, float]] = []
+        self._steps: Optional[CompiledSteps] = None
         self.setup_logging()
 
     def setup_logging(self):
@@ -56,23 +146,98 @@ class TradingPlatformUI:
             format='%(asctime)s - %(message)s'
         )
 
+    @timed_step('start_session')
     def start_session(self, user_agent: str):
         """Start a new browser session"""
         self.chrome_options.add_argument(f'user-agent={user_agent}')
         self.driver = webdriver.Chrome(options=self.chrome_options)
-        self.wait = WebDriverWait(self.driver, 10)
-        self.driver.get("https://trading-platform-url.com")  # Replace with actual URL
+        self.wait = WebDriverWait(self.driver, 10, poll_frequency=self.POLL_FREQUENCY)
+        # Compiled steps poll in-page for up to their own timeout
+        self.driver.set_script_timeout(30)
+        self._install_activity_monitor()
+        self.driver.get(self.platform_url)
+        self._ensure_activity_monitor()
+
+    def _install_activity_monitor(self):
+        """Register the activity monitor to run before any page script"""
+        try:
+            self.driver.execute_cdp_cmd(
+                'Page.addScriptToEvaluateOnNewDocument', {'source': ACTIVITY_MONITOR_JS}
+            )
+        except Exception as e:
+            logging.info(f"CDP unavailable, activity monitor will be injected after load: {str(e)}")
+
+    def _ensure_activity_monitor(self):
+        """Inject the activity monitor into the current document if it is missing"""
+        try:
+            self.driver.execute_script(ACTIVITY_MONITOR_JS)
+        except Exception as e:
+            logging.warning(f"Could not inject activity monitor: {str(e)}")
 
     def close_session(self):
         """Close the browser session"""
         if hasattr(self, 'driver'):
             self.driver.quit()
 
+    def wait_for_network_idle(self, timeout: float = 10, idle_ms: int = None) -> bool:
+        """Wait until no fetch/XHR is in flight and the network has been quiet for idle_ms"""
+        idle_ms = self.NETWORK_IDLE_MS if idle_ms is None else idle_ms
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=self.POLL_FREQUENCY).until(
+                lambda driver: driver.execute_script(NETWORK_IDLE_JS, idle_ms)
+            )
+            return True
+        except TimeoutException:
+            logging.warning(f"Network did not become idle within {timeout}s")
+            return False
+
+    def wait_for_dom_settled(self, timeout: float = 10, quiet_ms: int = None) -> bool:
+        """Wait until the DOM has changed since the last click and then stopped mutating for quiet_ms"""
+        quiet_ms = self.DOM_QUIET_MS if quiet_ms is None else quiet_ms
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=self.POLL_FREQUENCY).until(
+                lambda driver: driver.execute_script(DOM_SETTLED_JS, quiet_ms)
+            )
+            return True
+        except TimeoutException:
+            logging.warning(f"DOM did not settle within {timeout}s")
+            return False
+
+    @property
+    def steps(self) -> CompiledSteps:
+        """Compiled step runner bound to the current driver"""
+        if self._steps is None or self._steps.driver is not self.driver:
+            self._steps = CompiledSteps(self.driver, self.SELECTORS)
+        return self._steps
+
+    def click_if_present(self, selector: str) -> bool:
+        """Click an optional element if it is on the page right now, without waiting for it"""
+        elements = self.driver.find_elements(*selenium_locator(selector))
+        for element in elements:
+            if element.is_displayed() and element.is_enabled():
+                element.click()
+                return True
+        return False
+
+    def get_step_timings(self) -> Dict[str, float]:
+        """Return total seconds spent per UI step"""
+        totals: Dict[str, float] = {}
+        for step, seconds in self.step_timings:
+            totals[step] = totals.get(step, 0.0) + seconds
+        return totals
+
+    def report_step_timings(self) -> Dict[str, float]:
+        """Log per-step timings collected so far"""
+        totals = self.get_step_timings()
+        for step, seconds in totals.items():
+            logging.info(f"UI step {step}: {seconds * 1000:.1f} ms")
+        return totals
+
     def wait_and_click(self, selector: str, timeout: int = 10):
         """Wait for element and click it"""
         try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+            element = WebDriverWait(self.driver, timeout, poll_frequency=self.POLL_FREQUENCY).until(
+                EC.element_to_be_clickable(selenium_locator(selector))
             )
             element.click()
             return True
@@ -80,6 +245,7 @@ class TradingPlatformUI:
             logging.error(f"Error clicking element {selector}: {str(e)}")
             return False
 
+    @timed_step('add_to_waitlist')
     def add_to_waitlist(self, email: str) -> bool:
         """Add email to waitlist"""
         try:
@@ -93,82 +259,77 @@ class TradingPlatformUI:
             logging.error(f"Error adding to waitlist: {str(e)}")
             return False
 
+    @timed_step('connect_wallet')
     def connect_wallet(self, wallet_address: str) -> bool:
         """Connect wallet to platform"""
         try:
+            # The page reads the address to connect from window.walletAddress (see standin_servers)
+            self.driver.execute_script("window.walletAddress = arguments[0];", wallet_address)
             if self.wait_and_click(self.SELECTORS['connect_wallet']):
                 # Handle wallet connection popup/interaction
                 # This would depend on the specific wallet integration
-                time.sleep(2)  # Wait for wallet popup
+                self.wait_for_dom_settled()  # Wait for wallet popup to render
                 return True
             return False
         except Exception as e:
             logging.error(f"Error connecting wallet: {str(e)}")
             return False
 
+    @timed_step('create_portfolio')
     def create_portfolio(self) -> bool:
         """Create trading portfolio"""
         return self.wait_and_click(self.SELECTORS['portfolio_create'])
 
+    @timed_step('make_deposit')
     def make_deposit(self, amount: float = 10000) -> bool:
         """Make USDC deposit"""
         try:
             if self.wait_and_click(self.SELECTORS['deposit_button']):
                 # Handle deposit confirmation
-                time.sleep(2)
+                self.wait_for_network_idle()
                 return True
             return False
         except Exception as e:
             logging.error(f"Error making deposit: {str(e)}")
             return False
 
+    @timed_step('select_asset')
     def select_asset(self, asset: str) -> bool:
         """Select trading asset"""
-        try:
-            dropdown = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, self.SELECTORS['asset_dropdown']))
-            )
-            dropdown.click()
-            asset_option = self.wait.until(
-                EC.presence_of_element_located((By.XPATH, f"//option[text()='{asset}']"))
-            )
-            asset_option.click()
-            return True
-        except Exception as e:
-            logging.error(f"Error selecting asset: {str(e)}")
+        result = self.steps.run(self.steps.select_asset_actions(asset))
+        if not result.get('ok'):
+            logging.error(f"Error selecting asset: {result.get('error')}")
             return False
+        return True
 
+    @timed_step('execute_trade')
     def execute_trade(self, direction: str, size: float, leverage: int = 5) -> bool:
         """Execute trade with given parameters"""
         try:
-            # Select position type
-            if not self.wait_and_click(self.SELECTORS['position_type'][direction]):
+            # Direction, leverage, volume and confirmation in one round trip
+            result = self.steps.run(self.steps.trade_actions(direction, size, leverage))
+
+            # Approve USDC if needed: the script stops after clicking approve
+            if result.get('ok') and result.get('stopped_at') == 'approve_usdc':
+                # Wait for the approval request to finish and the button to go away
+                self.wait_for_network_idle()
+                self.wait.until(
+                    EC.invisibility_of_element_located(selenium_locator(self.SELECTORS['approve_usdc']))
+                )
+                result = self.steps.run(self.steps.confirm_actions())
+
+            if not result.get('ok'):
+                logging.error(
+                    f"Error executing trade at {result.get('failed')}: {result.get('error')}"
+                )
                 return False
-
-            # Set leverage
-            leverage_slider = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, self.SELECTORS['leverage_slider']))
-            )
-            # Set leverage value (implementation depends on slider type)
-
-            # Enter volume
-            volume_input = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, self.SELECTORS['volume_input']))
-            )
-            volume_input.clear()
-            volume_input.send_keys(str(size))
-
-            # Approve USDC if needed
-            if self.wait_and_click(self.SELECTORS['approve_usdc']):
-                time.sleep(2)  # Wait for approval
-
-            # Confirm trade
-            return self.wait_and_click(self.SELECTORS['confirm_trade'])
+            return True
 
         except Exception as e:
             logging.error(f"Error executing trade: {str(e)}")
             return False
 
+    @timed_step('close_position')
     def close_position(self) -> bool:
         """Close current position"""
         return self.wait_and_click(self.SELECTORS['close_position'])
@@ -176,18 +337,121 @@ class TradingPlatformUI:
 class UITradingSession:
     """Manages UI-based trading sessions"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, position_manager: Optional[PositionLifecycleManager] = None):
         self.config = config
         self.ui = None
+        self.last_step_timings: Dict[str, float] = {}
+        self.position_manager = position_manager
+        if self.position_manager is None and config.get('defer_position_close', False):
+            # Hold positions in the lifecycle manager instead of sleeping with a browser open
+            self.position_manager = PositionLifecycleManager(
+                self.close_held_position,
+                worker_count=config.get('position_close_workers', 4)
+            )
+            self.position_manager.start()
+
+        # Browserless fast path: replay a recorded flow over HTTP, browser as fallback
+        self.replayer: Optional[FlowReplayer] = None
+        template_path = config.get('http_replay_template')
+        if template_path and os.path.exists(template_path):
+            self.replayer = FlowReplayer(
+                load_template(template_path),
+                base_url=config.get('http_replay_base_url'),
+                pool_size=config.get('http_replay_pool_size', 32)
+            )
+
+    def _flow_params(self, address: str) -> Dict[str, Any]:
+        """Values that differ between wallets in a recorded flow; the wallet is its address, never its key"""
+        return {
+            'wallet': address,
+            'asset': self.config.get('trading_assets', ['BTC'])[0],
+            'direction': self.config.get('position_direction', 'long'),
+            'size': self.config.get('trade_size', 1000)
+        }
+
+    def _should_record(self) -> bool:
+        path = self.config.get('http_record_template')
+        return bool(path) and not os.path.exists(path)
+
+    def _save_recording(self, address: str, hold_marks: List[float]):
+        """Turn this run's network log into a replay template"""
+        entries, responses = collect_network_entries(self.ui.driver)
+        template = build_template(entries, self._flow_params(address), responses, hold_marks)
+        save_template(template, self.config['http_record_template'])
+
+    def _hold_replayed_position(self, wallet_key: str, flow: Dict[str, Any], proxy: Dict, user_agent: str):
+        """Hand a replay paused at its hold to the lifecycle manager, which resumes it when due"""
+        variables = flow['variables']
+        self.position_manager.open_position(
+            wallet_key, variables['asset'], variables['direction'], variables['size'],
+            variables.get('hold_time', 0),
+            context={'proxy': proxy, 'user_agent': user_agent, 'replay': flow}
+        )
+
+    def close_held_position(self, position: Dict[str, Any]) -> bool:
+        """Close a position held by the lifecycle manager in a fresh browser session
+
+        Positions opened over HTTP replay are closed by resuming their replay.
+        """
+        context = position['context']
+        if 'replay' in context:
+            result = self.replayer.resume(context['replay'], context.get('user_agent'), defer_holds=True)
+            if result['status'] == 'held':
+                # Closed, and the flow opened its next trade
+                self._hold_replayed_position(position['wallet_key'], result['flow'],
+                                             context.get('proxy'), context.get('user_agent'))
+            return result['status'] != 'failed'
+        ui = TradingPlatformUI(headless=True, proxy=context.get('proxy'),
+                               platform_url=self.config.get('platform_url'))
+        try:
+            ui.start_session(context.get('user_agent', ''))
+            if not ui.connect_wallet(wallet_address(position['wallet_key'])):
+                raise Exception("Failed to connect wallet")
+            return ui.close_position()
+        except Exception as e:
+            logging.error(f"Closing held position failed: {str(e)}")
+            return False
+        finally:
+            ui.close_session()
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Close every held position and stop the lifecycle manager"""
+        if self.position_manager:
+            self.position_manager.stop(drain=True, timeout=timeout)
 
+    @tracing.traced('ui.trading_sequence')
     def execute_trading_sequence(self, wallet_key: str, proxy: Dict, user_agent: str) -> bool:
         """Execute complete trading sequence for a wallet"""
+        # Only the address reaches the page and the platform
+        address = wallet_address(wallet_key)
+        if self.replayer:
+            params = dict(self._flow_params(address),
+                          hold_time=self.config.get('position_hold_time', 60))
+            with tracing.span('ui.http_replay'):
+                result = self.replayer.replay(params, proxy, user_agent,
+                                              defer_holds=self.position_manager is not None)
+            if result['status'] == 'held':
+                self._hold_replayed_position(wallet_key, result['flow'], proxy, user_agent)
+                return True
+            if result['status'] == 'success':
+                return True
+            if result['steps']:
+                # The platform already acted on part of the flow; running it again in the browser
+                # would repeat those steps (a second deposit or trade)
+                logging.error(f"HTTP replay failed for {wallet_key[:8]} after {result['steps']} steps, "
+                              f"not retrying in the browser")
+                return False
+            logging.warning(f"HTTP replay failed for {wallet_key[:8]}, falling back to browser")
+
+        recording = self._should_record()
+        hold_marks: List[float] = []
         try:
-            self.ui = TradingPlatformUI(headless=True, proxy=proxy)
+            self.ui = TradingPlatformUI(headless=True, proxy=proxy, record_network=recording,
+                                        platform_url=self.config.get('platform_url'))
             self.ui.start_session(user_agent)
 
             # Execute trading steps
-            if not self.ui.connect_wallet(wallet_key):
+            if not self.ui.connect_wallet(address):
                 raise Exception("Failed to connect wallet")
 
             if not self.ui.create_portfolio():
@@ -207,20 +471,37 @@ class UITradingSession:
                 if not self.ui.execute_trade(direction, size):
                     raise Exception("Failed to execute trade")
 
+                hold_time = self.config.get('position_hold_time', 60)
+                if self.position_manager and not recording:
+                    # Hand the hold over to the lifecycle manager and free the browser
+                    self.position_manager.open_position(
+                        wallet_key, asset, direction, size, hold_time,
+                        context={'proxy': proxy, 'user_agent': user_agent}
+                    )
+                    continue
+
                 # Wait before closing position
-                time.sleep(self.config.get('position_hold_time', 60))
+                hold_marks.append(time.time())
+                with tracing.span('ui.position_hold', hold_time=hold_time):
+                    time.sleep(hold_time)
 
                 if not self.ui.close_position():
                     raise Exception("Failed to close position")
 
+            if recording:
+                self._save_recording(address, hold_marks)
             return True
 
         except Exception as e:
             logging.error(f"Trading sequence failed: {str(e)}")
+            current = tracing.current_span()
+            if current:
+                current.record_error(e)
             return False
 
         finally:
             if self.ui:
+                self.last_step_timings = self.ui.report_step_timings()
                 self.ui.close_session()
 
 # Connect to main trading bot
@@ -228,32 +509,88 @@ def connect_to_main_trading_bot():
     """
     Import and connect to main trading bot functionality
     """
-    from crypto_trading_bot import TradingSession
+    from crypto_trading_bot import TradingSession, session_traced
     
     class CombinedTradingSession(TradingSession):
         def __init__(self, config: Dict):
             super().__init__(config)
             self.ui_session = UITradingSession(config)
+            self._ui_sessions = threading.local()
+            self.pipeline_stats: Dict[str, Dict[str, Any]] = {}
 
         def _process_wallet(self, wallet_key: str):
             """Override to include UI automation"""
-            # Get proxy and user agent
-            proxy = self.proxy_manager.get_proxy(
-                self.wallet_manager.wallets.index(wallet_key)
-            )
-            user_agent = self.trade_manager.get_random_user_agent()
-
-            # Execute UI trading sequence
-            ui_success = self.ui_session.execute_trading_sequence(
-                wallet_key, proxy, user_agent
-            )
-
+            with tracing.span('wallet', wallet=self.wallet_manager.wallets.index(wallet_key)):
+                # Get proxy and user agent
+                proxy = self.proxy_manager.get_proxy(
+                    self.wallet_manager.wallets.index(wallet_key)
+                )
+                user_agent = self.transaction_manager.get_random_user_agent()
+
+                # Execute UI trading sequence
+                ui_success = self.ui_session.execute_trading_sequence(
+                    wallet_key, proxy, user_agent
+                )
+
+                if not ui_success:
+                    logging.error(f"UI trading sequence failed for wallet {wallet_key[:8]}")
+                    return
+
+                # Execute backend trading logic
+                super()._process_wallet(wallet_key)
+
+        def _worker_ui_session(self) -> UITradingSession:
+            """UI session owned by the current UI worker, sharing the position manager"""
+            session = getattr(self._ui_sessions, 'session', None)
+            if session is None:
+                session = UITradingSession(self.config, self.ui_session.position_manager)
+                self._ui_sessions.session = session
+            return session
+
+        def _run_ui_stage(self, wallet_key: str) -> Optional[Tuple[str, Any]]:
+            """Pipeline stage: browser sequence for one wallet"""
+            wallet_index = self.wallet_manager.wallets.index(wallet_key)
+            # The wallet span stays open until the backend stage has traded
+            wallet_span = tracing.span('wallet', wallet=wallet_index)
+            with tracing.activate(wallet_span):
+                proxy = self.proxy_manager.get_proxy(wallet_index)
+                user_agent = self.transaction_manager.get_random_user_agent()
+                ui_success = self._worker_ui_session().execute_trading_sequence(wallet_key, proxy, user_agent)
             if not ui_success:
                 logging.error(f"UI trading sequence failed for wallet {wallet_key[:8]}")
-                return
-
-            # Execute backend trading logic
-            super()._process_wallet(wallet_key)
+                wallet_span.end()
+                return None
+            return wallet_key, wallet_span
+
+        def _run_backend_stage(self, item: Tuple[str, Any]) -> str:
+            """Pipeline stage: backend trade for a wallet whose UI sequence succeeded"""
+            wallet_key, wallet_span = item
+            try:
+                with tracing.activate(wallet_span):
+                    TradingSession._process_wallet(self, wallet_key)
+            finally:
+                wallet_span.end()
+            return wallet_key
+
+        @session_traced
+        def execute_pipelined_trading(self) -> Dict[str, Dict[str, Any]]:
+            """Run UI and backend stages concurrently with a bounded queue between them"""
+            wallets = self.wallet_manager.wallets.copy()
+            if self.config.get('enable_shuffling', True):
+                random.shuffle(wallets)
+
+            pipeline = StagePipeline([
+                PipelineStage('ui', self._run_ui_stage,
+                              workers=self.config.get('ui_concurrency', 2),
+                              queue_size=self.config.get('pipeline_queue_size', 100)),
+                PipelineStage('backend', self._run_backend_stage,
+                              workers=self.config.get('backend_concurrency', 8),
+                              queue_size=self.config.get('pipeline_queue_size', 100))
+            ])
+            self.pipeline_stats = pipeline.run(wallets)
+            for stage, stats in self.pipeline_stats.items():
+                logging.info(f"Pipeline stage {stage}: {stats}")
+            return self.pipeline_stats
 
     return CombinedTradingSession
 
@@ -267,6 +604,11 @@ if __name__ == "__main__":
         'enable_logs': True,
         'trades_per_wallet': 3,
         'position_hold_time': 120,
+        'defer_position_close': True,
+        'position_close_workers': 4,
+        'ui_concurrency': 2,
+        'backend_concurrency': 8,
+        'pipeline_queue_size': 100,
         'trading_assets': ['BTC', 'ETH', 'SOL'],
         'position_direction': 'random',
         'trade_size': 1000
@@ -274,4 +616,5 @@ if __name__ == "__main__":
 
     CombinedSession = connect_to_main_trading_bot()
     session = CombinedSession(config)
-    session.execute_parallel_trading() 
\ No newline at end of file
+    session.execute_pipelined_trading()
+    session.ui_session.shutdown() 
\ No newline at end of file
@@ -0,0 +1,216 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 2025-01-01T00:00:00Z; 41 timestamp bits last until 2094
+EPOCH_MS = 1735689600000
+
+TIMESTAMP_BITS = 41
+NODE_BITS = 8
+SLOT_BITS = 6
+SEQUENCE_BITS = 8
+
+SLOT_SHIFT = SEQUENCE_BITS
+NODE_SHIFT = SLOT_SHIFT + SLOT_BITS
+TIMESTAMP_SHIFT = NODE_SHIFT + NODE_BITS
+
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SLOTS = 1 << SLOT_BITS
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+# Threads beyond the first MAX_SLOTS - 1 share this slot under a lock
+SHARED_SLOT = MAX_SLOTS - 1
+
+# Derived node ids are claimed by locking one file per id in here
+NODE_LOCK_DIR = os.path.join(tempfile.gettempdir(), 'tx_node_ids')
+
+
+def _wall_clock_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def claim_node_id(lock_dir: str = NODE_LOCK_DIR) -> Tuple[int, int]:
+    """Node id no other live generator on this host holds, with the fd that holds it
+
+    Ids are tried from a hash of the pid onwards; each is held by an
+    exclusive lock on lock_dir/<id>.lock, which the OS drops when the fd
+    is closed or the process exits. Raises RuntimeError when every id is taken.
+    """
+    os.makedirs(lock_dir, exist_ok=True)
+    start = zlib.crc32(str(os.getpid()).encode('utf-8'))
+    for offset in range(MAX_NODE_ID + 1):
+        node_id = (start + offset) & MAX_NODE_ID
+        fd = os.open(os.path.join(lock_dir, f"{node_id}.lock"), os.O_RDWR | os.O_CREAT)
+        if _try_lock(fd):
+            return node_id, fd
+        os.close(fd)
+    raise RuntimeError(f"All {MAX_NODE_ID + 1} node ids are taken on this host; set tx_node_id or TX_NODE_ID")
+
+
+def _close_all(fds: List[int]):
+    for fd in fds:
+        os.close(fd)
+
+
+class _SlotToken:
+    """Lives in a thread's local storage; its finalizer frees the thread's slot"""
+
+
+class TxIdGenerator:
+    """Snowflake-style 63-bit transaction ids
+
+    Layout, high to low: milliseconds since EPOCH_MS (41 bits), node id
+    (8 bits), per-thread slot (6 bits), sequence (8 bits). Every thread
+    claims a slot once, under a lock, and from then on only touches its own
+    entries in the per-slot clock and sequence lists, so the hot path takes
+    no lock; threads beyond the first 63 share the last slot under a lock.
+    Ids are unique as long as node ids are unique per process. Without
+    tx_node_id / TX_NODE_ID each process claims a node id no other process
+    on the host holds (see claim_node_id); runs spread over several hosts
+    must configure them. Ids sort by creation time across threads; within a
+    thread they strictly increase even if the wall clock steps back,
+    because the slot's clock never goes backwards and borrows the next
+    millisecond when its 256 sequence numbers run out.
+    """
+
+    def __init__(self, node_id: Optional[int] = None, clock: Callable[[], int] = _wall_clock_ms,
+                 epoch_ms: int = EPOCH_MS, node_lock_dir: str = NODE_LOCK_DIR):
+        self.explicit_node = node_id is not None
+        self.node_lock_dir = node_lock_dir
+        # Lock files holding claimed node ids, closed with the generator
+        self._node_fds: List[int] = []
+        if not self.explicit_node:
+            node_id, fd = claim_node_id(node_lock_dir)
+            self._node_fds.append(fd)
+        self.node_id = node_id
+        if not 0 <= self.node_id <= MAX_NODE_ID:
+            raise ValueError(f"Node id must be between 0 and {MAX_NODE_ID}, got {self.node_id}")
+        self.clock = clock
+        self.epoch_ms = epoch_ms
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shared_lock = threading.Lock()
+        self._free_slots: List[int] = list(range(SHARED_SLOT - 1, -1, -1))
+        self._last_ms = [0] * MAX_SLOTS
+        self._sequence = [0] * MAX_SLOTS
+        self._slot_bits = [0] * MAX_SLOTS
+        self._node_stale = False
+        self._set_node_bits()
+        if not self.explicit_node:
+            weakref.finalize(self, _close_all, self._node_fds)
+            after_fork = weakref.WeakMethod(self._after_fork)
+            os.register_at_fork(after_in_child=lambda: after_fork() and after_fork()())
+
+    def _set_node_bits(self):
+        for slot in range(MAX_SLOTS):
+            self._slot_bits[slot] = (self.node_id << NODE_SHIFT) | (slot << SLOT_SHIFT)
+
+    def _after_fork(self):
+        # A forked child would otherwise share the parent's node id. Most forks
+        # (process pool workers) never make an id, so the child claims its own
+        # the first time it does: a fresh thread-local sends it to _claim_slot.
+        self._node_stale = True
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shared_lock = threading.Lock()
+
+    def _claim_slot(self) -> int:
+        with self._lock:
+            if self._node_stale:
+                self.node_id, fd = claim_node_id(self.node_lock_dir)
+                self._node_fds.append(fd)
+                self._set_node_bits()
+                self._node_stale = False
+            if not self._free_slots:
+                logging.warning(f"More than {SHARED_SLOT} threads are generating transaction ids; "
+                                f"the rest share slot {SHARED_SLOT} under a lock")
+                self._local.slot = SHARED_SLOT
+                return SHARED_SLOT
+            slot = self._free_slots.pop()
+        token = _SlotToken()
+        # Weak, so a generator dropped while its threads live is still freed (with its node id)
+        release = weakref.WeakMethod(self._release_slot)
+        weakref.finalize(token, lambda: release() and release()(slot))
+        self._local.token = token
+        self._local.slot = slot
+        return slot
+
+    def _release_slot(self, slot: int):
+        # _last_ms is kept, so the slot's next owner continues after it
+        with self._lock:
+            self._free_slots.append(slot)
+
+    def next_id(self) -> int:
+        try:
+            slot = self._local.slot
+        except AttributeError:
+            slot = self._claim_slot()
+        if slot == SHARED_SLOT:
+            with self._shared_lock:
+                return self._next_in_slot(slot)
+        return self._next_in_slot(slot)
+
+    def _next_in_slot(self, slot: int) -> int:
+        now = self.clock() - self.epoch_ms
+        last = self._last_ms[slot]
+        if now > last:
+            self._last_ms[slot] = now
+            sequence = self._sequence[slot] = 0
+        else:
+            sequence = self._sequence[slot] + 1
+            if sequence > SEQUENCE_MASK:
+                last += 1
+                self._last_ms[slot] = last
+                sequence = 0
+            self._sequence[slot] = sequence
+            now = last
+        return (now << TIMESTAMP_SHIFT) | self._slot_bits[slot] | sequence
+
+    def next_tx_id(self) -> str:
+        """Fixed-width hex so string order matches numeric order"""
+        return format_tx_id(self.next_id())
+
+
+def format_tx_id(value: int) -> str:
+    return f"tx_{value:016x}"
+
+
+def parse_tx_id(tx_id: str, epoch_ms: int = EPOCH_MS) -> Dict[str, int]:
+    """Split a tx id back into its fields"""
+    value = int(tx_id[3:] if tx_id.startswith('tx_') else tx_id, 16)
+    return {
+        'timestamp_ms': (value >> TIMESTAMP_SHIFT) + epoch_ms,
+        'node_id': (value >> NODE_SHIFT) & MAX_NODE_ID,
+        'slot': (value >> SLOT_SHIFT) & (MAX_SLOTS - 1),
+        'sequence': value & SEQUENCE_MASK
+    }
+
+
+def node_id_from_config(config: Dict) -> Optional[int]:
+    """tx_node_id from the session config, else the TX_NODE_ID environment variable"""
+    node_id = config.get('tx_node_id', os.environ.get('TX_NODE_ID'))
+    if node_id is None or node_id == '':
+        logging.info("No tx_node_id configured; claiming one not in use on this host")
+        return None
+    return int(node_id)
@@ -0,0 +1,141 @@
+from selenium.webdriver.common.by import By
+import logging
+from typing import Any, Dict, List, Tuple
+
+# Runs a list of element actions inside the page in a single WebDriver round
+# trip. Elements are resolved from the compiled locators and cached on the
+# window, so the cache lives exactly as long as the page load. Missing
+# required elements are polled for in-page until the timeout; optional ones
+# are skipped. An action with stop_after returns control to Python right after
+# it runs (used for the approval step, which needs a network wait).
+RUN_ACTIONS_JS = """
+var spec = arguments[0], done = arguments[arguments.length - 1];
+var cache = window.__uiLocatorCache || (window.__uiLocatorCache = {});
+var resolve = function (key) {
+    var el = cache[key];
+    if (el && el.isConnected) { return el; }
+    var loc = spec.locators[key];
+    if (!loc) { return null; }
+    el = loc[0] === 'xpath'
+        ? document.evaluate(loc[1], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+        : document.querySelector(loc[1]);
+    if (el) { cache[key] = el; }
+    return el;
+};
+var usable = function (el) {
+    return el && !el.disabled && (el.offsetWidth > 0 || el.offsetHeight > 0 || el.getClientRects().length > 0);
+};
+var setValue = function (el, value) {
+    var proto = el.tagName === 'SELECT' ? HTMLSelectElement.prototype
+        : el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, String(value));
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+};
+var ops = {
+    click: function (el) { el.click(); },
+    set: function (el, value) { setValue(el, value); },
+    select_text: function (el, text) {
+        for (var i = 0; i < el.options.length; i++) {
+            if (el.options[i].text.trim() === text) { setValue(el, el.options[i].value); return; }
+        }
+        throw new Error('option not found: ' + text);
+    }
+};
+var deadline = Date.now() + spec.timeout_ms, index = 0;
+var result = {ok: true, completed: [], skipped: [], stopped_at: null};
+var run = function () {
+    while (index < spec.actions.length) {
+        var action = spec.actions[index];
+        var el = resolve(action.key);
+        if (!usable(el)) {
+            if (action.optional) { result.skipped.push(action.key); index++; continue; }
+            if (Date.now() > deadline) {
+                result.ok = false; result.failed = action.key; result.error = 'timeout';
+                done(result); return;
+            }
+            setTimeout(run, spec.poll_ms); return;
+        }
+        try {
+            ops[action.op](el, action.value);
+        } catch (e) {
+            result.ok = false; result.failed = action.key; result.error = String(e);
+            done(result); return;
+        }
+        result.completed.push(action.key);
+        index++;
+        if (action.stop_after) { result.stopped_at = action.key; done(result); return; }
+    }
+    done(result);
+};
+run();
+"""
+
+
+def compile_locators(selectors: Dict[str, Any], prefix: str = '') -> Dict[str, Tuple[str, str]]:
+    """Flatten SELECTORS into {key: (strategy, value)}, e.g. 'position_type.long'"""
+    compiled = {}
+    for name, value in selectors.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            compiled.update(compile_locators(value, f"{key}."))
+        else:
+            compiled[key] = locator_for(value)
+    return compiled
+
+
+def locator_for(selector: str) -> Tuple[str, str]:
+    """Detect whether a selector is XPath or CSS"""
+    if selector.startswith('/') or selector.startswith('('):
+        return ('xpath', selector)
+    return ('css', selector)
+
+
+def selenium_locator(selector: str) -> Tuple[str, str]:
+    """Selector as a (By, value) pair for Selenium expected conditions"""
+    strategy, value = locator_for(selector)
+    return (By.XPATH if strategy == 'xpath' else By.CSS_SELECTOR, value)
+
+
+class CompiledSteps:
+    """Runs whole multi-field UI steps as one execute_async_script call"""
+
+    def __init__(self, driver, selectors: Dict[str, Any], timeout: float = 10, poll_ms: int = 50):
+        self.driver = driver
+        self.locators = compile_locators(selectors)
+        self.timeout = timeout
+        self.poll_ms = poll_ms
+        self.round_trips = 0
+
+    def run(self, actions: List[Dict[str, Any]], timeout: float = None) -> Dict[str, Any]:
+        """Run actions in-page and return the JSON result"""
+        timeout = self.timeout if timeout is None else timeout
+        spec = {
+            'locators': self.locators,
+            'actions': actions,
+            'timeout_ms': int(timeout * 1000),
+            'poll_ms': self.poll_ms
+        }
+        self.round_trips += 1
+        try:
+            result = self.driver.execute_async_script(RUN_ACTIONS_JS, spec)
+        except Exception as e:
+            logging.error(f"Compiled step failed: {str(e)}")
+            return {'ok': False, 'error': str(e), 'completed': []}
+        return result or {'ok': False, 'error': 'empty result', 'completed': []}
+
+    def select_asset_actions(self, asset: str) -> List[Dict[str, Any]]:
+        return [{'key': 'asset_dropdown', 'op': 'select_text', 'value': asset}]
+
+    def trade_actions(self, direction: str, size: float, leverage: int) -> List[Dict[str, Any]]:
+        """Direction, leverage, volume, optional approval and confirmation"""
+        return [
+            {'key': f'position_type.{direction}', 'op': 'click'},
+            {'key': 'leverage_slider', 'op': 'set', 'value': leverage},
+            {'key': 'volume_input', 'op': 'set', 'value': size},
+            {'key': 'approve_usdc', 'op': 'click', 'optional': True, 'stop_after': True},
+            {'key': 'confirm_trade', 'op': 'click'}
+        ]
+
+    def confirm_actions(self) -> List[Dict[str, Any]]:
+        return [{'key': 'confirm_trade', 'op': 'click'}]
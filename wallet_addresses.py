@@ -0,0 +1,10 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=65536)
+def wallet_address(private_key: str) -> str:
+    """Checksum address of a hex private key"""
+    # eth_keys takes longer to import than the rest of the bot; only cache misses reach this line
+    from eth_keys import keys
+    key = keys.PrivateKey(bytes.fromhex(private_key.replace('0x', '')))
+    return key.public_key.to_checksum_address()
@@ -0,0 +1,323 @@
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from crypto_trading_bot import TradingSession, TransactionManager
+from trade_result import PreparedTrade, TradeResult
+
+
+class Arrival(NamedTuple):
+    """One trade of a recorded workload, offset seconds after the first"""
+    offset: float
+    wallet: str
+    asset: str
+    direction: str
+    size: float
+    branch: Optional[int] = None
+    # Backend latency, known only for journal captures
+    latency: Optional[float] = None
+
+
+def wallet_label(wallet: str) -> str:
+    """Stable opaque id for a wallet, so workloads never carry keys"""
+    return hashlib.sha256(wallet.encode('utf-8')).hexdigest()[:12]
+
+
+def percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _arrivals(timed: List[Dict[str, Any]], max_gap: Optional[float]) -> List[Arrival]:
+    """Arrivals from records with an epoch 'at', idle gaps longer than max_gap cut to max_gap"""
+    timed.sort(key=lambda record: record['at'])
+    arrivals = []
+    offset = 0.0
+    previous = None
+    for record in timed:
+        if previous is not None:
+            gap = record['at'] - previous
+            offset += min(gap, max_gap) if max_gap is not None else gap
+        previous = record['at']
+        arrivals.append(Arrival(offset, record['wallet'], record['asset'], record['direction'],
+                                record['size'], record.get('branch'), record.get('latency')))
+    return arrivals
+
+
+def load_csv_workload(paths: Sequence[str], max_gap: Optional[float] = 60.0) -> List[Arrival]:
+    """Arrivals from trade_results CSVs
+
+    A row's timestamp is when its result was written, which is the closest
+    thing to an arrival time the CSV has. Rows without trade parameters
+    (failures recorded before any were known) are left out. Files are merged
+    on one timeline and the idle time between sessions is cut to max_gap.
+    """
+    timed = []
+    for path in paths:
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if not row.get('asset') or not row.get('size') or not row.get('timestamp'):
+                    continue
+                try:
+                    at = datetime.fromisoformat(row['timestamp']).timestamp()
+                    size = float(row['size'])
+                except ValueError:
+                    continue
+                branch = row.get('branch')
+                timed.append({
+                    'at': at, 'wallet': wallet_label(row.get('wallet', '')), 'asset': row['asset'],
+                    'direction': row.get('direction') or 'long', 'size': size,
+                    'branch': int(branch) if branch else None
+                })
+    return _arrivals(timed, max_gap)
+
+
+def load_journal(path: str, max_gap: Optional[float] = 60.0) -> List[Arrival]:
+    """Arrivals from a WorkloadRecorder journal, with submit times and backend latency"""
+    timed = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            timed.append(dict(entry, at=entry['submitted_at']))
+    return _arrivals(timed, max_gap)
+
+
+def load_workload(sources: Sequence[str], max_gap: Optional[float] = 60.0) -> List[Arrival]:
+    """CSV files, directories of CSVs and .jsonl journals, merged in time order"""
+    csv_paths: List[str] = []
+    arrivals: List[Arrival] = []
+    for source in sources:
+        if os.path.isdir(source):
+            csv_paths.extend(sorted(glob.glob(os.path.join(source, '*.csv'))))
+        elif source.endswith('.jsonl'):
+            arrivals.extend(load_journal(source, max_gap))
+        else:
+            csv_paths.append(source)
+    if csv_paths:
+        arrivals.extend(load_csv_workload(csv_paths, max_gap))
+    return sorted(arrivals, key=lambda arrival: arrival.offset)
+
+
+def workload_stats(arrivals: Sequence[Arrival]) -> Dict[str, Any]:
+    """Volume, timing and parameter mix of a workload"""
+    duration = arrivals[-1].offset - arrivals[0].offset if arrivals else 0.0
+    gaps = [b.offset - a.offset for a, b in zip(arrivals, arrivals[1:])]
+    latencies = [arrival.latency for arrival in arrivals if arrival.latency is not None]
+    stats = {
+        'trades': len(arrivals),
+        'duration': duration,
+        'throughput': len(arrivals) / duration if duration > 0 else None,
+        'interarrival_p50': percentile(gaps, 0.5),
+        'interarrival_p99': percentile(gaps, 0.99),
+        'assets': dict(Counter(arrival.asset for arrival in arrivals)),
+        'directions': dict(Counter(arrival.direction for arrival in arrivals)),
+        'mean_size': sum(arrival.size for arrival in arrivals) / len(arrivals) if arrivals else None,
+        'wallets': len({arrival.wallet for arrival in arrivals})
+    }
+    if latencies:
+        stats['latency_p50'] = percentile(latencies, 0.5)
+        stats['latency_p99'] = percentile(latencies, 0.99)
+    return stats
+
+
+class WorkloadRecorder:
+    """Journal of every order sent to the venue: time, parameters and latency
+
+    Attach to a session to capture a workload that load_journal can replay
+    with the backend latency of the original run; wallets are recorded as
+    wallet_label ids.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a')
+
+    def attach(self, session: TradingSession) -> 'WorkloadRecorder':
+        session.transaction_manager.submit_listeners.append(self)
+        return self
+
+    def __call__(self, results: List[TradeResult], submitted_at: float, latency: float):
+        lines = [json.dumps({
+            'submitted_at': submitted_at, 'latency': latency, 'wallet': wallet_label(result.wallet_key),
+            'asset': result.asset, 'direction': str(result.direction), 'size': result.size,
+            'status': str(result.status)
+        }) for result in results if result.asset is not None]
+        with self._lock:
+            self._file.write(''.join(line + "\n" for line in lines))
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class StubBackend(TransactionManager):
+    """Venue stand-in that accepts every order after a fixed latency (default: at once)"""
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def _send(self, prepared: List[PreparedTrade], proxy: Dict) -> List[TradeResult]:
+        if self.latency:
+            time.sleep(self.latency)
+        now = time.time()
+        return [TradeResult.success(trade.tx_id, now, trade.wallet_key, trade.asset,
+                                    trade.direction, trade.size, trade.signature) for trade in prepared]
+
+
+def _drift(replayed: Optional[float], expected: Optional[float]) -> Optional[float]:
+    """Relative difference, e.g. 0.1 for 10% above expected"""
+    if replayed is None or not expected:
+        return None
+    return replayed / expected - 1
+
+
+def replay(session: TradingSession, arrivals: Sequence[Arrival], speed: float = 1.0,
+           concurrency: int = 8) -> Dict[str, Any]:
+    """Replay arrivals through session._process_wallet_with_size and compare with the original
+
+    speed 1 keeps the original timing, N compresses it N times and 0 (or
+    inf) submits everything at once to measure capacity. Arrivals run on
+    concurrency threads; lag is how late each started against its schedule.
+    Latency is the backend request time seen by submit_listeners, as a
+    WorkloadRecorder journal has it; call_latency is the whole trade.
+    Recorded wallets map onto the session's wallets in order of first use.
+    """
+    wallets = session.wallet_manager.wallets
+    if not wallets:
+        raise ValueError("Replay needs at least one wallet in the session")
+    scale = 0.0 if not speed or math.isinf(speed) else 1.0 / speed
+    slots: Dict[str, int] = {}
+    for arrival in arrivals:
+        slots.setdefault(arrival.wallet, len(slots) % len(wallets))
+
+    lags: List[float] = []
+    calls: List[float] = []
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+
+    def record_latency(results: List[TradeResult], submitted_at: float, latency: float):
+        with lock:
+            latencies.extend(latency for result in results if result.asset is not None)
+
+    def run(arrival: Arrival, due: float):
+        started = time.monotonic()
+        index = slots[arrival.wallet]
+        result = session._process_wallet_with_size(
+            wallets[index], arrival.direction, arrival.size, arrival.asset,
+            branch=arrival.branch, wallet_index=index
+        )
+        finished = time.monotonic()
+        with lock:
+            lags.append(started - due)
+            calls.append(finished - started)
+            statuses[str(result.get('status'))] += 1
+
+    first = arrivals[0].offset if arrivals else 0.0
+    start = time.monotonic()
+    errors = 0
+    listeners = session.transaction_manager.submit_listeners
+    listeners.append(record_latency)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='replay') as pool:
+            futures = []
+            for arrival in arrivals:
+                due = start + (arrival.offset - first) * scale
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(run, arrival, due))
+            for future in futures:
+                if future.exception() is not None:
+                    errors += 1
+                    logging.error(f"Replayed trade failed: {future.exception()}")
+    finally:
+        listeners.remove(record_latency)
+    duration = time.monotonic() - start
+
+    original = workload_stats(arrivals)
+    replayed = {
+        'speed': speed if scale else 'max',
+        'trades': len(calls),
+        'errors': errors,
+        'statuses': dict(statuses),
+        'duration': duration,
+        'throughput': len(calls) / duration if duration > 0 else None,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p99': percentile(latencies, 0.99),
+        'call_latency_p50': percentile(calls, 0.5),
+        'call_latency_p99': percentile(calls, 0.99),
+        'lag_p50': percentile(lags, 0.5),
+        'lag_p99': percentile(lags, 0.99),
+        'lag_max': max(lags) if lags else None
+    }
+    drift = {
+        'latency_p50': _drift(replayed['latency_p50'], original.get('latency_p50')),
+        'latency_p99': _drift(replayed['latency_p99'], original.get('latency_p99'))
+    }
+    if scale:
+        # Compared with the original timeline compressed by speed
+        drift['throughput'] = _drift(replayed['throughput'],
+                                     original['throughput'] * speed if original['throughput'] else None)
+        drift['duration'] = _drift(duration, original['duration'] * scale)
+    return {'original': original, 'replay': replayed, 'drift': drift}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay recorded trade workloads against a stand-in backend")
+    parser.add_argument('sources', nargs='*', default=['trade_results'],
+                        help="trade_results CSVs, directories of them, or .jsonl journals")
+    parser.add_argument('--speed', default='1', help="Time compression factor, or 'max'")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help="Stub backend latency in seconds")
+    parser.add_argument('--simulated-backend', action='store_true',
+                        help="Use the simulated 0.5-2s TransactionManager instead of the stub")
+    parser.add_argument('--max-gap', type=float, default=60.0, help="Cut idle gaps to this many seconds")
+    parser.add_argument('--limit', type=int, default=None, help="Replay only the first N arrivals")
+    parser.add_argument('--keys-file', default='wallet_keys.txt')
+    parser.add_argument('--proxy-file', default='proxies.txt')
+    parser.add_argument('--results-dir', default='replay_results',
+                        help="Where the replay's own trade_results CSV goes")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    arrivals = load_workload(args.sources, args.max_gap)[:args.limit]
+    if not arrivals:
+        parser.error("No replayable trades found")
+    session = TradingSession({
+        'keys_file': args.keys_file, 'proxy_file': args.proxy_file,
+        'enable_logs': False, 'results_dir': args.results_dir
+    })
+    if not session.wallet_manager.wallets:
+        parser.error(f"No wallets in {args.keys_file}")
+    if not args.simulated_backend:
+        manager = session.transaction_manager
+        session.transaction_manager = StubBackend(args.latency, id_generator=manager.id_generator,
+                                                  order_signer=manager.order_signer,
+                                                  max_batch_size=manager.max_batch_size,
+                                                  nonce_manager=manager.nonce_manager)
+    speed = math.inf if args.speed == 'max' else float(args.speed)
+    print(json.dumps(replay(session, arrivals, speed, args.concurrency), indent=2))
+
+
+if __name__ == "__main__":
+    main()